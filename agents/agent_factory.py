@@ -1,5 +1,6 @@
 from agents.multi_agent_systems import get_mas
 from agents.single_agent_systems import get_agent
+from agents.registry import LazyRegistry
 
 def agent_system_factory(agent_type: str = "react"):
     if agent_type == "react":
@@ -11,4 +12,14 @@ def agent_system_factory(agent_type: str = "react"):
     else:
         raise ValueError(f"Invalid agent type: {agent_type}. Expected 'react' or 'openai' or 'multi'.")
     
-    return agent_system
\ No newline at end of file
+    return agent_system
+
+# Agent systems shared by the whole process, each built on first use
+agent_systems = LazyRegistry({
+    agent_type: (lambda agent_type=agent_type: agent_system_factory(agent_type))
+    for agent_type in ["react", "openai", "multi"]
+})
+
+def get_agent_system(agent_type: str = "react"):
+    """Return the shared agent system of the given type, building it on first use."""
+    return agent_systems.get(agent_type)
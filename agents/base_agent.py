@@ -1,18 +1,104 @@
 from abc import abstractmethod
+from typing import Any, Dict, List, Optional
+from langchain_core.runnables import RunnableLambda
+from agents.rate_limiter import RateLimiter, rate_limited
+from agents.streaming import iterate_in_thread
+
+# Queries of a batch run at the same time, by default
+BATCH_MAX_CONCURRENCY = 4
 
 class Agent():
     """Base class for all agents."""
-    
-    @abstractmethod 
-    def run_agent(self, query: str): 
+
+    @abstractmethod
+    def run_agent(self, query: str):
         """
         Run the agent and return the result and the time it took to run the agent.
         """
         pass
 
+    @abstractmethod
+    async def arun_agent(self, query: str):
+        """
+        Async version of run_agent.
+        """
+        pass
+
+    @abstractmethod
+    def astream_agent(self, query: str):
+        """
+        Run the agent and yield typed events (see agents.streaming) while it runs, ending with the 'final' event.
+        """
+        pass
+
+    def stream_agent(self, query: str):
+        """
+        Synchronous version of astream_agent.
+        """
+        return iterate_in_thread(self.astream_agent(query))
+
     @abstractmethod
     def format_agent_response(self, output):
         """
         Format the agent's output.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def _batch_runner(self, limiter: RateLimiter, completion_tokens: int) -> RunnableLambda:
+        """
+        Runnable running the agent on a single query of a batch, with each of its LLM calls charged
+        against `limiter`. Failures are returned as the 'error' of that query, with the same keys as a
+        response, so that one bad query does not abort the batch.
+        """
+        def failed(query: str, error: Exception) -> Dict[str, Any]:
+            return {'input': query, 'output': None, 'agent_trajectory': '', 'steps': [], 'trace': None, 'time': None, 'error': repr(error)}
+
+        def run(query: str) -> Dict[str, Any]:
+            try:
+                with rate_limited(limiter, completion_tokens):
+                    output, latency = self.run_agent(query)
+            except Exception as e:
+                return failed(query, e)
+            return {**self.format_agent_response(output), 'input': query, 'time': latency, 'error': None}
+
+        async def arun(query: str) -> Dict[str, Any]:
+            try:
+                with rate_limited(limiter, completion_tokens):
+                    output, latency = await self.arun_agent(query)
+            except Exception as e:
+                return failed(query, e)
+            return {**self.format_agent_response(output), 'input': query, 'time': latency, 'error': None}
+
+        return RunnableLambda(run, afunc=arun)
+
+    def run_batch(
+        self,
+        queries: List[str],
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        completion_tokens: int = 256,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the agent on many queries concurrently and return the formatted responses in the order of the queries.
+
+        Each result has the formatted response plus 'input', 'time' (the latency of that query) and 'error'.
+        Every LLM call of the runs (supervisor, ReAct steps, SQL generation...) counts as one request and
+        as its estimated prompt tokens plus `completion_tokens` against the rate limits.
+        """
+        limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        return self._batch_runner(limiter, completion_tokens).batch(queries, config={"max_concurrency": max_concurrency})
+
+    async def arun_batch(
+        self,
+        queries: List[str],
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        completion_tokens: int = 256,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of run_batch.
+        """
+        limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        return await self._batch_runner(limiter, completion_tokens).abatch(queries, config={"max_concurrency": max_concurrency})
@@ -0,0 +1,104 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+from agents.base_agent import Agent
+
+
+def _run_agent(agent: Agent, query: str) -> Dict[str, Any]:
+    response, time = agent.run_agent(query)
+    result = agent.format_agent_response(response)
+    result['time'] = time
+    return result
+
+def _stream_agent(agent: Agent, query: str, name: str, events: "queue.Queue") -> Dict[str, Any]:
+    final = None
+    for event in agent.stream_agent(query):
+        if event["type"] == "final":
+            final = event
+        else:
+            events.put({"type": "agent_event", "agent": name, "event": event})
+    if final is None:
+        raise RuntimeError(f"The stream of agent '{name}' ended without a final event.")
+    result = agent.format_agent_response(final["output"])
+    result['time'] = final["time"]
+    return result
+
+def _run_evaluation(evaluator: Any, query: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    return evaluator.evaluate_agent_trajectory(
+        prediction=response["output"],
+        input=query,
+        agent_trajectory=response["agent_trajectory"],
+    )
+
+def compare_agents(query: str, agents: Dict[str, Agent], evaluators: Optional[Dict[str, Any]] = None, max_concurrency: int = 4, stream: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Run every agent on the query and every evaluator on every agent's response, at most
+    `max_concurrency` LLM pipelines at a time.
+
+    Events are yielded in completion order, so callers can show each agent as soon as it finishes:
+
+    - {"type": "response", "agent": ..., "response": ...} with the formatted response and its 'time'.
+    - {"type": "evaluation", "agent": ..., "evaluation": ..., "result": ...} once per evaluator.
+    - {"type": "error", "agent": ..., "evaluation": ..., "error": ...} if an agent or evaluator raised;
+      'evaluation' is None for agent failures.
+    - With `stream=True`, {"type": "agent_event", "agent": ..., "event": ...} for every event of
+      `stream_agent` (see agents.streaming) while the agent runs.
+    """
+    evaluators = evaluators or {}
+    events: "queue.Queue" = queue.Queue()
+
+    def agent_task(name: str, agent: Agent):
+        try:
+            response = _stream_agent(agent, query, name, events) if stream else _run_agent(agent, query)
+        except Exception as e:
+            events.put({"type": "error", "agent": name, "evaluation": None, "error": e})
+        else:
+            events.put({"type": "response", "agent": name, "response": response})
+
+    def evaluation_task(agent_name: str, name: str, evaluator: Any, response: Dict[str, Any]):
+        try:
+            result = _run_evaluation(evaluator, query, response)
+        except Exception as e:
+            events.put({"type": "error", "agent": agent_name, "evaluation": name, "error": e})
+        else:
+            events.put({"type": "evaluation", "agent": agent_name, "evaluation": name, "result": result})
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for name, agent in agents.items():
+            executor.submit(agent_task, name, agent)
+
+        # Every task ends with exactly one response, evaluation or error event
+        pending = len(agents)
+        while pending:
+            event = events.get()
+            if event["type"] == "agent_event":
+                yield event
+                continue
+
+            pending -= 1
+            if event["type"] == "response":
+                # Evaluations are submitted from here rather than from the agent's worker so they
+                # never wait on a pool slot held by their own parent task
+                for name, evaluator in evaluators.items():
+                    executor.submit(evaluation_task, event["agent"], name, evaluator, event["response"])
+                    pending += 1
+            yield event
+
+def run_comparison(query: str, agents: Dict[str, Agent], evaluators: Optional[Dict[str, Any]] = None, max_concurrency: int = 4) -> Dict[str, Dict[str, Any]]:
+    """
+    Blocking version of `compare_agents` returning the formatted response of each agent, with the
+    results of the evaluators under 'evaluations'. Errors are raised.
+    """
+    responses = {}
+    evaluations = {name: {} for name in agents}
+    for event in compare_agents(query, agents, evaluators, max_concurrency):
+        if event["type"] == "error":
+            raise event["error"]
+        if event["type"] == "response":
+            responses[event["agent"]] = event["response"]
+        else:
+            evaluations[event["agent"]][event["evaluation"]] = event["result"]
+
+    for name, response in responses.items():
+        response['evaluations'] = evaluations[name]
+    return responses
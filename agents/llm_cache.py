@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk
+from langchain_openai import ChatOpenAI as _ChatOpenAI
+from langchain_openai import OpenAIEmbeddings
+from loguru import logger
+
+# record:      always call the model and store the response
+# replay:      only answer from the store, a missing entry is an error
+# passthrough: call the model, nothing is stored
+LLM_CACHE_MODES = ["record", "replay", "passthrough"]
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class RecordReplayCache(BaseCache):
+    """
+    Content-addressed store of LLM responses, plugged in through LangChain's global LLM cache.
+
+    Entries are keyed by a hash of the llm string, which holds the model, temperature and bound
+    functions/tools, and of the serialized messages. They are stored in a SQLite file.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Invalid LLM cache mode: {mode}. Expected one of {LLM_CACHE_MODES}.")
+        self.path = path
+        self.mode = mode
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, llm_string TEXT, prompt TEXT, response TEXT)")
+        self._con.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(json.dumps([llm_string, prompt]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._con.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, llm_string: str, prompt: str, response: str):
+        with self._lock:
+            self._con.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, llm_string, prompt, response))
+            self._con.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if self.mode != "replay":
+            return None
+        response = self.get(self.key(prompt, llm_string))
+        if response is None:
+            raise LLMCacheMiss(f"No recorded response for this request in {self.path}. Run with LLM_CACHE_MODE=record to record it.")
+        return [loads(generation) for generation in json.loads(response)]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode != "record":
+            return
+        self.put(self.key(prompt, llm_string), llm_string, prompt, json.dumps([dumps(generation) for generation in return_val]))
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._con.execute("DELETE FROM llm_cache")
+            self._con.commit()
+
+
+class RecordReplayEmbeddings(Embeddings):
+    """Embeddings recorded and replayed through a `RecordReplayCache`, keyed by model and text."""
+
+    def __init__(self, embeddings: Embeddings, cache: RecordReplayCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+
+    def _key(self, text: str) -> str:
+        return self.cache.key(text, json.dumps({"embedding_model": self.model}))
+
+    def _lookup(self, texts: List[str]) -> List[Optional[List[float]]]:
+        if self.cache.mode != "replay":
+            return [None] * len(texts)
+        vectors = []
+        for text in texts:
+            response = self.cache.get(self._key(text))
+            if response is None:
+                raise LLMCacheMiss(f"No recorded embedding for this text in {self.cache.path}. Run with LLM_CACHE_MODE=record to record it.")
+            vectors.append(json.loads(response))
+        return vectors
+
+    def _update(self, texts: List[str], vectors: List[List[float]]):
+        if self.cache.mode == "record":
+            for text, vector in zip(texts, vectors):
+                self.cache.put(self._key(text), self.model, text, json.dumps(vector))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache.mode == "replay":
+            return self._lookup(texts)
+        vectors = self.embeddings.embed_documents(texts)
+        self._update(texts, vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.cache.mode == "replay":
+            return self._lookup([text])[0]
+        vector = self.embeddings.embed_query(text)
+        self._update([text], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache.mode == "replay":
+            return self._lookup(texts)
+        vectors = await self.embeddings.aembed_documents(texts)
+        self._update(texts, vectors)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.cache.mode == "replay":
+            return self._lookup([text])[0]
+        vector = await self.embeddings.aembed_query(text)
+        self._update([text], [vector])
+        return vector
+
+
+class StreamingCacheMixin:
+    """
+    Make the streamed calls of a chat model go through the global LLM cache too, with the same keys
+    as its non-streamed calls.
+
+    LangChain only consults the cache for non-streamed calls, but AgentExecutor streams its LLM, so
+    without this the agents' own calls would never be recorded nor replayed.
+    """
+
+    def _cached(self, messages: List[Any], stop: Optional[List[str]], **kwargs: Any):
+        llm_cache = get_llm_cache()
+        if llm_cache is None or self.cache is False:
+            return None, None, None
+        prompt = dumps(messages)
+        llm_string = self._get_llm_string(stop=stop, **kwargs)
+        return llm_cache, prompt, llm_string
+
+    @staticmethod
+    def _to_chunks(generations: Sequence[Any]) -> List[ChatGenerationChunk]:
+        return [
+            ChatGenerationChunk(message=AIMessageChunk(content=g.message.content, additional_kwargs=g.message.additional_kwargs))
+            for g in generations
+        ]
+
+    @staticmethod
+    def _to_generations(chunks: List[ChatGenerationChunk]) -> List[ChatGeneration]:
+        aggregated = chunks[0]
+        for chunk in chunks[1:]:
+            aggregated += chunk
+        message = aggregated.message
+        return [ChatGeneration(message=AIMessage(content=message.content, additional_kwargs=message.additional_kwargs))]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        llm_cache, prompt, llm_string = self._cached(messages, stop, **kwargs)
+        if llm_cache is None:
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+
+        cached = llm_cache.lookup(prompt, llm_string)
+        if isinstance(cached, list):
+            for chunk in self._to_chunks(cached):
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+
+        chunks = []
+        for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            llm_cache.update(prompt, llm_string, self._to_generations(chunks))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        llm_cache, prompt, llm_string = self._cached(messages, stop, **kwargs)
+        if llm_cache is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        cached = await llm_cache.alookup(prompt, llm_string)
+        if isinstance(cached, list):
+            for chunk in self._to_chunks(cached):
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+
+        chunks = []
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            await llm_cache.aupdate(prompt, llm_string, self._to_generations(chunks))
+
+
+class ChatOpenAI(StreamingCacheMixin, _ChatOpenAI):
+    """`ChatOpenAI` whose streamed calls are recorded and replayed like the other ones."""
+
+
+def configure_llm_cache(mode: Optional[str] = None, path: Optional[str] = None) -> Optional[RecordReplayCache]:
+    """
+    Install the record/replay cache for every LLM and for the shared embeddings client.
+
+    `mode` and `path` default to the LLM_CACHE_MODE (passthrough) and LLM_CACHE_PATH environment
+    variables. In passthrough mode no cache is installed.
+    """
+    from agents.tools.vector_store import get_vector_store_registry
+
+    mode = mode or os.environ.get("LLM_CACHE_MODE", "passthrough")
+    path = path or os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite")
+    if mode == "passthrough":
+        set_llm_cache(None)
+        return None
+
+    # The OpenAI clients refuse to be built without a key, even though replay never uses it
+    if mode == "replay":
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+    cache = RecordReplayCache(path, mode)
+    set_llm_cache(cache)
+    get_vector_store_registry().set_embeddings_factory(lambda: RecordReplayEmbeddings(OpenAIEmbeddings(), cache))
+    logger.info(f"LLM cache in {mode} mode, stored in {path}")
+    return cache
@@ -6,15 +6,24 @@ from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.agents import AgentAction
-from langchain_openai import ChatOpenAI
+from agents.llm_cache import ChatOpenAI
 from langgraph.graph import StateGraph, END
 from agents.tools.tools import *
 from langchain_core.messages import AIMessage
-from typing import Any, Dict, List
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from typing import Any, Dict, List, Optional
 from agents.base_agent import Agent
+from agents.streaming import astream_runnable_events
+from agents.tracing import TracingCallbackHandler, tracing
 import time
 
 
+# LangGraph's internal runs: the hidden graph steps and the channel getters. Their outputs can be a
+# sentinel object that the event stream fails to serialize, and no typed event is built from them.
+GRAPH_INTERNAL_NAMES = ["RunnableLambda"]
+GRAPH_INTERNAL_TAGS = ["langsmith:hidden"]
+
+
 class BaseAgentNode:
     def __init__(self, llm: ChatOpenAI, tools: List[Any], system_prompt: str, name: str):
         self.llm = llm
@@ -32,9 +41,19 @@ class BaseAgentNode:
         agent = create_openai_tools_agent(self.llm, self.tools, prompt)
         return AgentExecutor(agent=agent, tools=self.tools, handle_parsing_errors=True, return_intermediate_steps=True)
 
-    def execute(self, state: Dict[str, Any]):
-        result = self.agent.invoke(state)
+    def execute(self, state: Dict[str, Any], config: Optional[RunnableConfig] = None):
+        result = self.agent.invoke(state, config)
+        return self.to_state_update(result)
+
+    async def aexecute(self, state: Dict[str, Any], config: Optional[RunnableConfig] = None):
+        result = await self.agent.ainvoke(state, config)
+        return self.to_state_update(result)
 
+    def as_runnable(self) -> RunnableLambda:
+        """Wrap the node so that the graph can run it both synchronously and asynchronously."""
+        return RunnableLambda(self.execute, afunc=self.aexecute, name=self.name)
+
+    def to_state_update(self, result: Dict[str, Any]):
         agent_trajectory = [AgentAction(tool=action.tool, tool_input=action.tool_input, log=action.log) for action, _ in result["intermediate_steps"]]
 
         messages = [
@@ -78,8 +97,8 @@ class AgentGraph(Agent):
         members = ["SQL", "VS"]
         supervisor_chain = self.create_supervisor_chain(system_prompt, members)
         
-        self.graph.add_node("SQL", sql_agent_node.execute)
-        self.graph.add_node("VS", vs_agent_node.execute)
+        self.graph.add_node("SQL", sql_agent_node.as_runnable())
+        self.graph.add_node("VS", vs_agent_node.as_runnable())
         self.graph.add_node("supervisor", supervisor_chain)
         
         for member in members:
@@ -114,23 +133,60 @@ class AgentGraph(Agent):
 
         return supervisor_chain
 
-    def execute_graph(self, input_message: str) -> str:
+    def execute_graph(self, input_message: str, callbacks: Optional[List[Any]] = None) -> str:
         response = self.graph.invoke(
             {
                 "messages": [HumanMessage(content=input_message)]
             },
-            {"recursion_limit": 100}
+            {"recursion_limit": 100, "callbacks": callbacks}
         )
         # Change to 'return response['messages'][-1].content' to just return the last message
         return response
 
+    async def aexecute_graph(self, input_message: str, callbacks: Optional[List[Any]] = None) -> str:
+        response = await self.graph.ainvoke(
+            {
+                "messages": [HumanMessage(content=input_message)]
+            },
+            {"recursion_limit": 100, "callbacks": callbacks}
+        )
+        return response
+
+    async def astream_graph(self, input_message: str):
+        async for event in astream_runnable_events(
+            self.graph,
+            {
+                "messages": [HumanMessage(content=input_message)]
+            },
+            {"recursion_limit": 100},
+            exclude_names=GRAPH_INTERNAL_NAMES,
+            exclude_tags=GRAPH_INTERNAL_TAGS,
+        ):
+            yield event
+
     # Implements the run_agent method in the Agent class
     def run_agent(self, query: str) -> str:
         start = time.time()
-        result = self.execute_graph(query)
+        with tracing() as trace:
+            result = self.execute_graph(query, callbacks=[TracingCallbackHandler(trace)])
         end = time.time()
+        result["trace"] = trace
+        return result, end-start
+
+    # Implements the arun_agent method in the Agent class
+    async def arun_agent(self, query: str) -> str:
+        start = time.time()
+        with tracing() as trace:
+            result = await self.aexecute_graph(query, callbacks=[TracingCallbackHandler(trace)])
+        end = time.time()
+        result["trace"] = trace
         return result, end-start
     
+    # Implements the astream_agent method in the Agent class
+    async def astream_agent(self, query: str):
+        async for event in self.astream_graph(query):
+            yield event
+
     # Implement the format_agent_response method in the Agent class
     def format_agent_response(self, output):
         """
@@ -141,7 +197,8 @@ class AgentGraph(Agent):
         result = {
             'output': output['messages'][-1].content,
             'agent_trajectory': '',
-            'steps': []
+            'steps': [],
+            'trace': output['trace'].summary() if 'trace' in output else None
         }
 
         # Extract agent trajectories
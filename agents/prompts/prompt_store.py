@@ -0,0 +1,87 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict
+from langchain_core.load import dumps, loads
+from langchain_core.prompts import BasePromptTemplate
+from loguru import logger
+
+BUNDLE_DIR = os.path.join(os.path.dirname(__file__), "bundle")
+MANIFEST_PATH = os.path.join(BUNDLE_DIR, "manifest.json")
+
+_lock = threading.Lock()
+
+
+def _read_manifest() -> Dict[str, Any]:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+def _write_manifest(manifest: Dict[str, Any]):
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def load_prompt(name: str, refresh: bool = False) -> BasePromptTemplate:
+    """
+    Load a prompt template, e.g. "hwchase17/react", from the bundle shipped with the package.
+
+    With `refresh=True` the prompt is first synced from the LangChain hub and stored in the bundle.
+    """
+    if refresh:
+        refresh_prompt(name)
+
+    entry = _read_manifest().get(name)
+    if entry is None:
+        raise ValueError(f"Prompt {name} is not in the bundle. Add it with: python -m agents.prompts.prompt_store --refresh {name}")
+
+    with open(os.path.join(BUNDLE_DIR, entry["file"])) as f:
+        content = f.read()
+    if hashlib.sha256(content.encode("utf-8")).hexdigest() != entry["sha256"]:
+        raise ValueError(f"Bundled prompt {entry['file']} does not match the hash in the manifest.")
+    return loads(content)
+
+def refresh_prompt(name: str) -> Dict[str, Any]:
+    """
+    Pull the latest version of the prompt from the LangChain hub and write it to the bundle as
+    `<owner>__<repo>.<hash>.json`. A new version is recorded in the manifest only if the content changed.
+    """
+    from langchain import hub
+
+    content = dumps(hub.pull(name), pretty=True) + "\n"
+    sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    with _lock:
+        manifest = _read_manifest()
+        entry = manifest.get(name)
+        if entry is not None and entry["sha256"] == sha256:
+            return entry
+
+        file_name = f"{name.replace('/', '__')}.{sha256[:12]}.json"
+        with open(os.path.join(BUNDLE_DIR, file_name), "w") as f:
+            f.write(content)
+
+        entry = {"file": file_name, "sha256": sha256, "version": (entry or {}).get("version", 0) + 1}
+        manifest[name] = entry
+        _write_manifest(manifest)
+
+    logger.info(f"Stored version {entry['version']} of prompt {name} in {file_name}")
+    return entry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the bundled prompt templates.")
+    parser.add_argument("--refresh", nargs="*", metavar="NAME", help="Re-sync the given prompts (all bundled prompts if none given) from the LangChain hub.")
+    args = parser.parse_args()
+
+    if args.refresh is not None:
+        for name in args.refresh or list(_read_manifest()):
+            refresh_prompt(name)
+    else:
+        for name, entry in sorted(_read_manifest().items()):
+            print(f"{name}: version {entry['version']} ({entry['file']})")
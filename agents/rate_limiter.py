@@ -0,0 +1,96 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests per minute and tokens per minute.
+
+    Both buckets start full, so a burst of up to one minute's budget goes through immediately;
+    after that callers are slowed down to the configured rates. A limit of None disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = requests_per_minute or 0.0
+        self._tokens = tokens_per_minute or 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        self._last = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _reserve(self, requests: float, tokens: float) -> float:
+        """Take the budget if it is available and return 0, otherwise return how long to wait for it."""
+        with self._lock:
+            self._refill(time.monotonic())
+            # A single call larger than the whole budget could never go through, cap it to the budget
+            if self.requests_per_minute:
+                requests = min(requests, self.requests_per_minute)
+            if self.tokens_per_minute:
+                tokens = min(tokens, self.tokens_per_minute)
+
+            wait = 0.0
+            if self.requests_per_minute and self._requests < requests:
+                wait = max(wait, (requests - self._requests) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            if wait == 0.0:
+                self._requests -= requests
+                self._tokens -= tokens
+            return wait
+
+    def acquire(self, requests: float = 1, tokens: float = 0):
+        """Block until `requests` requests and `tokens` tokens fit in the budget."""
+        while (wait := self._reserve(requests, tokens)) > 0:
+            time.sleep(wait)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about four characters per token for English."""
+    return len(text) // 4 + 1
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """
+    Charge every LLM call against a `RateLimiter` before it is sent: one request per prompt, and
+    the estimated prompt tokens plus `completion_tokens` for the answer.
+    """
+
+    def __init__(self, limiter: RateLimiter, completion_tokens: int = 256):
+        self.limiter = limiter
+        self.completion_tokens = completion_tokens
+
+    def _acquire(self, prompts):
+        self.limiter.acquire(requests=len(prompts), tokens=sum(estimate_tokens(prompt) + self.completion_tokens for prompt in prompts))
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._acquire(prompts)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._acquire(["\n".join(str(message.content) for message in batch) for batch in messages])
+
+
+# Handler added by LangChain to every run started while it is set, including the LLM calls tools make on their own
+_rate_limit_callback: contextvars.ContextVar[Optional[RateLimitCallbackHandler]] = contextvars.ContextVar("rate_limit_callback", default=None)
+register_configure_hook(_rate_limit_callback, inheritable=True)
+
+@contextmanager
+def rate_limited(limiter: RateLimiter, completion_tokens: int = 256) -> Iterator[RateLimitCallbackHandler]:
+    """Charge every LLM call made in the block (and in the threads and tasks it starts) against `limiter`."""
+    token = _rate_limit_callback.set(RateLimitCallbackHandler(limiter, completion_tokens))
+    try:
+        yield _rate_limit_callback.get()
+    finally:
+        _rate_limit_callback.reset(token)
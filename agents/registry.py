@@ -0,0 +1,66 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from loguru import logger
+
+
+class LazyRegistry:
+    """
+    Registry of named objects that are only built the first time they are requested.
+
+    Each entry is built at most once per process; concurrent requests for an entry that is being
+    built wait for it instead of building it again. `prewarm` builds chosen entries in a background
+    thread so that they are ready by the time they are needed.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Callable[[], Any]]] = None):
+        self._factories: Dict[str, Callable[[], Any]] = dict(factories or {})
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in self._factories}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register (or replace) the factory for `name`. A previously built instance is dropped."""
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the entry `name`, building it if needed."""
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._factories:
+            raise ValueError(f"Unknown entry: {name}. Expected one of {self.keys()}.")
+
+        with self._locks[name]:
+            if name not in self._instances:
+                logger.info(f"Building '{name}'")
+                self._instances[name] = self._factories[name]()
+        return self._instances[name]
+
+    def __getitem__(self, name: str) -> Any:
+        return self.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def keys(self) -> List[str]:
+        return list(self._factories)
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def prewarm(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Build the given entries (all of them by default) in a background thread."""
+        names = [name for name in (self.keys() if names is None else names) if name]
+
+        def build():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.warning(f"Pre-warming '{name}' failed: {e}")
+
+        thread = threading.Thread(target=build, name="registry-prewarm", daemon=True)
+        thread.start()
+        return thread
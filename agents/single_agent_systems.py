@@ -1,8 +1,10 @@
 from typing import List
-from langchain_openai import ChatOpenAI
+from agents.llm_cache import ChatOpenAI
 from langchain.agents import AgentExecutor, create_react_agent, create_openai_tools_agent
-from langchain import hub
+from agents.prompts.prompt_store import load_prompt
 from agents.base_agent import Agent
+from agents.streaming import astream_runnable_events
+from agents.tracing import TracingCallbackHandler, tracing
 from agents.tools.tools import *
 import time
 
@@ -15,11 +17,38 @@ class SingleAgentSystem(Agent):
             raise Exception("Agent not initialized.")
 
         start = time.time()
-        result = self.agent.invoke({"input": query})
+        with tracing() as trace:
+            result = self.agent.invoke({"input": query}, {"callbacks": [TracingCallbackHandler(trace)]})
         end = time.time()
+        result["trace"] = trace
         
         return result, end-start
 
+    async def arun_agent(self, query: str) -> str:
+        """
+        Run the agent asynchronously.
+        """
+        if not self.agent:
+            raise Exception("Agent not initialized.")
+
+        start = time.time()
+        with tracing() as trace:
+            result = await self.agent.ainvoke({"input": query}, {"callbacks": [TracingCallbackHandler(trace)]})
+        end = time.time()
+        result["trace"] = trace
+
+        return result, end-start
+
+    async def astream_agent(self, query: str):
+        """
+        Run the agent and yield typed events while it runs.
+        """
+        if not self.agent:
+            raise Exception("Agent not initialized.")
+
+        async for event in astream_runnable_events(self.agent, {"input": query}):
+            yield event
+
 class ReactAgent(SingleAgentSystem):
     """
     Class for customizing the React Agent.
@@ -28,7 +57,7 @@ class ReactAgent(SingleAgentSystem):
     def __init__(self, tools_list: List[Tool] = []):
         self.tools_list = tools_list
         self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0)
-        self.template = hub.pull("hwchase17/react")
+        self.template = load_prompt("hwchase17/react")
         
         react_agent = create_react_agent(self.llm, self.tools_list, self.template)
         self.agent = AgentExecutor(agent=react_agent, tools=self.tools_list, return_intermediate_steps=True, verbose=True, handle_parsing_errors=True)
@@ -42,7 +71,8 @@ class ReactAgent(SingleAgentSystem):
         result = {
             'output': output.get('output', ''),
             'agent_trajectory': '',
-            'steps': []
+            'steps': [],
+            'trace': output['trace'].summary() if 'trace' in output else None
         }
 
         # Extract intermediate steps
@@ -84,7 +114,7 @@ class OpenAIToolsAgent(SingleAgentSystem):
     def __init__(self, tools_list: List[Tool] = []):
         self.tools_list = tools_list
         self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0)
-        self.template = hub.pull("hwchase17/openai-tools-agent")
+        self.template = load_prompt("hwchase17/openai-tools-agent")
 
         openai_tools_agent = create_openai_tools_agent(self.llm, self.tools_list, self.template)
         self.agent = AgentExecutor(agent=openai_tools_agent, tools=self.tools_list, return_intermediate_steps=True, verbose=True, handle_parsing_errors=True)
@@ -98,7 +128,8 @@ class OpenAIToolsAgent(SingleAgentSystem):
         result = {
             'output': output.get('output', ''),
             'agent_trajectory': '',
-            'steps': []
+            'steps': [],
+            'trace': output['trace'].summary() if 'trace' in output else None
         }
 
         # Extract intermediate steps
@@ -0,0 +1,110 @@
+import asyncio
+import queue
+import threading
+import time
+from contextlib import suppress
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from langchain_core.runnables import Runnable, RunnableConfig
+from agents.tracing import Trace, TracingCallbackHandler, tracing
+
+# Typed events yielded while an agent runs:
+# - {"type": "route", "next": ...}                             supervisor routing decision
+# - {"type": "tool_call", "tool": ..., "input": ...}           a tool is called
+# - {"type": "tool_observation", "tool": ..., "output": ...}   the tool returned
+# - {"type": "token", "content": ...}                          a token generated by an agent's LLM
+# - {"type": "final", "output": ..., "time": ...}              raw output of the run with its "trace", for format_agent_response
+EVENT_TYPES = ["route", "tool_call", "tool_observation", "token", "final"]
+
+
+async def astream_runnable_events(
+    runnable: Runnable,
+    input: Any,
+    config: Optional[RunnableConfig] = None,
+    supervisor: str = "supervisor",
+    exclude_names: Optional[List[str]] = None,
+    exclude_tags: Optional[List[str]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run `runnable` through `astream_events` and translate the LangChain events into typed agent events.
+    The run is traced as by `run_agent`; runs matching `exclude_names` or `exclude_tags` are left out of the stream.
+    """
+    trace = Trace()
+    config = dict(config or {})
+    config["callbacks"] = [*(config.get("callbacks") or []), TracingCallbackHandler(trace)]
+    with tracing(trace):
+        async for event in _translate_events(runnable.astream_events(input, config, version="v1", exclude_names=exclude_names, exclude_tags=exclude_tags), supervisor):
+            if event["type"] == "final" and isinstance(event["output"], dict):
+                event["output"] = {**event["output"], "trace": trace}
+            yield event
+
+async def _translate_events(events: AsyncIterator[Dict[str, Any]], supervisor: str) -> AsyncIterator[Dict[str, Any]]:
+    start = time.time()
+    root_run_id = None
+    async for event in events:
+        kind = event["event"]
+        data = event.get("data", {})
+        if root_run_id is None:
+            root_run_id = event["run_id"]
+
+        if kind == "on_chat_model_stream":
+            content = data["chunk"].content
+            if content:
+                yield {"type": "token", "content": content}
+        elif kind == "on_tool_start":
+            yield {"type": "tool_call", "tool": event["name"], "input": data.get("input")}
+        elif kind == "on_tool_end":
+            yield {"type": "tool_observation", "tool": event["name"], "output": data.get("output")}
+        elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+            output = data.get("output")
+            # A LangGraph graph reports its final state under the END node
+            if isinstance(output, dict) and "__end__" in output:
+                output = output["__end__"]
+            yield {"type": "final", "output": output, "time": time.time() - start}
+        elif kind == "on_chain_end" and event["name"] == supervisor:
+            output = data.get("output")
+            if isinstance(output, dict) and "next" in output:
+                yield {"type": "route", "next": output["next"]}
+
+def iterate_in_thread(events: AsyncIterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Consume an async iterator on an event loop in a background thread and yield its items
+    synchronously, so that streaming can be used from synchronous code such as Streamlit.
+    """
+    items: "queue.Queue" = queue.Queue()
+    done = object()
+
+    async def consume():
+        try:
+            async for item in events:
+                items.put(item)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(consume())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+    thread = threading.Thread(target=run, name="agent-stream", daemon=True)
+    thread.start()
+    try:
+        while (item := items.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # The consumer may stop early: cancel the run and wait for the loop to shut down
+        if thread.is_alive():
+            with suppress(RuntimeError):  # the loop already closed
+                loop.call_soon_threadsafe(task.cancel)
+        thread.join()
@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, MutableMapping, Optional, Union
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from agents.tools.faiss_index import MemmapFlatIndex, index_type_of, reconstruct_vectors
+from agents.tools.retrieval import read_docstore
+
+
+def sqlite_docstore_path(folder_path: str, index_name: str = "index") -> str:
+    return os.path.join(folder_path, f"{index_name}.docstore.sqlite")
+
+def flat_vectors_path(folder_path: str, index_name: str = "index") -> str:
+    return os.path.join(folder_path, f"{index_name}.vectors.npy")
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore kept in a SQLite file instead of a pickled dict.
+
+    Opening it reads nothing upfront, and documents are read on demand through the OS page cache,
+    which every process opening the file shares. Read-only stores use one connection per thread. A
+    writable store keeps its additions in a transaction until `commit`.
+    """
+
+    def __init__(self, path: str, read_only: bool = True):
+        self.path = path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        if not read_only:
+            self._writer = sqlite3.connect(path, check_same_thread=False)
+            self._writer.execute(
+                "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, position INTEGER UNIQUE, page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+            self._writer.commit()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._writer is not None:
+            return self._writer
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return self._local.connection
+
+    def _execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        if self._writer is None:
+            return self.connection.execute(sql, parameters)
+        with self._lock:
+            return self._writer.execute(sql, parameters)
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._execute("SELECT page_content, metadata FROM documents WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        if self._writer is None:
+            raise ValueError(f"{self.path} was opened read-only.")
+        with self._lock:
+            self._writer.executemany(
+                "INSERT INTO documents (id, page_content, metadata) VALUES (?, ?, ?)",
+                [(doc_id, doc.page_content, json.dumps(doc.metadata)) for doc_id, doc in texts.items()],
+            )
+
+    def delete(self, ids: List) -> None:
+        """
+        Delete documents. `FAISS.delete` then moves the following vectors down in the index and in a
+        dict it replaces `index_to_docstore_id` with; `save_sqlite_store` stores their new positions.
+        """
+        if self._writer is None:
+            raise ValueError(f"{self.path} was opened read-only.")
+        with self._lock:
+            self._writer.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in ids])
+
+    def set_positions(self, doc_ids: List[str]):
+        """Make `doc_ids` the documents at positions 0, 1, ..., in that order; the other documents get none."""
+        with self._lock:
+            self._writer.execute("UPDATE documents SET position = NULL WHERE position IS NOT NULL")
+            self._writer.executemany("UPDATE documents SET position = ? WHERE id = ?", list(enumerate(doc_ids)))
+
+    def commit(self):
+        if self._writer is not None:
+            with self._lock:
+                self._writer.commit()
+
+    def documents(self) -> Iterator[Document]:
+        """Indexed documents in index order."""
+        for page_content, metadata in self._execute("SELECT page_content, metadata FROM documents WHERE position IS NOT NULL ORDER BY position"):
+            yield Document(page_content=page_content, metadata=json.loads(metadata))
+
+
+class SQLiteIndexToDocstoreId(MutableMapping[int, str]):
+    """The `index_to_docstore_id` mapping of FAISS, stored as the positions of the documents of a `SQLiteDocstore`."""
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+
+    def __getitem__(self, position: int) -> str:
+        row = self.docstore._execute("SELECT id FROM documents WHERE position = ?", (int(position),)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __setitem__(self, position: int, doc_id: str):
+        self.docstore._execute("UPDATE documents SET position = ? WHERE id = ?", (int(position), doc_id))
+
+    def __delitem__(self, position: int):
+        self.docstore._execute("UPDATE documents SET position = NULL WHERE position = ?", (int(position),))
+
+    def __len__(self) -> int:
+        return self.docstore._execute("SELECT COUNT(*) FROM documents WHERE position IS NOT NULL").fetchone()[0]
+
+    def __iter__(self) -> Iterator[int]:
+        return (row[0] for row in self.docstore._execute("SELECT position FROM documents WHERE position IS NOT NULL ORDER BY position").fetchall())
+
+    def values(self) -> List[str]:
+        return [row[0] for row in self.docstore._execute("SELECT id FROM documents WHERE position IS NOT NULL ORDER BY position").fetchall()]
+
+    def truncate(self, length: int):
+        """Drop the documents at positions `length` and beyond, e.g. left by a save interrupted before the index was written."""
+        self.docstore._execute("DELETE FROM documents WHERE position >= ? OR position IS NULL", (length,))
+
+
+def load_sqlite_store(folder_path: str, embeddings: Embeddings, index_name: str = "index", read_only: bool = True) -> FAISS:
+    """
+    Load a store saved by `save_sqlite_store`. Read-only stores are memory-mapped and shared by every
+    process through the page cache: flat indexes through their .npy vectors (see `MemmapFlatIndex`),
+    IVF indexes by opening them with `IO_FLAG_MMAP`. HNSW graphs are still read into memory.
+    """
+    faiss_path = os.path.join(folder_path, f"{index_name}.faiss")
+    vectors_path = flat_vectors_path(folder_path, index_name)
+    # The vectors are written after the FAISS file: an older .npy belongs to a previous index
+    if read_only and os.path.exists(vectors_path) and os.stat(vectors_path).st_mtime_ns >= os.stat(faiss_path).st_mtime_ns:
+        index = MemmapFlatIndex(vectors_path)
+    else:
+        index = faiss.read_index(faiss_path, faiss.IO_FLAG_MMAP if read_only else 0)
+    docstore = SQLiteDocstore(sqlite_docstore_path(folder_path, index_name), read_only=read_only)
+    return FAISS(embeddings, index, docstore, SQLiteIndexToDocstoreId(docstore))
+
+def save_sqlite_store(store: FAISS, folder_path: str, index_name: str = "index"):
+    """
+    Save the store as a FAISS index file and a SQLite docstore, next to (or instead of) the pickled docstore.
+
+    The docstore is committed before the index file is moved in place; documents the index does not
+    hold yet are never returned by a search, and are dropped when the store is opened for writing.
+    """
+    path = sqlite_docstore_path(folder_path, index_name)
+    if isinstance(store.docstore, SQLiteDocstore):
+        if not isinstance(store.index_to_docstore_id, SQLiteIndexToDocstoreId):
+            # `FAISS.delete` replaces the mapping with a dict
+            store.docstore.set_positions([doc_id for _, doc_id in sorted(store.index_to_docstore_id.items())])
+            store.index_to_docstore_id = SQLiteIndexToDocstoreId(store.docstore)
+        store.docstore.commit()
+    else:
+        # Convert a store loaded from the pickled format
+        docstore = SQLiteDocstore(path, read_only=False)
+        rows = []
+        for position, doc_id in store.index_to_docstore_id.items():
+            document = store.docstore.search(doc_id)
+            rows.append((doc_id, position, document.page_content, json.dumps(document.metadata)))
+        docstore._execute("DELETE FROM documents")
+        docstore.connection.executemany("INSERT INTO documents (id, position, page_content, metadata) VALUES (?, ?, ?, ?)", rows)
+        docstore.commit()
+
+    tmp_path = os.path.join(folder_path, f"{index_name}.faiss.tmp")
+    faiss.write_index(store.index, tmp_path)
+    os.replace(tmp_path, os.path.join(folder_path, f"{index_name}.faiss"))
+
+    vectors_path = flat_vectors_path(folder_path, index_name)
+    if index_type_of(store.index) == "flat":
+        tmp_path = os.path.join(folder_path, f"{index_name}.vectors.tmp.npy")
+        np.save(tmp_path, reconstruct_vectors(store.index))
+        os.replace(tmp_path, vectors_path)
+    elif os.path.exists(vectors_path):
+        os.remove(vectors_path)
+
+def read_documents(folder_path: str, index_name: str = "index") -> List[Document]:
+    """Documents of the store saved in `folder_path`, in index order, from the SQLite docstore if there is one."""
+    path = sqlite_docstore_path(folder_path, index_name)
+    if os.path.exists(path):
+        return list(SQLiteDocstore(path).documents())
+    return read_docstore(os.path.join(folder_path, f"{index_name}.pkl"))
@@ -0,0 +1,144 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from agents.tracing import record_cache
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase the query and collapse whitespace, so near-identical searches share an embedding."""
+    return " ".join(text.lower().split())
+
+def normalize_document(text: str) -> str:
+    """Collapse whitespace; the case of documents is kept."""
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings cache in front of another embeddings client.
+
+    Vectors are keyed by the model name and the normalized text, and kept as float32 in a bounded
+    in-memory LRU. With `persist_path`, they are also stored in a SQLite file, read when they fall
+    out of memory or after a restart. `embed_documents` only sends the texts missing from the cache,
+    in one batch.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_entries: int = 10000, persist_path: Optional[str] = None):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._con = None
+        if persist_path:
+            self._con = sqlite3.connect(persist_path, check_same_thread=False)
+            self._con.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._con.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                return vector
+            if self._con is None:
+                return None
+            row = self._con.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        self._remember(key, vector)
+        return vector
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _put(self, items: List[Tuple[str, np.ndarray]]):
+        for key, vector in items:
+            self._remember(key, vector)
+        if self._con is not None:
+            with self._lock:
+                self._con.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", [(key, vector.tobytes()) for key, vector in items])
+                self._con.commit()
+
+    def _lookup(self, keys: List[str]) -> Tuple[Dict[str, np.ndarray], List[int]]:
+        """Cached vectors by key, and the positions of the first occurrence of each missing key."""
+        found, missing, seen = {}, [], set()
+        for i, key in enumerate(keys):
+            if key in found or key in seen:
+                continue
+            vector = self._get(key)
+            if vector is None:
+                missing.append(i)
+                seen.add(key)
+            else:
+                found[key] = vector
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return found, missing
+
+    def _store(self, keys: List[str], missing: List[int], vectors: List[List[float]], found: Dict[str, np.ndarray]) -> List[List[float]]:
+        items = [(keys[i], np.asarray(vector, dtype=np.float32)) for i, vector in zip(missing, vectors)]
+        if items:
+            self._put(items)
+        found.update(items)
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(normalize_document(text)) for text in texts]
+        found, missing = self._lookup(keys)
+        vectors = self.embeddings.embed_documents([texts[i] for i in missing]) if missing else []
+        return self._store(keys, missing, vectors, found)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(normalize_query(text))
+        found, missing = self._lookup([key])
+        record_cache("embedding_cache", hit=not missing)
+        vectors = [self.embeddings.embed_query(text)] if missing else []
+        return self._store([key], missing, vectors, found)[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries with the cache keys of `embed_query`, sending the missing ones in one batch."""
+        keys = [self._key(normalize_query(text)) for text in texts]
+        found, missing = self._lookup(keys)
+        for key in keys:
+            record_cache("embedding_cache", hit=key in found)
+        vectors = self.embeddings.embed_documents([texts[i] for i in missing]) if missing else []
+        return self._store(keys, missing, vectors, found)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(normalize_document(text)) for text in texts]
+        found, missing = self._lookup(keys)
+        vectors = await self.embeddings.aembed_documents([texts[i] for i in missing]) if missing else []
+        return self._store(keys, missing, vectors, found)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(normalize_query(text))
+        found, missing = self._lookup([key])
+        record_cache("embedding_cache", hit=not missing)
+        vectors = [await self.embeddings.aembed_query(text)] if missing else []
+        return self._store([key], missing, vectors, found)[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Drop the in-memory entries; the persistent tier is kept."""
+        with self._lock:
+            self._entries.clear()
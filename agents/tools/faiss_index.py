@@ -0,0 +1,148 @@
+from typing import Dict, Optional
+import faiss
+import numpy as np
+from loguru import logger
+
+# Index types the builder can create; "flat" is the exact index FAISS.from_texts makes
+INDEX_TYPES = ["flat", "ivf_flat", "ivf_pq", "hnsw"]
+
+# Index types trained on the vectors before any is added
+TRAINED_INDEX_TYPES = ["ivf_flat", "ivf_pq"]
+
+# FAISS recommends at least this many training points per IVF list, and uses at most MAX_POINTS_PER_LIST
+MIN_POINTS_PER_LIST = 39
+MAX_POINTS_PER_LIST = 256
+
+# Search settings tried, cheapest first, to reach a target recall
+NPROBE_SWEEP = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256, 512, 1024]
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """The `INDEX_TYPES` entry matching a FAISS index."""
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    return "flat"
+
+def training_sample(vectors: np.ndarray, n: int, seed: int = 0) -> np.ndarray:
+    """At most `n` vectors drawn uniformly across `vectors`, so training sees all of the input and not only its start."""
+    if len(vectors) <= n:
+        return vectors
+    rows = np.sort(np.random.default_rng(seed).choice(len(vectors), size=n, replace=False))
+    return vectors[rows]
+
+def make_index(
+    index_type: str,
+    vectors: np.ndarray,
+    nlist: int = 1024,
+    pq_m: int = 16,
+    pq_nbits: int = 8,
+    hnsw_m: int = 32,
+) -> faiss.Index:
+    """
+    Create an empty L2 index of `index_type`, trained on `vectors` when it needs training. Pass all
+    the vectors to be indexed: they are sampled down to what the training uses.
+
+    - ivf_flat: `nlist` inverted lists of full vectors, searched `nprobe` lists at a time.
+    - ivf_pq: the same lists with vectors compressed to `pq_m` codes of `pq_nbits` bits.
+    - hnsw: a graph with `hnsw_m` links per vector, searched with `efSearch` candidates.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Invalid index type: {index_type}. Expected one of {INDEX_TYPES}.")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dimension = vectors.shape
+
+    if index_type in ["ivf_flat", "ivf_pq"]:
+        lists = max(1, min(nlist, n // MIN_POINTS_PER_LIST))
+        if lists < nlist:
+            logger.warning(f"Only {n} training vectors, using {lists} IVF lists instead of {nlist}")
+        nlist = lists
+    if index_type == "ivf_pq":
+        if dimension % pq_m:
+            raise ValueError(f"The vector dimension {dimension} is not a multiple of pq_m={pq_m}.")
+        if n < 2 ** pq_nbits:
+            raise ValueError(f"IVF-PQ with {pq_nbits} bits codes needs at least {2 ** pq_nbits} training vectors, got {n}.")
+
+    spec = {
+        "flat": "Flat",
+        "ivf_flat": f"IVF{nlist},Flat",
+        "ivf_pq": f"IVF{nlist},PQ{pq_m}x{pq_nbits}",
+        "hnsw": f"HNSW{hnsw_m}",
+    }[index_type]
+    index = faiss.index_factory(dimension, spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(training_sample(vectors, MAX_POINTS_PER_LIST * max(nlist, 2 ** pq_nbits)))
+    return index
+
+class MemmapFlatIndex:
+    """
+    Exact L2 index over vectors memory-mapped from a .npy file, written next to the FAISS file of a
+    flat index by `save_sqlite_store`. FAISS reads a flat index file into memory; this index only
+    maps the vectors, so processes serving the same file share its pages through the page cache.
+
+    Implements the part of `faiss.Index` the LangChain FAISS store uses when searching.
+    """
+
+    metric_type = faiss.METRIC_L2
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vectors = np.load(path, mmap_mode="r")
+        self.ntotal, self.d = self.vectors.shape
+        self.is_trained = True
+
+    def search(self, queries: np.ndarray, k: int):
+        return faiss.knn(queries, self.vectors, k)
+
+    def reconstruct(self, key: int) -> np.ndarray:
+        return np.array(self.vectors[key])
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return np.array(self.vectors[start:start + n])
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Set how many IVF lists (`nprobe`) or HNSW candidates (`ef_search`) a search visits; ignored by other indexes."""
+    index_type = index_type_of(index)
+    if nprobe and index_type in ["ivf_flat", "ivf_pq"]:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    if ef_search and index_type == "hnsw":
+        index.hnsw.efSearch = ef_search
+
+def tune_search_params(index: faiss.Index, vectors: np.ndarray, target_recall: float, k: int = 4, queries: int = 200) -> Dict[str, float]:
+    """
+    Set the smallest `nprobe` (IVF) or `efSearch` (HNSW) at which `index`, holding `vectors`, finds
+    at least `target_recall` of the exact `k` nearest neighbours of `queries` vectors sampled from
+    them. Both settings are saved with the index. Returns the setting and the recall it reached.
+    """
+    index_type = index_type_of(index)
+    if index_type == "flat":
+        return {"recall": 1.0}
+    if index_type == "hnsw":
+        sweep = [{"ef_search": ef_search} for ef_search in EF_SEARCH_SWEEP]
+    else:
+        nlist = faiss.extract_index_ivf(index).nlist
+        sweep = [{"nprobe": nprobe} for nprobe in NPROBE_SWEEP if nprobe < nlist] + [{"nprobe": nlist}]
+
+    sample = np.ascontiguousarray(training_sample(vectors, queries, seed=1), dtype=np.float32)
+    _, exact = faiss.knn(sample, np.ascontiguousarray(vectors, dtype=np.float32), k)
+    for params in sweep:
+        set_search_params(index, **params)
+        _, found = index.search(sample, k)
+        recall = float(np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)]))
+        if recall >= target_recall:
+            break
+    else:
+        logger.warning(f"{index_type} index reaches a recall of {recall:.3f} at most, below the target {target_recall}")
+    logger.info(f"Searching the {index_type} index with {params}, recall@{k} {recall:.3f}")
+    return {**params, "recall": recall}
+
+def reconstruct_vectors(index: faiss.Index) -> np.ndarray:
+    """All the vectors stored in a flat or HNSW index, in index order."""
+    if index_type_of(index) in ["ivf_flat", "ivf_pq"]:
+        raise ValueError("Vectors cannot be read back from an IVF index, convert from the flat index instead.")
+    return index.reconstruct_n(0, index.ntotal)
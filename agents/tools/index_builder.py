@@ -0,0 +1,259 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from dotenv import load_dotenv
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from agents.tools.docstore import load_sqlite_store, save_sqlite_store, sqlite_docstore_path
+from agents.tools.faiss_index import INDEX_TYPES, TRAINED_INDEX_TYPES, index_type_of, make_index, reconstruct_vectors, tune_search_params
+from agents.tools.retrieval import read_docstore
+from agents.tools.vector_store import get_vector_store_registry
+
+# Formats the docstore is saved in: the pickled dict of FAISS.save_local, or a SQLite file read on demand
+STORAGE_FORMATS = ["pickle", "sqlite"]
+
+# Boilerplate the job board appends to every description
+BOILERPLATE = "Job Description Â\xa0 Send me Jobs like this"
+
+
+def clean_description(text: str) -> str:
+    """Drop the job board boilerplate and lowercase, as the descriptions already indexed were."""
+    return text.replace(BOILERPLATE, "").lower().strip()
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def read_source(path: str, text_field: str = "jobdescription", metadata_fields: Iterable[str] = (), sep: str = ";") -> Iterator[Dict[str, Any]]:
+    """Stream {'text', 'metadata'} records from a CSV (with separator `sep`) or a JSONL file."""
+    metadata_fields = list(metadata_fields)
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".json")):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            csv.field_size_limit(sys.maxsize)
+            rows = csv.DictReader(f, delimiter=sep)
+        for row in rows:
+            if row.get(text_field):
+                yield {"text": row[text_field], "metadata": {field: row.get(field) for field in metadata_fields}}
+
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class IndexBuilder:
+    """
+    Incrementally add documents to the FAISS index saved in `folder_path`.
+
+    Each document is identified in the docstore by the hash of its cleaned text, so documents already
+    indexed are skipped without being embedded. New texts are embedded in batches of `batch_size`,
+    `max_workers` batches at a time, and appended to the index, which is saved in the format
+    `FAISS.load_local` (and so `job_description_search`) reads.
+
+    The index is of `index_type`, flat by default. IVF indexes are trained on a sample across all the
+    documents: documents are added to a flat index, converted to `index_type` by the final `save`.
+    Passing another `index_type` than the one of an existing flat or HNSW index converts it the same
+    way. Documents added to an existing IVF index are assigned to the lists it was trained with.
+
+    With `target_recall`, the index is searched with the fewest IVF lists or HNSW candidates that
+    find that share of the exact nearest neighbours, a setting saved with the index.
+
+    The docstore is saved in `storage` format, by default the one the index already uses (pickle for
+    a new index). With "sqlite", worker processes load the index without unpickling every document.
+    """
+
+    def __init__(
+        self,
+        folder_path: str = "data/",
+        index_name: str = "index",
+        embeddings: Optional[Embeddings] = None,
+        batch_size: int = 64,
+        max_workers: int = 4,
+        min_length: int = 200,
+        index_type: Optional[str] = None,
+        nlist: int = 1024,
+        pq_m: int = 16,
+        pq_nbits: int = 8,
+        hnsw_m: int = 32,
+        storage: Optional[str] = None,
+        target_recall: Optional[float] = None,
+    ):
+        if storage is not None and storage not in STORAGE_FORMATS:
+            raise ValueError(f"Invalid storage format: {storage}. Expected one of {STORAGE_FORMATS}.")
+        self.folder_path = folder_path
+        self.index_name = index_name
+        self.embeddings = embeddings or get_vector_store_registry().embeddings
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.min_length = min_length
+        self.index_type = index_type
+        self.index_params = {"nlist": nlist, "pq_m": pq_m, "pq_nbits": pq_nbits, "hnsw_m": hnsw_m}
+        self.target_recall = target_recall
+        self.storage = storage or ("sqlite" if os.path.exists(sqlite_docstore_path(folder_path, index_name)) else "pickle")
+        self.store: Optional[FAISS] = None
+        self.known_hashes = set()
+        self._load()
+        if self.store is not None and index_type is not None and index_type_of(self.store.index) != index_type:
+            if index_type_of(self.store.index) in TRAINED_INDEX_TYPES:
+                raise ValueError("Vectors cannot be read back from an IVF index, convert from the flat index instead.")
+            logger.info(f"Index '{self.index_name}' will be converted to {index_type} when saved")
+
+    def _load(self):
+        faiss_path = os.path.join(self.folder_path, f"{self.index_name}.faiss")
+        docstore_path = os.path.join(self.folder_path, f"{self.index_name}.pkl")
+        if os.path.exists(faiss_path) and os.path.exists(sqlite_docstore_path(self.folder_path, self.index_name)):
+            self.store = load_sqlite_store(self.folder_path, self.embeddings, self.index_name, read_only=False)
+            # Documents added after the index file was last written have no vectors, index them again
+            self.store.index_to_docstore_id.truncate(self.store.index.ntotal)
+            # Hashed from the texts: a store converted from a pickle keeps the docstore ids it had, e.g. UUIDs
+            self.known_hashes = {content_hash(document.page_content) for document in self.store.docstore.documents()}
+            logger.info(f"Loaded index '{self.index_name}' with {len(self.known_hashes)} documents")
+        elif os.path.exists(faiss_path):
+            self.store = FAISS.load_local(self.folder_path, self.embeddings, index_name=self.index_name)
+            documents = [self.store.docstore.search(doc_id) for doc_id in self.store.index_to_docstore_id.values()]
+            self.known_hashes = {content_hash(document.page_content) for document in documents}
+            logger.info(f"Loaded index '{self.index_name}' with {len(self.known_hashes)} documents")
+        elif os.path.exists(docstore_path):
+            # A docstore without its vectors: embed its documents again, the index starts from them
+            logger.warning(f"{faiss_path} is missing, re-embedding the documents of {docstore_path}")
+            documents = read_docstore(docstore_path)
+            self.add([{"text": document.page_content, "metadata": document.metadata} for document in documents], clean=False)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed `texts` in parallel batches, keeping their order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            batches = pool.map(self.embeddings.embed_documents, chunked(texts, self.batch_size))
+            return [vector for batch in batches for vector in batch]
+
+    def add(self, records: List[Dict[str, Any]], clean: bool = True) -> int:
+        """
+        Embed and index the records that are not indexed yet; return how many were added. With
+        `clean`, texts are cleaned first and the ones shorter than `min_length` are skipped.
+        """
+        texts, metadatas, ids = [], [], []
+        for record in records:
+            text = clean_description(record["text"]) if clean else record["text"]
+            digest = content_hash(text)
+            if (clean and len(text) < self.min_length) or digest in self.known_hashes:
+                continue
+            self.known_hashes.add(digest)
+            texts.append(text)
+            metadatas.append(record.get("metadata") or {})
+            ids.append(digest)
+        if not texts:
+            return 0
+
+        vectors = self.embed(texts)
+        if self.store is None:
+            # Trained indexes start flat, they are trained on all the documents when converted
+            index_type = "flat" if self.index_type in TRAINED_INDEX_TYPES else self.index_type or "flat"
+            index = make_index(index_type, np.array(vectors, dtype=np.float32), **self.index_params)
+            self.store = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        self.store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        return len(texts)
+
+    def convert(self, index_type: str):
+        """Rebuild the index as `index_type` from the vectors of the current one, without embedding again."""
+        vectors = reconstruct_vectors(self.store.index)
+        logger.info(f"Converting index '{self.index_name}' from {index_type_of(self.store.index)} to {index_type}")
+        index = make_index(index_type, vectors, **self.index_params)
+        index.add(vectors)
+        if self.target_recall is not None:
+            tune_search_params(index, vectors, self.target_recall)
+        self.store.index = index
+
+    def finish(self):
+        """Convert the index to `index_type` now that all its documents are added, or tune the search of an HNSW index."""
+        if self.store is None:
+            return
+        if self.index_type is not None and index_type_of(self.store.index) != self.index_type:
+            self.convert(self.index_type)
+        elif self.target_recall is not None and index_type_of(self.store.index) == "hnsw":
+            tune_search_params(self.store.index, reconstruct_vectors(self.store.index), self.target_recall)
+
+    def save(self, final: bool = True):
+        """
+        Save the index next to the previous one, then move the files in place, so a reader never
+        loads a half-written file. A `final` save converts the index to `index_type` first; the
+        others keep a flat index that more documents are added to.
+        """
+        if self.store is None:
+            return
+        if final:
+            self.finish()
+        os.makedirs(self.folder_path, exist_ok=True)
+        if self.storage == "sqlite":
+            converted = not os.path.exists(sqlite_docstore_path(self.folder_path, self.index_name))
+            save_sqlite_store(self.store, self.folder_path, self.index_name)
+            if converted:
+                # Keep adding to the SQLite docstore rather than to the in-memory one loaded from the pickle
+                self.store = load_sqlite_store(self.folder_path, self.embeddings, self.index_name, read_only=False)
+            return
+        tmp_dir = tempfile.mkdtemp(dir=self.folder_path)
+        try:
+            self.store.save_local(tmp_dir, index_name=self.index_name)
+            for extension in ["faiss", "pkl"]:
+                file_name = f"{self.index_name}.{extension}"
+                os.replace(os.path.join(tmp_dir, file_name), os.path.join(self.folder_path, file_name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def build(self, records: Iterable[Dict[str, Any]], chunk_size: int = 1000) -> int:
+        """
+        Index the records chunk by chunk, saving after each chunk so an interrupted build keeps its
+        progress, and make the final save.
+        """
+        added = 0
+        for chunk in chunked(records, chunk_size):
+            added += self.add(chunk)
+            self.save(final=False)
+            logger.info(f"Indexed {added} new documents, {len(self.known_hashes)} in total")
+        self.save()
+        return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add job descriptions from a CSV or JSONL file to the FAISS index.")
+    parser.add_argument("source", help="CSV or JSONL file with the job descriptions.")
+    parser.add_argument("--folder", default="data/", help="Folder of the index.")
+    parser.add_argument("--index-name", default="index")
+    parser.add_argument("--text-field", default="jobdescription", help="Column or key holding the description.")
+    parser.add_argument("--metadata-fields", nargs="*", default=[], help="Columns or keys stored as document metadata.")
+    parser.add_argument("--sep", default=";", help="CSV separator.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Documents read and saved at a time.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Documents per embedding request.")
+    parser.add_argument("--workers", type=int, default=4, help="Embedding requests in flight.")
+    parser.add_argument("--min-length", type=int, default=200, help="Shorter descriptions are skipped.")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, help="Type of a new index, or of the existing one to convert to. Flat by default.")
+    parser.add_argument("--nlist", type=int, default=1024, help="Inverted lists of IVF indexes.")
+    parser.add_argument("--pq-m", type=int, default=16, help="Codes per vector of IVF-PQ indexes.")
+    parser.add_argument("--pq-nbits", type=int, default=8, help="Bits per code of IVF-PQ indexes.")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="Links per vector of HNSW indexes.")
+    parser.add_argument("--target-recall", type=float, help="Search approximate indexes with the fewest IVF lists or HNSW candidates reaching this recall@4.")
+    parser.add_argument("--storage", choices=STORAGE_FORMATS, help="Format the docstore is saved in. The existing one by default, pickle for a new index.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    builder = IndexBuilder(
+        args.folder, args.index_name,
+        batch_size=args.batch_size, max_workers=args.workers, min_length=args.min_length,
+        index_type=args.index_type, nlist=args.nlist, pq_m=args.pq_m, pq_nbits=args.pq_nbits, hnsw_m=args.hnsw_m,
+        storage=args.storage, target_recall=args.target_recall,
+    )
+    added = builder.build(read_source(args.source, args.text_field, args.metadata_fields, args.sep), args.chunk_size)
+    print(f"Added {added} documents, the index holds {len(builder.known_hashes)}")
@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from langchain_community.utilities import SQLDatabase
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from agents.tools.sql_cache import SQLQueryCache, get_sql_query_cache, new_sql_query_cache
+from agents.tools.sql_database import DEFAULT_DB_PATH, database_file_version, get_connection_pool, get_sql_database
+
+SQL_BACKENDS = ["sqlite", "duckdb"]
+DEFAULT_PARQUET_PATH = "data/companies.parquet"
+
+
+class SQLiteBackend:
+    """
+    The companies database as a SQLite file, queried through the shared read-only connection pool.
+    Row-oriented: fine for lookups, slow for aggregates over many rows.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+
+    @property
+    def version(self) -> Any:
+        return get_connection_pool(self.db_path).version
+
+    def connection(self):
+        """A pooled connection; its `execute` returns a DB-API cursor."""
+        return get_connection_pool(self.db_path).connection()
+
+    def schema(self) -> SQLDatabase:
+        """The object `create_sql_query_chain` reads the dialect and the table info from."""
+        return get_sql_database(self.db_path)
+
+    def query_cache(self, embeddings: Optional[Embeddings] = None) -> SQLQueryCache:
+        return get_sql_query_cache(self.db_path, embeddings=embeddings)
+
+
+class DuckDBBackend:
+    """
+    The companies table as a Parquet file queried in-process by DuckDB, whose columnar, vectorized
+    execution answers GROUP BY and AVG questions over millions of rows in milliseconds.
+
+    The table is a view over the file, so a new export is picked up by the next query. DuckDB is an
+    optional dependency, imported when the backend is created.
+    """
+
+    dialect = "duckdb"
+
+    def __init__(self, parquet_path: str = DEFAULT_PARQUET_PATH, table: str = "companies", sample_rows: int = 3):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("The duckdb SQL backend needs the duckdb package: pip install duckdb")
+        self.parquet_path = parquet_path
+        self.table = table
+        self.sample_rows = sample_rows
+        self._con = duckdb.connect(":memory:")
+        self._con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{os.path.abspath(parquet_path)}')")
+        self._table_info: Optional[tuple] = None
+        self._query_caches: Dict[str, SQLQueryCache] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Any:
+        return database_file_version(self.parquet_path)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """A cursor of its own for the calling thread; DuckDB connections are not shared across threads."""
+        cursor = self._con.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        """CREATE TABLE statement and sample rows of the table, in the format of `SQLDatabase.get_table_info`; read again when the file changes."""
+        version = self.version
+        if self._table_info is not None and self._table_info[0] == version:
+            return self._table_info[1]
+        with self.connection() as cursor:
+            columns = cursor.execute(f"DESCRIBE {self.table}").fetchall()
+            rows = cursor.execute(f"SELECT * FROM {self.table} LIMIT {self.sample_rows}").fetchall()
+        create_table = f"CREATE TABLE {self.table} (\n" + ",\n".join(f"\t{name} {column_type}" for name, column_type, *_ in columns) + "\n)"
+        samples = "\n".join("\t".join(str(value)[:100] for value in row) for row in rows)
+        header = "\t".join(name for name, *_ in columns)
+        table_info = f"{create_table}\n\n/*\n{self.sample_rows} rows from {self.table} table:\n{header}\n{samples}\n*/"
+        self._table_info = (version, table_info)
+        return table_info
+
+    def schema(self) -> "DuckDBBackend":
+        """The backend itself: `create_sql_query_chain` only needs `dialect` and `get_table_info`."""
+        return self
+
+    def query_cache(self, embeddings: Optional[Embeddings] = None) -> SQLQueryCache:
+        """A query cache for the current schema; questions answered for SQLite are not reused as their SQL differs."""
+        schema_key = hashlib.sha256(f"{self.dialect}\0{self.get_table_info()}".encode("utf-8")).hexdigest()
+        with self._lock:
+            cache = self._query_caches.get(schema_key)
+            if cache is None:
+                cache = new_sql_query_cache(schema_key, embeddings)
+                self._query_caches = {schema_key: cache}
+        cache.set_embeddings(embeddings)
+        return cache
+
+
+QueryBackend = Union[SQLiteBackend, DuckDBBackend]
+
+
+def export_parquet(csv_path: str = "data/companies.csv", parquet_path: str = DEFAULT_PARQUET_PATH, sep: str = ";"):
+    """
+    Export the companies CSV to the Parquet file read by `DuckDBBackend`, with REGISTRATION_DATE
+    parsed from the 'd-m-yyyy' DATE_OF_REGISTRATION as in the SQLite database. DATE_OF_REGISTRATION
+    is read as text, as in the SQLite database, rather than as the DATE read_csv would detect.
+    """
+    import duckdb
+
+    tmp_path = f"{parquet_path}.tmp"
+    con = duckdb.connect(":memory:")
+    try:
+        con.execute(
+            f"""
+            COPY (
+                SELECT *, try_strptime(DATE_OF_REGISTRATION, '%d-%m-%Y')::DATE AS REGISTRATION_DATE
+                FROM read_csv('{os.path.abspath(csv_path)}', delim='{sep}', header=true, types={{'DATE_OF_REGISTRATION': 'VARCHAR'}})
+            ) TO '{os.path.abspath(tmp_path)}' (FORMAT PARQUET)
+            """
+        )
+    finally:
+        con.close()
+    os.replace(tmp_path, parquet_path)
+    logger.info(f"Exported {csv_path} to {parquet_path}")
+
+
+_backends: Dict[str, QueryBackend] = {}
+_lock = threading.Lock()
+
+def get_query_backend(name: Optional[str] = None) -> QueryBackend:
+    """
+    Return the process-wide query backend `name`, by default the one set by `SQL_BACKEND` (sqlite).
+    The duckdb backend reads the Parquet file at `SQL_PARQUET_PATH`.
+    """
+    name = name or os.environ.get("SQL_BACKEND", "sqlite")
+    if name not in SQL_BACKENDS:
+        raise ValueError(f"Invalid SQL backend: {name}. Expected one of {SQL_BACKENDS}.")
+    backend = _backends.get(name)
+    if backend is None:
+        with _lock:
+            backend = _backends.get(name)
+            if backend is None:
+                if name == "duckdb":
+                    backend = DuckDBBackend(os.environ.get("SQL_PARQUET_PATH", DEFAULT_PARQUET_PATH))
+                else:
+                    backend = SQLiteBackend()
+                _backends[name] = backend
+    return backend
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the companies CSV to the Parquet file queried by the duckdb SQL backend.")
+    parser.add_argument("--csv", default="data/companies.csv")
+    parser.add_argument("--output", default=DEFAULT_PARQUET_PATH)
+    parser.add_argument("--sep", default=";", help="CSV separator.")
+    args = parser.parse_args()
+
+    export_parquet(args.csv, args.output, args.sep)
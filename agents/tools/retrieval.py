@@ -0,0 +1,143 @@
+import math
+import pickle
+import re
+from collections import Counter
+from typing import Dict, Iterable, KeysView, List, Optional, Sequence, Tuple
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it", "its",
+    "me", "of", "on", "or", "our", "that", "the", "their", "this", "to", "was", "we", "were", "with", "you", "your",
+}
+
+# First words of natural-language questions, better served by dense retrieval than by keyword matching
+QUESTION_WORDS = {"what", "which", "who", "whom", "whose", "why", "how", "when", "where", "can", "could", "should", "would", "does", "do", "is", "are"}
+
+
+def read_docstore(path: str) -> List[Document]:
+    """Documents of the docstore pickled next to a FAISS index by `FAISS.save_local`, in index order."""
+    with open(path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return [docstore.search(index_to_docstore_id[i]) for i in range(len(index_to_docstore_id))]
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of `text`, without stopwords."""
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory inverted index ranking documents with Okapi BM25.
+
+    Postings are stored per term as numpy arrays of document positions and term frequencies, so a
+    query only touches the documents containing its terms.
+    """
+
+    def __init__(self, documents: Sequence[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = list(documents)
+        self.k1 = k1
+        self.b = b
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for position, document in enumerate(self.documents):
+            counts = Counter(tokenize(document.page_content))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((position, count))
+
+        self.doc_lengths = np.array(lengths, dtype=np.float32)
+        self.avg_doc_length = float(self.doc_lengths.mean()) if lengths else 0.0
+        n = len(self.documents)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        for term, entries in postings.items():
+            positions, counts = zip(*entries)
+            self.postings[term] = (np.array(positions, dtype=np.int64), np.array(counts, dtype=np.float32))
+            self.idf[term] = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+
+    @classmethod
+    def from_docstore_file(cls, path: str, **kwargs) -> "BM25Index":
+        """Build the index from the docstore pickled next to a FAISS index by `FAISS.save_local`."""
+        return cls(read_docstore(path), **kwargs)
+
+    @property
+    def vocabulary(self) -> KeysView[str]:
+        return self.postings.keys()
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for `query`."""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / (self.avg_doc_length or 1.0))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            positions, counts = self.postings[term]
+            scores[positions] += self.idf[term] * counts * (self.k1 + 1) / (counts + norm[positions])
+        return scores
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """The `k` best matching documents with their BM25 scores, best first; documents sharing no term are left out."""
+        scores = self.scores(query)
+        top = np.argsort(-scores)[:k]
+        return [(self.documents[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+def is_keyword_query(query: str, vocabulary: Iterable[str], max_terms: int = 6) -> bool:
+    """
+    Whether `query` is a short list of keywords (skills, job titles...) that all occur in the indexed
+    documents, in which case lexical matching alone answers it well.
+    """
+    words = re.findall(r"\w+", query.lower())
+    terms = tokenize(query)
+    if not terms or len(terms) > max_terms or words[0] in QUESTION_WORDS:
+        return False
+    return all(term in vocabulary for term in terms)
+
+def fuse_scores(dense: List[Tuple[Document, float]], lexical: List[Tuple[Document, float]], k: int = 4, alpha: float = 0.5) -> List[Tuple[Document, float]]:
+    """
+    Combine dense relevance scores (0 to 1) with BM25 scores, normalized by the best one, as
+    `alpha * dense + (1 - alpha) * lexical`. A document found by only one retriever gets 0 from the other.
+    """
+    top_lexical = max((score for _, score in lexical), default=0.0) or 1.0
+    fused: Dict[str, List] = {}
+    for document, score in dense:
+        fused[document.page_content] = [document, alpha * score]
+    for document, score in lexical:
+        entry = fused.setdefault(document.page_content, [document, 0.0])
+        entry[1] += (1 - alpha) * score / top_lexical
+    return sorted(((document, score) for document, score in fused.values()), key=lambda item: -item[1])[:k]
+
+def search_many(store: FAISS, queries: List[str], k: int = 4, fetch_k: Optional[int] = None, dedupe: bool = True) -> List[List[Tuple[Document, float]]]:
+    """
+    Search `store` for several queries at once: the queries are embedded in one batch and searched
+    with one FAISS call over the stacked vectors. Returns, for each query, its hits with their L2
+    distances (lower is closer), as `similarity_search_with_score` does.
+
+    With `dedupe`, a document found by several queries is only kept for the closest one; each query
+    then looks at `fetch_k` neighbours (2 * k by default) so that it still gets up to `k` hits.
+    """
+    if not queries:
+        return []
+    embeddings = store.embedding_function
+    embed = getattr(embeddings, "embed_queries", None) or embeddings.embed_documents
+    vectors = np.array(embed(list(queries)), dtype=np.float32)
+    if store._normalize_L2:
+        faiss.normalize_L2(vectors)
+    fetch_k = min(fetch_k or (2 * k if dedupe and len(queries) > 1 else k), store.index.ntotal)
+    if fetch_k <= 0:
+        return [[] for _ in queries]
+    distances, positions = store.index.search(vectors, fetch_k)
+
+    hits = [[(int(i), float(d)) for i, d in zip(row_positions, row_distances) if i != -1] for row_positions, row_distances in zip(positions, distances)]
+    if dedupe:
+        closest: Dict[int, Tuple[float, int]] = {}
+        for query, row in enumerate(hits):
+            for i, distance in row:
+                if i not in closest or distance < closest[i][0]:
+                    closest[i] = (distance, query)
+        hits = [[(i, distance) for i, distance in row if closest[i][1] == query] for query, row in enumerate(hits)]
+    return [[(store.docstore.search(store.index_to_docstore_id[i]), distance) for i, distance in row[:k]] for row in hits]
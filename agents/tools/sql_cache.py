@@ -0,0 +1,383 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from agents.tracing import record_cache
+from .sql_database import DEFAULT_DB_PATH, database_file_version, get_connection_pool
+from .sql_results import remove_result_file, result_file_exists
+
+
+# Words that change the meaning of a comparison, kept among the literals of a question
+COMPARISON_WORDS = {"above", "below", "over", "under", "more", "less", "least", "most", "before", "after", "since", "between", "not", "without"}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase the question and collapse whitespace; punctuation, operators and numbers are kept."""
+    return " ".join(question.lower().split())
+
+def extract_literals(question: str) -> List[str]:
+    """
+    The parts of a question that change its SQL without changing its embedding much: numbers,
+    quoted strings, comparison operators and words, and capitalized names (states, companies...).
+    """
+    quoted = re.findall(r"'[^']*'|\"[^\"]*\"", question)
+    numbers = re.findall(r"\d+(?:[.,]\d+)*", question)
+    operators = re.findall(r"[<>!]=?|=", question)
+    words = re.findall(r"[A-Za-z_]\w*", question)
+    names = [word for word in words[1:] if word[0].isupper()]
+    comparisons = [word.lower() for word in words if word.lower() in COMPARISON_WORDS]
+    return sorted(quoted + numbers + operators + [name.lower() for name in names] + comparisons)
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and drop the trailing semicolon; literals are left untouched."""
+    return " ".join(sql.split()).rstrip(";").strip()
+
+def schema_fingerprint(db_path: str = DEFAULT_DB_PATH) -> str:
+    """Hash of the DDL of every table, view and index in the database."""
+    with get_connection_pool(db_path).connection() as con:
+        ddl = con.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+    return hashlib.sha256(json.dumps(ddl).encode("utf-8")).hexdigest()
+
+
+class SQLQueryCache:
+    """
+    Cache mapping natural language questions to the SQL generated for them.
+
+    Lookups go through two tiers: an exact match on the normalized question, then, if an embeddings
+    client is given, the cached question with the highest cosine similarity above `similarity_threshold`
+    among those with the same literals (see `extract_literals`), since questions differing only in a
+    state or a number embed almost identically.
+    Entries are evicted least-recently-used once there are more than `max_entries`, and expire after
+    `ttl` seconds. With `persist_path` every entry is also written to a SQLite file as it is added,
+    and the entries of the same schema are loaded back on start; caches of other schemas can share
+    the file.
+    """
+
+    def __init__(
+        self,
+        schema_key: str,
+        max_entries: int = 512,
+        ttl: Optional[float] = None,
+        embeddings: Optional[Embeddings] = None,
+        similarity_threshold: float = 0.95,
+        persist_path: Optional[str] = None,
+    ):
+        self.schema_key = schema_key
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.persist_path = persist_path
+        self.hits = {"exact": 0, "similar": 0}
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if persist_path:
+            self._load()
+
+    def set_embeddings(self, embeddings: Optional[Embeddings]):
+        """Use another embeddings client for the similarity tier; questions embedded by a previous one are only matched exactly."""
+        with self._lock:
+            if embeddings is self.embeddings:
+                return
+            if self.embeddings is not None:
+                for entry in self._entries.values():
+                    entry["embedding"] = None
+            self.embeddings = embeddings
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl is not None and now - entry["created_at"] > self.ttl
+
+    @staticmethod
+    def _normalize_vector(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.embeddings is None:
+            return None
+        return self._normalize_vector(self.embeddings.embed_query(question))
+
+    async def _aembed(self, question: str) -> Optional[np.ndarray]:
+        if self.embeddings is None:
+            return None
+        return self._normalize_vector(await self.embeddings.aembed_query(question))
+
+    def _lookup_exact(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry, now):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry["sql"]
+
+    def _lookup_similar(self, vector: np.ndarray, literals: List[str], now: float) -> Optional[str]:
+        for key in [k for k, entry in self._entries.items() if self._expired(entry, now)]:
+            del self._entries[key]
+
+        keys = [k for k, entry in self._entries.items() if entry["embedding"] is not None and entry["literals"] == literals]
+        if not keys:
+            return None
+        matrix = np.stack([self._entries[k]["embedding"] for k in keys])
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        self._entries.move_to_end(keys[best])
+        return self._entries[keys[best]]["sql"]
+
+    def _store(self, key: str, sql: str, vector: Optional[np.ndarray], literals: Optional[List[str]], now: float) -> List[str]:
+        """Add an entry; return the keys evicted to make room for it."""
+        self._entries[key] = {"sql": sql, "embedding": vector, "literals": literals, "created_at": now}
+        self._entries.move_to_end(key)
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted.append(self._entries.popitem(last=False)[0])
+        return evicted
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            sql = self._lookup_exact(key, time.time())
+            if sql is not None:
+                self.hits["exact"] += 1
+                record_cache("sql_query_cache", hit=True, tier="exact")
+            return sql
+
+    def _get_similar(self, vector: Optional[np.ndarray], literals: List[str]) -> Optional[str]:
+        with self._lock:
+            sql = self._lookup_similar(vector, literals, time.time()) if vector is not None else None
+            if sql is not None:
+                self.hits["similar"] += 1
+            else:
+                self.misses += 1
+            record_cache("sql_query_cache", hit=sql is not None, tier="similar")
+            return sql
+
+    def _put(self, key: str, sql: str, vector: Optional[np.ndarray], literals: List[str]):
+        now = time.time()
+        with self._lock:
+            evicted = self._store(key, sql, vector, literals, now)
+        if self._db is not None:
+            self._save(key, sql, vector, literals, now, evicted)
+
+    def get_or_generate(self, question: str, generate: Callable[[str], str]) -> str:
+        """Return the cached SQL for `question`, or call `generate` and cache its result."""
+        key = normalize_question(question)
+        sql = self._get(key)
+        if sql is not None:
+            return sql
+
+        vector = self._embed(question)
+        literals = extract_literals(question)
+        sql = self._get_similar(vector, literals)
+        if sql is not None:
+            return sql
+
+        sql = generate(question)
+        self._put(key, sql, vector, literals)
+        return sql
+
+    async def aget_or_generate(self, question: str, agenerate: Callable[[str], Awaitable[str]]) -> str:
+        """Async version of `get_or_generate`."""
+        key = normalize_question(question)
+        sql = self._get(key)
+        if sql is not None:
+            return sql
+
+        vector = await self._aembed(question)
+        literals = extract_literals(question)
+        sql = self._get_similar(vector, literals)
+        if sql is not None:
+            return sql
+
+        sql = await agenerate(question)
+        self._put(key, sql, vector, literals)
+        return sql
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM queries WHERE schema_key = ?", (self.schema_key,))
+
+    def _save(self, key: str, sql: str, vector: Optional[np.ndarray], literals: List[str], now: float, evicted: List[str]):
+        """Write one new entry and delete the evicted ones, rather than rewriting the whole cache."""
+        embedding = vector.astype(np.float32).tobytes() if vector is not None else None
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries (schema_key, question, sql, created_at, embedding, literals) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.schema_key, key, sql, now, embedding, json.dumps(literals)),
+            )
+            self._db.executemany("DELETE FROM queries WHERE schema_key = ? AND question = ?", [(self.schema_key, k) for k in evicted])
+
+    def _load(self):
+        try:
+            self._db = sqlite3.connect(self.persist_path, check_same_thread=False, timeout=30)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS queries (schema_key TEXT NOT NULL, question TEXT NOT NULL, sql TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, embedding BLOB, literals TEXT, PRIMARY KEY (schema_key, question))"
+                )
+            rows = self._db.execute(
+                "SELECT question, sql, created_at, embedding, literals FROM queries WHERE schema_key = ? ORDER BY created_at", (self.schema_key,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not use SQL query cache {self.persist_path}, the cache is not persisted: {e}")
+            self._db = None
+            return
+        now = time.time()
+        for question, sql, created_at, embedding, literals in rows:
+            if self.ttl is not None and now - created_at > self.ttl:
+                continue
+            vector = np.frombuffer(embedding, dtype=np.float32).copy() if embedding is not None else None
+            self._store(question, sql, vector, json.loads(literals) if literals else None, created_at)
+
+
+class SQLResultCache:
+    """
+    Cache of serialized SQL result sets.
+
+    Entries are keyed on the normalized SQL text and the version of the database file, so they
+    become unreachable as soon as the data is reloaded. The cache holds at most `max_bytes` of
+    payload and evicts least-recently-used entries beyond that. `on_evict` is called with every
+    payload dropped from the cache, or not stored because an equal entry was already there; a
+    cached payload for which `is_valid` returns False is dropped and executed again.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, on_evict: Optional[Callable[[str], None]] = None, is_valid: Optional[Callable[[str], bool]] = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.is_valid = is_valid
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, Any], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(key: Tuple[str, Any], payload: str) -> int:
+        return len(key[0].encode("utf-8")) + len(payload.encode("utf-8"))
+
+    def _get(self, key: Tuple[str, Any]) -> Optional[str]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None and self.is_valid is not None and not self.is_valid(payload):
+                del self._entries[key]
+                self.size_bytes -= self._entry_size(key, payload)
+                payload = None
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            record_cache("sql_result_cache", hit=payload is not None)
+            return payload
+
+    def _put(self, key: Tuple[str, Any], payload: str):
+        size = self._entry_size(key, payload)
+        if size > self.max_bytes:
+            return
+        dropped = []
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = payload
+                self.size_bytes += size
+            else:
+                dropped.append(payload)
+            while self.size_bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= self._entry_size(evicted_key, evicted)
+                dropped.append(evicted)
+        self._evicted(dropped)
+
+    def _evicted(self, payloads: List[str]):
+        if self.on_evict is not None:
+            for payload in payloads:
+                self.on_evict(payload)
+
+    def get_or_execute(self, sql: str, version: Any, execute: Callable[[str], str]) -> str:
+        """Return the cached payload for `sql` at database `version`, or call `execute` and cache its result."""
+        key = (normalize_sql(sql), version)
+        payload = self._get(key)
+        if payload is None:
+            payload = execute(sql)
+            self._put(key, payload)
+        return payload
+
+    async def aget_or_execute(self, sql: str, version: Any, aexecute: Callable[[str], Awaitable[str]]) -> str:
+        """Async version of `get_or_execute`."""
+        key = (normalize_sql(sql), version)
+        payload = self._get(key)
+        if payload is None:
+            payload = await aexecute(sql)
+            self._put(key, payload)
+        return payload
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "size_bytes": self.size_bytes}
+
+    def clear(self):
+        with self._lock:
+            dropped = list(self._entries.values())
+            self._entries.clear()
+            self.size_bytes = 0
+        self._evicted(dropped)
+
+
+# Evicting a result deletes the file its rows were spilled to, and a result whose file was pruned is run again
+_result_cache = SQLResultCache(on_evict=remove_result_file, is_valid=result_file_exists)
+
+def get_sql_result_cache() -> SQLResultCache:
+    """Return the process-wide SQL result cache."""
+    return _result_cache
+
+
+_caches: Dict[str, SQLQueryCache] = {}
+_fingerprints: Dict[str, tuple] = {}
+_lock = threading.Lock()
+
+def get_sql_query_cache(db_path: str = DEFAULT_DB_PATH, embeddings: Optional[Embeddings] = None) -> SQLQueryCache:
+    """
+    Return the process-wide SQL query cache for the current schema of `db_path`.
+
+    The schema is fingerprinted again whenever the database file changes; a new schema gets a new,
+    empty cache. Set `SQL_QUERY_CACHE_PATH` to persist the cache between runs (see `new_sql_query_cache`).
+    """
+    key = os.path.abspath(db_path)
+    version = database_file_version(db_path)
+    with _lock:
+        cached = _fingerprints.get(key)
+        if cached is None or cached[0] != version:
+            _fingerprints[key] = (version, schema_fingerprint(db_path))
+        schema_key = _fingerprints[key][1]
+
+        cache = _caches.get(key)
+        if cache is None or cache.schema_key != schema_key:
+            cache = new_sql_query_cache(schema_key, embeddings)
+            _caches[key] = cache
+    cache.set_embeddings(embeddings)
+    return cache
+
+def new_sql_query_cache(schema_key: str, embeddings: Optional[Embeddings] = None) -> SQLQueryCache:
+    """A query cache for `schema_key`, persisted to the SQLite file `SQL_QUERY_CACHE_PATH` if it is set, which the caches of all schemas share."""
+    return SQLQueryCache(schema_key, embeddings=embeddings, persist_path=os.environ.get("SQL_QUERY_CACHE_PATH"))
+
+def clear_sql_caches():
+    """Drop every SQL query cache and empty the result cache."""
+    with _lock:
+        _caches.clear()
+        _fingerprints.clear()
+    _result_cache.clear()
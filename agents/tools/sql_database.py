@@ -0,0 +1,153 @@
+import os
+import queue
+import sqlite3
+import threading
+import warnings
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, Tuple
+from langchain_community.utilities import SQLDatabase
+from loguru import logger
+from sqlalchemy.exc import SAWarning
+from agents.tools.sql_stats import stats_table_notes
+
+DEFAULT_DB_PATH = "data/companies.db"
+
+
+def database_file_version(db_path: str) -> Tuple[int, int]:
+    """Return (mtime in ns, size) of the database file, which changes whenever the data is reloaded."""
+    stat = os.stat(db_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SQLiteConnectionPool:
+    """
+    Bounded pool of read-only sqlite3 connections.
+
+    Connections are opened lazily, up to `max_size`, with `mode=ro` and `immutable=1` so that SQLite
+    skips locking entirely. Threads check a connection out with `connection()` and it is returned to
+    the pool when the block exits. If all connections are in use the caller waits up to `timeout` seconds.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_size: int = 4, timeout: float = 30.0):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.version = database_file_version(db_path)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_size)
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro&immutable=1"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.max_size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection to {self.db_path} became available within {self.timeout} seconds.")
+
+    def _checkin(self, con: sqlite3.Connection):
+        if self._closed:
+            con.close()
+            return
+        self._idle.put_nowait(con)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check a connection out of the pool for the duration of the block."""
+        con = self._checkout()
+        try:
+            yield con
+        finally:
+            self._checkin(con)
+
+    def close(self):
+        """Close the idle connections; connections still checked out are closed when they are returned."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def annotated_table_info(con: sqlite3.Connection, notes: Dict[str, str], sample_rows: int = 3) -> Dict[str, str]:
+    """
+    Table info of the tables in `notes`, in the format of `SQLDatabase.get_table_info` (CREATE TABLE
+    statement and sample rows) followed by their note, read directly from the database.
+    """
+    table_info = {}
+    for table, note in notes.items():
+        (create_table,) = con.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        cursor = con.execute(f'SELECT * FROM "{table}" LIMIT {sample_rows}')
+        header = "\t".join(description[0] for description in cursor.description)
+        rows = "\n".join("\t".join(str(value)[:100] for value in row) for row in cursor.fetchall())
+        table_info[table] = f"{create_table}\n\n/*\n{sample_rows} rows from {table} table:\n{header}\n{rows}\n*/\n\n/*\n{note}\n*/"
+    return table_info
+
+
+_databases: Dict[str, SQLDatabase] = {}
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_lock = threading.Lock()
+
+def get_sql_database(db_path: str = DEFAULT_DB_PATH) -> SQLDatabase:
+    """
+    Return the process-wide `SQLDatabase` for `db_path`, reflecting its schema only once.
+
+    When the summary tables of `agents.tools.sql_stats` are present, the table info shown to the
+    NL to SQL chain carries notes telling it to use them.
+    """
+    key = os.path.abspath(db_path)
+    db = _databases.get(key)
+    if db is None:
+        with _lock:
+            db = _databases.get(key)
+            if db is None:
+                with closing(sqlite3.connect(f"file:{key}?mode=ro", uri=True)) as con:
+                    table_info = annotated_table_info(con, stats_table_notes(con))
+                with warnings.catch_warnings():
+                    # SQLAlchemy does not reflect the expression indexes added by sql_stats, and warns about each of them
+                    warnings.filterwarnings("ignore", message="Skipped unsupported reflection of expression-based index", category=SAWarning)
+                    db = SQLDatabase.from_uri(f"sqlite:///{db_path}", custom_table_info=table_info or None)
+                _databases[key] = db
+    return db
+
+def get_connection_pool(db_path: str = DEFAULT_DB_PATH, max_size: int = 4) -> SQLiteConnectionPool:
+    """
+    Return the process-wide connection pool for `db_path`.
+
+    Immutable connections do not notice changes to the file, so the pool is replaced when the
+    database file is rewritten.
+    """
+    key = os.path.abspath(db_path)
+    version = database_file_version(db_path)
+    pool = _pools.get(key)
+    if pool is not None and pool.version == version:
+        return pool
+
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None or pool.version != version:
+            if pool is not None:
+                logger.info(f"Database file {db_path} changed on disk, reopening connections")
+                pool.close()
+                _databases.pop(key, None)
+            pool = SQLiteConnectionPool(db_path, max_size=max_size)
+            _pools[key] = pool
+    return pool
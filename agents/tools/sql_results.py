@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import tempfile
+from contextlib import suppress
+from typing import Any, Dict, List, Optional
+
+# Budgets of the result returned to the agent, which ends up in the next LLM prompt
+SQL_MAX_ROWS = int(os.environ.get("SQL_MAX_ROWS", 50))
+SQL_MAX_BYTES = int(os.environ.get("SQL_MAX_BYTES", 8000))
+# Rows fetched from the cursor at a time
+SQL_FETCH_SIZE = 500
+# Folder the full result of a truncated query is written to, as a CSV the UI can page through; set it empty to disable
+SQL_RESULT_DIR = os.environ.get("SQL_RESULT_DIR", os.path.join(tempfile.gettempdir(), "agents_sql_results"))
+# Result files kept in the folder: the oldest ones beyond that are deleted when a new one is written.
+# The SQL result cache also deletes the file of a result it evicts.
+SQL_RESULT_MAX_FILES = int(os.environ.get("SQL_RESULT_MAX_FILES", 100))
+RESULT_FILE_PREFIX = "sql_result_"
+
+
+def shape_result(
+    cursor: Any,
+    max_rows: int = SQL_MAX_ROWS,
+    max_bytes: int = SQL_MAX_BYTES,
+    fetch_size: int = SQL_FETCH_SIZE,
+    spill_dir: Optional[str] = SQL_RESULT_DIR,
+    max_files: int = SQL_RESULT_MAX_FILES,
+) -> Dict[str, Any]:
+    """
+    Read the rows of an executed DB-API `cursor` with `fetchmany`, keeping at most `max_rows` rows
+    and `max_bytes` of JSON, and return them with the column names, the number of rows shown, the
+    total number of rows when it is known, and whether the result was truncated.
+
+    Without `spill_dir`, fetching stops as soon as the budget is exceeded, so a huge result is never
+    held in memory and its total is unknown. With it, the remaining rows are streamed to a CSV file
+    in `spill_dir`, whose path is returned when the result was truncated; at most `max_files` such
+    files are kept.
+    """
+    columns = [description[0] for description in cursor.description or []]
+    rows: List[List[Any]] = []
+    size = 2
+    truncated = False
+    total = 0
+    spill = None
+    if spill_dir:
+        os.makedirs(spill_dir, exist_ok=True)
+        fd, spill_path = tempfile.mkstemp(prefix=RESULT_FILE_PREFIX, suffix=".csv", dir=spill_dir)
+        spill = open(fd, "w", newline="", encoding="utf-8")
+        writer = csv.writer(spill)
+        writer.writerow(columns)
+
+    try:
+        while chunk := cursor.fetchmany(fetch_size):
+            if spill is not None:
+                writer.writerows(chunk)
+            total += len(chunk)
+            for row in chunk:
+                if truncated:
+                    break
+                row_size = len(json.dumps(list(row), default=str)) + 1
+                if len(rows) >= max_rows or size + row_size > max_bytes:
+                    truncated = True
+                    break
+                rows.append(list(row))
+                size += row_size
+            if truncated and spill is None:
+                break
+    finally:
+        if spill is not None:
+            spill.close()
+
+    result = {"columns": columns, "rows": rows, "shown_rows": len(rows), "truncated": truncated}
+    if not truncated or spill is not None:
+        result["total_rows"] = total
+    if spill is not None:
+        if truncated:
+            result["result_file"] = spill_path
+            prune_result_files(spill_dir, max_files)
+        else:
+            os.remove(spill_path)
+    if truncated:
+        shown = f"Only the first {len(rows)} of {total} rows are shown." if spill is not None else f"Only the first {len(rows)} rows are shown, the query returned more."
+        result["note"] = f"{shown} Use aggregates, filters or LIMIT to get a smaller result."
+    return result
+
+def prune_result_files(spill_dir: str, max_files: int = SQL_RESULT_MAX_FILES):
+    """Delete the result files of `spill_dir` but the `max_files` most recently written."""
+    files = []
+    for entry in os.scandir(spill_dir):
+        if entry.name.startswith(RESULT_FILE_PREFIX) and entry.name.endswith(".csv"):
+            with suppress(FileNotFoundError):
+                files.append((entry.stat().st_mtime_ns, entry.path))
+    files.sort()
+    for _, path in files[:max(len(files) - max_files, 0)]:
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+def spilled_result(payload: Any) -> Optional[Dict[str, Any]]:
+    """The `shape_result` result serialized in `payload`, e.g. a SQL tool observation, if its full rows were written to a file."""
+    if not isinstance(payload, str) or '"result_file"' not in payload:
+        return None
+    try:
+        result = json.loads(payload)
+    except ValueError:
+        return None
+    return result if isinstance(result, dict) and result.get("result_file") else None
+
+def remove_result_file(payload: str):
+    """Delete the result file of a serialized `shape_result` result, if it has one; e.g. when the result cache evicts it."""
+    result = spilled_result(payload)
+    if result is not None:
+        with suppress(FileNotFoundError):
+            os.remove(result["result_file"])
+
+def result_file_exists(payload: str) -> bool:
+    """False when the result serialized in `payload` refers to a result file that was deleted since, e.g. by `prune_result_files`."""
+    result = spilled_result(payload)
+    return result is None or os.path.exists(result["result_file"])
+
+def read_result_page(path: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """Columns and rows `offset` to `offset + limit` of a result file written by `shape_result`."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        rows = []
+        for i, row in enumerate(reader):
+            if i >= offset + limit:
+                break
+            if i >= offset:
+                rows.append(row)
+    return {"columns": columns, "rows": rows, "offset": offset}
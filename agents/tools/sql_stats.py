@@ -0,0 +1,123 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+from datetime import date
+from typing import Dict, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from loguru import logger
+
+# Parsed DATE_OF_REGISTRATION, stored as an ISO 'YYYY-MM-DD' text so that it sorts and compares as a date
+DATE_COLUMN = "REGISTRATION_DATE"
+YEAR_EXPRESSION = f"CAST(substr({DATE_COLUMN}, 1, 4) AS INTEGER)"
+
+# Summary tables: the column each one is keyed by, its type, and the expression the companies are grouped by
+GROUPINGS = {
+    "companies_by_state": ("REGISTERED_STATE", "TEXT", "REGISTERED_STATE"),
+    "companies_by_status": ("COMPANY_STATUS", "TEXT", "COMPANY_STATUS"),
+    "companies_by_activity": ("PRINCIPAL_BUSINESS_ACTIVITY_AS_PER_CIN", "TEXT", "PRINCIPAL_BUSINESS_ACTIVITY_AS_PER_CIN"),
+    "companies_by_registration_year": ("REGISTRATION_YEAR", "INTEGER", YEAR_EXPRESSION),
+}
+SUMMARY_TABLE = "companies_summary"
+
+# Declared explicitly: the columns of a CREATE TABLE ... AS SELECT have no type, and SQLDatabase hides untyped columns
+AGGREGATE_COLUMNS = "COMPANY_COUNT INTEGER, AVG_AUTHORIZED_CAP REAL, AVG_PAIDUP_CAPITAL REAL, TOTAL_AUTHORIZED_CAP REAL, TOTAL_PAIDUP_CAPITAL REAL"
+AGGREGATES = "COUNT(*), AVG(AUTHORIZED_CAP), AVG(PAIDUP_CAPITAL), SUM(AUTHORIZED_CAP), SUM(PAIDUP_CAPITAL)"
+
+# Indexes on the columns questions filter and group by; the expression ones only serve queries using the same expression
+INDEXES = {
+    "ix_companies_registration_date": DATE_COLUMN,
+    "ix_companies_registration_year": YEAR_EXPRESSION,
+    "ix_companies_state": "REGISTERED_STATE",
+    "ix_companies_status": "COMPANY_STATUS",
+    "ix_companies_activity": "PRINCIPAL_BUSINESS_ACTIVITY_AS_PER_CIN",
+    "ix_companies_name": "trim(COMPANY_NAME)",
+}
+
+
+def parse_registration_date(text: Optional[str]) -> Optional[str]:
+    """Turn a 'd-m-yyyy' date into 'yyyy-mm-dd'; None when it is missing or malformed."""
+    try:
+        day, month, year = (int(part) for part in text.strip().split("-"))
+        return date(year, month, day).isoformat()
+    except (AttributeError, ValueError):
+        return None
+
+def build_stats(con: sqlite3.Connection, table: str = "companies"):
+    """Add the parsed registration date, the indexes and the summary tables to `table`, replacing the previous ones."""
+    columns = [row[1] for row in con.execute(f'PRAGMA table_info("{table}")')]
+    if DATE_COLUMN not in columns:
+        con.execute(f'ALTER TABLE "{table}" ADD COLUMN {DATE_COLUMN} DATE')
+    con.create_function("parse_registration_date", 1, parse_registration_date, deterministic=True)
+    con.execute(f'UPDATE "{table}" SET {DATE_COLUMN} = parse_registration_date(DATE_OF_REGISTRATION)')
+
+    for name, expression in INDEXES.items():
+        con.execute(f"DROP INDEX IF EXISTS {name}")
+        con.execute(f'CREATE INDEX {name} ON "{table}" ({expression})')
+
+    for stats_table, (column, column_type, expression) in GROUPINGS.items():
+        con.execute(f"DROP TABLE IF EXISTS {stats_table}")
+        con.execute(f"CREATE TABLE {stats_table} ({column} {column_type} PRIMARY KEY, {AGGREGATE_COLUMNS})")
+        con.execute(f'INSERT INTO {stats_table} SELECT {expression}, {AGGREGATES} FROM "{table}" GROUP BY 1')
+    con.execute(f"DROP TABLE IF EXISTS {SUMMARY_TABLE}")
+    con.execute(f"CREATE TABLE {SUMMARY_TABLE} ({AGGREGATE_COLUMNS}, FIRST_REGISTRATION_DATE DATE, LAST_REGISTRATION_DATE DATE)")
+    con.execute(f'INSERT INTO {SUMMARY_TABLE} SELECT {AGGREGATES}, MIN({DATE_COLUMN}), MAX({DATE_COLUMN}) FROM "{table}"')
+    con.commit()
+    con.execute("ANALYZE")
+    con.commit()
+
+def build_stats_file(db_path: str, table: str = "companies"):
+    """
+    Run `build_stats` on a copy of the database and move it in place, since the tools read the file
+    through immutable connections; their pools reopen on the new file.
+    """
+    tmp_path = f"{db_path}.tmp"
+    shutil.copyfile(db_path, tmp_path)
+    try:
+        con = sqlite3.connect(tmp_path)
+        try:
+            build_stats(con, table)
+        finally:
+            con.close()
+        os.replace(tmp_path, db_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logger.info(f"Built the summary tables and indexes of {db_path}")
+
+def stats_table_notes(con: sqlite3.Connection, table: str = "companies") -> Dict[str, str]:
+    """
+    Notes on the objects added by `build_stats` that are present in the database, by table, to be
+    shown to the NL to SQL chain next to the table schemas.
+    """
+    tables = {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if SUMMARY_TABLE not in tables:
+        return {}
+    notes = {
+        table: (
+            f"{DATE_COLUMN} is DATE_OF_REGISTRATION parsed as 'YYYY-MM-DD' and indexed: filter, sort and compare dates with it, "
+            f"never with the 'd-m-yyyy' DATE_OF_REGISTRATION text. The registration year is the indexed expression {YEAR_EXPRESSION}. "
+            "REGISTERED_STATE, COMPANY_STATUS and PRINCIPAL_BUSINESS_ACTIVITY_AS_PER_CIN are indexed, and so is trim(COMPANY_NAME). "
+            "For counts, averages and totals over all companies or per state, status, activity or registration year, query the summary tables instead of this one."
+        ),
+        SUMMARY_TABLE: f"One row with the company count, the average and total AUTHORIZED_CAP and PAIDUP_CAPITAL, and the first and last {DATE_COLUMN} of all the companies.",
+    }
+    for stats_table, (column, _, _) in GROUPINGS.items():
+        if stats_table in tables:
+            notes[stats_table] = (
+                f"Precomputed per {column} of the {table} table: company count, and average and total AUTHORIZED_CAP and PAIDUP_CAPITAL. "
+                f"Use it instead of grouping {table} by {column}; sum COMPANY_COUNT and the totals to combine rows."
+            )
+    return notes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add a parsed registration date, indexes and summary tables to the companies database.")
+    parser.add_argument("--db", default="data/companies.db", help="SQLite database file.")
+    parser.add_argument("--table", default="companies")
+    args = parser.parse_args()
+
+    build_stats_file(args.db, args.table)
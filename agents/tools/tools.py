@@ -1,34 +1,87 @@
 from langchain.agents import Tool
-from langchain_openai import ChatOpenAI
-from langchain_community.utilities import SQLDatabase
 from langchain.chains import create_sql_query_chain
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-import sqlite3
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+from agents.llm_cache import ChatOpenAI
 from langchain.chains import LLMChain
 from langchain.chains.summarize import load_summarize_chain
+from langchain_core.documents import Document
+from langchain_core.runnables import Runnable
+from typing import List, Optional, Tuple
+import asyncio
 import json
+import os
 from loguru import logger
 from .youtube_helpers import get_youtube_video_ids, fetch_transcript, chunk_documents
+from .vector_store import get_lexical_index, get_vector_store, get_vector_store_registry
+from .retrieval import fuse_scores, is_keyword_query, search_many
+from .query_backends import QueryBackend, get_query_backend
+from agents.tracing import span, tracing_callbacks
+from .sql_cache import get_sql_result_cache
+from .sql_results import SQL_MAX_BYTES, SQL_MAX_ROWS, shape_result
+
+# Folder of the job descriptions FAISS index (index.faiss and index.pkl)
+VECTOR_STORE_DIR = os.environ.get("VECTOR_STORE_DIR", "data/")
+
+# How job descriptions are retrieved: "dense" (FAISS only, the default), or opt-in "hybrid" (BM25 and
+# FAISS scores fused) and "auto" (BM25 alone for keyword queries, which saves the query embedding call,
+# hybrid otherwise). In the opt-in modes the reported score is the fused or BM25 score, not the FAISS one.
+JOB_SEARCH_MODE = os.environ.get("JOB_SEARCH_MODE", "dense")
+JOB_SEARCH_K = 4
+# Candidates taken from each retriever before fusing their scores
+HYBRID_FETCH_K = 20
+
+# Whether cached SQL is reused for questions that are only similar (by embedding) to an earlier one,
+# and not just the same question; off by default as a near miss returns the SQL of another question
+SQL_SIMILAR_QUESTIONS = os.environ.get("SQL_SIMILAR_QUESTIONS", "false").lower() == "true"
+
+def similar_questions_embeddings():
+    """Embeddings for the similarity tier of the SQL query cache, None when it is off."""
+    return get_vector_store_registry().embeddings if SQL_SIMILAR_QUESTIONS else None
 
 def sql_search(query: str) -> str:
     """Search in the company database using natural language that is converted to an sql query by an llm"""
-    db = SQLDatabase.from_uri("sqlite:///data/companies.db")
-    chain = create_sql_query_chain(ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0), db, k=10)
-    result_query = chain.invoke({"question": query})
-    con = sqlite3.connect("data/companies.db")
-    cursor = con.cursor()
-    rows = cursor.execute(result_query).fetchall()
-    logger.info(f"SQL query: {result_query}")
-    return json.dumps(rows)
+    backend = get_query_backend()
+    chain = create_sql_query_chain(ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0), backend.schema(), k=10)
+    query_cache = backend.query_cache(embeddings=similar_questions_embeddings())
+    result_query = query_cache.get_or_generate(query, lambda question: generate_sql(chain, question))
+    logger.info(f"SQL query ({backend.dialect}): {result_query}")
+    return get_sql_result_cache().get_or_execute(result_query, result_version(backend), lambda sql: execute_sql(backend, sql))
+
+async def asql_search(query: str) -> str:
+    """Async version of `sql_search`. The query itself runs in a worker thread."""
+    backend = get_query_backend()
+    chain = create_sql_query_chain(ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0), backend.schema(), k=10)
+    query_cache = backend.query_cache(embeddings=similar_questions_embeddings())
+    result_query = await query_cache.aget_or_generate(query, lambda question: agenerate_sql(chain, question))
+    logger.info(f"SQL query ({backend.dialect}): {result_query}")
+    return await get_sql_result_cache().aget_or_execute(result_query, result_version(backend), lambda sql: asyncio.to_thread(execute_sql, backend, sql))
+
+def generate_sql(chain: Runnable, question: str) -> str:
+    """Turn the question into SQL with the LLM chain."""
+    with span("sql_generation"):
+        return chain.invoke({"question": question}, {"callbacks": tracing_callbacks()})
+
+async def agenerate_sql(chain: Runnable, question: str) -> str:
+    """Async version of `generate_sql`."""
+    with span("sql_generation"):
+        return await chain.ainvoke({"question": question}, {"callbacks": tracing_callbacks()})
+
+def result_version(backend: QueryBackend, max_rows: int = SQL_MAX_ROWS, max_bytes: int = SQL_MAX_BYTES) -> tuple:
+    """What a cached SQL result depends on besides the query: the engine, the data and the budgets it was shaped to."""
+    return (backend.dialect, backend.version, max_rows, max_bytes)
+
+def execute_sql(backend: QueryBackend, sql: str, max_rows: int = SQL_MAX_ROWS, max_bytes: int = SQL_MAX_BYTES) -> str:
+    """Run the query on a connection of the backend and serialize its result, shaped to the row and byte budgets, to JSON."""
+    with span(f"{backend.dialect}_execute"), backend.connection() as con:
+        result = shape_result(con.execute(sql), max_rows=max_rows, max_bytes=max_bytes)
+    return json.dumps(result, default=str)
 
 def sql_search_tool():
     """Tool to perform SQL searches on the company dataset."""
     return Tool(
         name="company_sql_search",
         func=sql_search,
+        coroutine=asql_search,
         description=
         """
         This tool offers detailed company data for advanced searches and analysis. Features include:
@@ -47,13 +100,69 @@ def sql_search_tool():
         """
     )
 
+def lexical_job_search(query: str) -> Optional[List[Tuple[Document, float]]]:
+    """BM25 results for keyword queries in "auto" mode, None when the query needs dense retrieval."""
+    if JOB_SEARCH_MODE != "auto":
+        return None
+    lexical_index = get_lexical_index(VECTOR_STORE_DIR)
+    if not is_keyword_query(query, lexical_index.vocabulary):
+        return None
+    with span("bm25_search"):
+        # Without dense scores, fusing only normalizes the BM25 scores by the best one
+        return fuse_scores([], lexical_index.search(query, JOB_SEARCH_K), k=JOB_SEARCH_K, alpha=0.0)
+
 def job_description_search(query: str) -> str:
     """Search in job descriptions using similarity search and return results as a string."""
-    embeddings = OpenAIEmbeddings()
-    vector_storage = FAISS.load_local("data/", embeddings)
+    results = lexical_job_search(query)
+    if results is not None:
+        return format_job_descriptions(results)
+
+    vector_storage = get_vector_store(VECTOR_STORE_DIR)
+    if JOB_SEARCH_MODE == "dense":
+        with span("faiss_search"):
+            results = vector_storage.similarity_search_with_score(query, fetch_k=3)
+        return format_job_descriptions(results)
+
+    with span("faiss_search"):
+        dense = vector_storage.similarity_search_with_relevance_scores(query, k=HYBRID_FETCH_K)
+    with span("bm25_search"):
+        lexical = get_lexical_index(VECTOR_STORE_DIR).search(query, HYBRID_FETCH_K)
+    return format_job_descriptions(fuse_scores(dense, lexical, k=JOB_SEARCH_K))
+
+async def ajob_description_search(query: str) -> str:
+    """Async version of `job_description_search`."""
+    results = await asyncio.to_thread(lexical_job_search, query)
+    if results is not None:
+        return format_job_descriptions(results)
+
+    vector_storage = await asyncio.to_thread(get_vector_store, VECTOR_STORE_DIR)
+    if JOB_SEARCH_MODE == "dense":
+        with span("faiss_search"):
+            results = await vector_storage.asimilarity_search_with_score(query, fetch_k=3)
+        return format_job_descriptions(results)
+
+    with span("faiss_search"):
+        dense = await vector_storage.asimilarity_search_with_relevance_scores(query, k=HYBRID_FETCH_K)
+    lexical_index = await asyncio.to_thread(get_lexical_index, VECTOR_STORE_DIR)
+    with span("bm25_search"):
+        lexical = lexical_index.search(query, HYBRID_FETCH_K)
+    return format_job_descriptions(fuse_scores(dense, lexical, k=JOB_SEARCH_K))
+
+def job_description_search_many(queries: List[str], k: int = JOB_SEARCH_K) -> List[List[Tuple[Document, float]]]:
+    """
+    Dense search of several queries (sub-queries of a request, candidate profiles...) with one
+    embedding request and one FAISS search; a job description is only returned for its closest query.
+    """
+    vector_storage = get_vector_store(VECTOR_STORE_DIR)
+    with span("faiss_search"):
+        return search_many(vector_storage, queries, k)
 
-    results = vector_storage.similarity_search_with_score(query, fetch_k=3)
-    
+async def ajob_description_search_many(queries: List[str], k: int = JOB_SEARCH_K) -> List[List[Tuple[Document, float]]]:
+    """Async version of `job_description_search_many`, run in a worker thread."""
+    return await asyncio.to_thread(job_description_search_many, queries, k)
+
+def format_job_descriptions(results: List[Tuple[Document, float]]) -> str:
+    """Combine the similarity search hits into a single string."""
     combined_content = ""
     for i, (doc, probability) in enumerate(results, start=1):
         page_content = doc.page_content  
@@ -68,6 +177,7 @@ def job_description_search_tool():
     return Tool(
         name="job_description_similarity_search",
         func=job_description_search,
+        coroutine=ajob_description_search,
         description=
         """
         The "Job Description Similarity Search" tool matches queries to similar job descriptions, highlighting the top three. Useful for:
@@ -122,18 +232,8 @@ def measure_len_tool():
         """
     )
 
-def yt_search(query: str, n: int) -> str:
-    """Fetch youtube transcripts via youtube api and use this as input for llm chain
-    Args:
-    query (str): The question to be answered.
-    n (int): Number of YouTube videos to process.
-
-    Returns:
-    answer (str): Answer to your question
-    """
-
-    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0)
-
+def create_yt_chains(llm: ChatOpenAI) -> Tuple[LLMChain, LLMChain]:
+    """Create the chains turning a question into a youtube search query and answering it from transcript summaries."""
     search_terms_prompt = PromptTemplate(
         input_variables=["text_input"],
         template="I want you to give me a single good youtube search query based on the following prompt:\n\n {text_input}"
@@ -149,14 +249,10 @@ def yt_search(query: str, n: int) -> str:
 
     create_final_answer = LLMChain(llm=llm, prompt=final_answer_prompt)
 
-    #Power llm to create effective search terms
-    yt_query = YT_create_search_terms_chain.run(query)
+    return YT_create_search_terms_chain, create_final_answer
 
-    # get top n results from youtube API
-    youtube_ids = get_youtube_video_ids(yt_query, n) 
-
-    # Store all transcripts in a list
-    transcripts = [fetch_transcript(id, 'en') for id in youtube_ids]
+def chunk_transcripts(transcripts: List[str]) -> List[Document]:
+    """Chunk the transcripts to document format."""
     texts = []
     
     # Loop over transcripts and chunk the data to document format
@@ -166,6 +262,31 @@ def yt_search(query: str, n: int) -> str:
             tanscript_list = chunk_documents(title_and_transcript, 2000, 100)
             texts.extend(tanscript_list)
 
+    return texts
+
+def yt_search(query: str, n: int) -> str:
+    """Fetch youtube transcripts via youtube api and use this as input for llm chain
+    Args:
+    query (str): The question to be answered.
+    n (int): Number of YouTube videos to process.
+
+    Returns:
+    answer (str): Answer to your question
+    """
+
+    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0)
+    YT_create_search_terms_chain, create_final_answer = create_yt_chains(llm)
+
+    #Power llm to create effective search terms
+    yt_query = YT_create_search_terms_chain.run(query)
+
+    # get top n results from youtube API
+    youtube_ids = get_youtube_video_ids(yt_query, n) 
+
+    # Store all transcripts in a list
+    transcripts = [fetch_transcript(id, 'en') for id in youtube_ids]
+    texts = chunk_transcripts(transcripts)
+
     # Run summarizaton chain
     summarize_chain = load_summarize_chain(llm, chain_type="map_reduce", verbose=True)
     summary = summarize_chain.run(texts)
@@ -175,11 +296,28 @@ def yt_search(query: str, n: int) -> str:
     
     return answer
 
+async def ayt_search(query: str, n: int) -> str:
+    """Async version of `yt_search`. Transcripts are fetched concurrently."""
+
+    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0)
+    YT_create_search_terms_chain, create_final_answer = create_yt_chains(llm)
+
+    yt_query = await YT_create_search_terms_chain.arun(query)
+    youtube_ids = await asyncio.to_thread(get_youtube_video_ids, yt_query, n)
+    transcripts = await asyncio.gather(*[asyncio.to_thread(fetch_transcript, id, 'en') for id in youtube_ids])
+    texts = chunk_transcripts(transcripts)
+
+    summarize_chain = load_summarize_chain(llm, chain_type="map_reduce", verbose=True)
+    summary = await summarize_chain.arun(texts)
+
+    return await create_final_answer.arun({"chain_output": summary, "query": query})
+
 
 def yt_search_tool():
     """Tool to answer questions based on youtube transcripts"""
     return Tool(
         name="youtube_search",
         func=yt_search,
+        coroutine=ayt_search,
         description="Tool to answer questions based on youtube transcripts"
     )
\ No newline at end of file
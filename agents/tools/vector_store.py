@@ -0,0 +1,169 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+from langchain_openai import OpenAIEmbeddings
+from loguru import logger
+from agents.tools.docstore import flat_vectors_path, load_sqlite_store, read_documents, sqlite_docstore_path
+from agents.tools.embedding_cache import CachedEmbeddings
+from agents.tools.faiss_index import set_search_params
+from agents.tools.retrieval import BM25Index
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide registry of FAISS vector stores.
+
+    Each index is deserialized once per process and shared by every caller. Before handing out a
+    store the registry compares the modification times of the files on disk with the ones seen at
+    load time, and transparently reloads the index when they changed. BM25 indexes of the same
+    docstores are kept the same way.
+
+    The shared embeddings client is wrapped in a `CachedEmbeddings`, unless `embedding_cache_size` is 0.
+    Approximate indexes are searched with `nprobe` IVF lists or `ef_search` HNSW candidates.
+    Indexes saved with a SQLite docstore (see `agents.tools.docstore`) are memory-mapped rather than
+    unpickled, so worker processes serving the same files share their pages; flat indexes map the
+    .npy copy of their vectors.
+    """
+
+    def __init__(
+        self,
+        embeddings_factory: Callable[[], Embeddings] = OpenAIEmbeddings,
+        embedding_cache_size: int = 10000,
+        embedding_cache_path: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ):
+        self.embeddings_factory = embeddings_factory
+        self.embedding_cache_size = embedding_cache_size
+        self.embedding_cache_path = embedding_cache_path
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self._embeddings: Optional[Embeddings] = None
+        self._stores: Dict[Tuple[str, str], Tuple[Tuple[float, ...], FAISS]] = {}
+        self._lexical_indexes: Dict[Tuple[str, str], Tuple[float, BM25Index]] = {}
+        # Reentrant: loading a store under the lock builds the embeddings client, which takes it too
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """The embeddings client shared by all the stores of this registry."""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    embeddings = self.embeddings_factory()
+                    if self.embedding_cache_size:
+                        embeddings = CachedEmbeddings(embeddings, self.embedding_cache_size, self.embedding_cache_path)
+                    self._embeddings = embeddings
+        return self._embeddings
+
+    @staticmethod
+    def _index_files(folder_path: str, index_name: str):
+        return [
+            os.path.join(folder_path, f"{index_name}.faiss"),
+            os.path.join(folder_path, f"{index_name}.pkl"),
+            sqlite_docstore_path(folder_path, index_name),
+            flat_vectors_path(folder_path, index_name),
+        ]
+
+    def _files_version(self, folder_path: str, index_name: str) -> Tuple[float, ...]:
+        return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else 0 for path in self._index_files(folder_path, index_name))
+
+    def _load(self, folder_path: str, index_name: str) -> FAISS:
+        if os.path.exists(sqlite_docstore_path(folder_path, index_name)):
+            store = load_sqlite_store(folder_path, self.embeddings, index_name)
+        else:
+            store = FAISS.load_local(folder_path, self.embeddings, index_name=index_name)
+        set_search_params(store.index, self.nprobe, self.ef_search)
+        return store
+
+    def get(self, folder_path: str = "data/", index_name: str = "index") -> FAISS:
+        """
+        Return the vector store saved in `folder_path`, loading it if it is not loaded yet or if the files on disk changed.
+        """
+        key = (os.path.abspath(folder_path), index_name)
+        version = self._files_version(folder_path, index_name)
+
+        cached = self._stores.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            # Another thread may have (re)loaded the store while we were waiting for the lock
+            cached = self._stores.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            if cached is not None:
+                logger.info(f"Index files in {folder_path} changed on disk, reloading '{index_name}'")
+            store = self._load(folder_path, index_name)
+            self._stores[key] = (version, store)
+            return store
+
+    def get_lexical_index(self, folder_path: str = "data/", index_name: str = "index") -> BM25Index:
+        """
+        Return the BM25 index of the docstore saved in `folder_path`, building it if it is not built yet or if the docstore changed on disk.
+        """
+        key = (os.path.abspath(folder_path), index_name)
+        docstore_path = sqlite_docstore_path(folder_path, index_name)
+        if not os.path.exists(docstore_path):
+            docstore_path = self._index_files(folder_path, index_name)[1]
+        version = os.stat(docstore_path).st_mtime_ns
+
+        cached = self._lexical_indexes.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            cached = self._lexical_indexes.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            logger.info(f"Building the BM25 index of '{index_name}' in {folder_path}")
+            index = BM25Index(self._documents(folder_path, index_name))
+            self._lexical_indexes[key] = (version, index)
+            return index
+
+    def _documents(self, folder_path: str, index_name: str) -> List[Document]:
+        """
+        Documents of the store in `folder_path`. A pickled docstore is taken from the loaded vector
+        store, which holds it anyway, rather than unpickled a second time.
+        """
+        if os.path.exists(sqlite_docstore_path(folder_path, index_name)) or not os.path.exists(self._index_files(folder_path, index_name)[0]):
+            return read_documents(folder_path, index_name)
+        store = self.get(folder_path, index_name)
+        return [store.docstore.search(doc_id) for doc_id in store.index_to_docstore_id.values()]
+
+    def clear(self):
+        """Drop all the loaded stores, they will be loaded again on the next request."""
+        with self._lock:
+            self._stores.clear()
+            self._lexical_indexes.clear()
+
+    def set_embeddings_factory(self, embeddings_factory: Callable[[], Embeddings]):
+        """Use another embeddings client; stores loaded with the previous one are dropped."""
+        with self._lock:
+            self.embeddings_factory = embeddings_factory
+            self._embeddings = None
+            self._stores.clear()
+
+
+_registry = VectorStoreRegistry(
+    embedding_cache_path=os.environ.get("EMBEDDING_CACHE_PATH"),
+    nprobe=int(os.environ["FAISS_NPROBE"]) if "FAISS_NPROBE" in os.environ else None,
+    ef_search=int(os.environ["FAISS_EF_SEARCH"]) if "FAISS_EF_SEARCH" in os.environ else None,
+)
+
+def get_vector_store_registry() -> VectorStoreRegistry:
+    """Return the process-wide vector store registry."""
+    return _registry
+
+def get_vector_store(folder_path: str = "data/", index_name: str = "index") -> FAISS:
+    """Return the shared FAISS store saved in `folder_path`."""
+    return _registry.get(folder_path, index_name)
+
+def get_lexical_index(folder_path: str = "data/", index_name: str = "index") -> BM25Index:
+    """Return the shared BM25 index of the docstore saved in `folder_path`."""
+    return _registry.get_lexical_index(folder_path, index_name)
@@ -0,0 +1,249 @@
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from agents.rate_limiter import estimate_tokens
+
+# Chain spans reported as stages in the summary: the nodes of the multi-agent graph
+STAGE_CHAINS = ["supervisor", "SQL", "VS"]
+
+# Upper bounds, in seconds, of the buckets of the OpenMetrics duration histograms
+DURATION_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """
+    Spans and events recorded during one agent run.
+
+    A span is a dict with 'name', 'kind' (chain, llm, tool or stage), 'start_ns' and 'end_ns' from
+    `perf_counter_ns`, 'duration_ms', the 'run_id'/'parent_run_id' LangChain reported, and
+    kind-specific 'attributes' such as token usage. Events are point-in-time records, e.g. cache hits.
+    """
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.spans: List[Dict[str, Any]] = []
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, kind: str, start_ns: int, end_ns: int, run_id: Optional[str] = None, parent_run_id: Optional[str] = None, **attributes: Any):
+        span = {
+            "name": name,
+            "kind": kind,
+            "start_ns": start_ns - self.start_ns,
+            "end_ns": end_ns - self.start_ns,
+            "duration_ms": (end_ns - start_ns) / 1e6,
+            "run_id": run_id,
+            "parent_run_id": parent_run_id,
+            "attributes": attributes,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def add_event(self, name: str, **attributes: Any):
+        with self._lock:
+            self.events.append({"name": name, "time_ns": time.perf_counter_ns() - self.start_ns, "attributes": attributes})
+
+    def summary(self) -> Dict[str, Any]:
+        """Time per stage, token usage and cache hits of the run."""
+        stages: Dict[str, float] = defaultdict(float)
+        tokens = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        for span in self.spans:
+            if span["kind"] != "chain" or span["name"] in STAGE_CHAINS:
+                stages[f"{span['kind']}:{span['name']}"] += span["duration_ms"]
+            for key in tokens:
+                tokens[key] += span["attributes"].get(key, 0)
+
+        caches: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        for event in self.events:
+            if "hit" in event["attributes"]:
+                caches[event["name"]]["hits" if event["attributes"]["hit"] else "misses"] += 1
+
+        return {
+            "total_ms": max((span["end_ns"] for span in self.spans), default=0) / 1e6,
+            "stages_ms": dict(stages),
+            "tokens": tokens,
+            "caches": dict(caches),
+            "spans": self.spans,
+            "events": self.events,
+        }
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler recording every chain, LLM and tool run as a span of a `Trace`."""
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, kind: str, name: str, run_id: UUID, parent_run_id: Optional[UUID], prompt: str = ""):
+        with self._lock:
+            self._runs[run_id] = {"kind": kind, "name": name, "parent_run_id": parent_run_id, "prompt": prompt, "start_ns": time.perf_counter_ns()}
+
+    def _end(self, run_id: UUID, **attributes: Any):
+        end_ns = time.perf_counter_ns()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        self.trace.add_span(
+            run["name"], run["kind"], run["start_ns"], end_ns,
+            run_id=str(run_id),
+            parent_run_id=str(run["parent_run_id"]) if run["parent_run_id"] else None,
+            **attributes,
+        )
+
+    @staticmethod
+    def _name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any], default: str) -> str:
+        if kwargs.get("name"):
+            return kwargs["name"]
+        if serialized:
+            return serialized.get("name") or (serialized.get("id") or [default])[-1]
+        return default
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start("chain", self._name(serialized, kwargs, "chain"), run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start("llm", self._name(serialized, kwargs, "llm"), run_id, parent_run_id, prompt="\n".join(prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        prompt = "\n".join(str(message.content) for batch in messages for message in batch)
+        self._start("llm", self._name(serialized, kwargs, "chat_model"), run_id, parent_run_id, prompt=prompt)
+
+    @staticmethod
+    def _usage(response: LLMResult, prompt: str) -> Dict[str, Any]:
+        """
+        Token usage reported by the provider. Streamed calls, which is how AgentExecutor calls its LLM,
+        get no usage from OpenAI, so it is estimated from the prompt and the generated text instead.
+        """
+        reported = (response.llm_output or {}).get("token_usage")
+        if reported:
+            return {key: reported.get(key, 0) for key in ["prompt_tokens", "completion_tokens", "total_tokens"]}
+
+        completion = ""
+        for generation in (g for batch in response.generations for g in batch):
+            completion += generation.text
+            message = getattr(generation, "message", None)
+            if message is not None and message.additional_kwargs:
+                completion += json.dumps(message.additional_kwargs)
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(completion)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens, "estimated_usage": True}
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        with self._lock:
+            prompt = self._runs.get(run_id, {}).get("prompt", "")
+        self._end(run_id, model=(response.llm_output or {}).get("model_name"), **self._usage(response, prompt))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start("tool", self._name(serialized, kwargs, "tool"), run_id, parent_run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+
+@contextmanager
+def tracing(trace: Optional[Trace] = None) -> Iterator[Trace]:
+    """Make `trace` (a new one by default) the current trace for `span`, `record_cache` and `tracing_callbacks`."""
+    trace = trace or Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def tracing_callbacks() -> List[BaseCallbackHandler]:
+    """Callbacks recording into the current trace, for LLM calls made outside of the agent's own callbacks."""
+    trace = current_trace()
+    return [TracingCallbackHandler(trace)] if trace is not None else []
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """Record the block as a 'stage' span of the current trace, if there is one."""
+    trace = current_trace()
+    start_ns = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.add_span(name, "stage", start_ns, time.perf_counter_ns(), **attributes)
+
+def record_cache(name: str, hit: bool, **attributes: Any):
+    """Record a cache hit or miss on the current trace, if there is one."""
+    trace = current_trace()
+    if trace is not None:
+        trace.add_event(name, hit=hit, **attributes)
+
+def write_jsonl(traces: Iterable[Dict[str, Any]], path: str):
+    """Append trace summaries to a JSONL file, one run per line."""
+    with open(path, "a") as f:
+        for summary in traces:
+            f.write(json.dumps(summary, default=str) + "\n")
+
+def to_openmetrics(traces: Iterable[Dict[str, Any]], buckets: List[float] = DURATION_BUCKETS) -> str:
+    """Render trace summaries as OpenMetrics span duration histograms and token counters."""
+    durations: Dict[tuple, List[float]] = defaultdict(list)
+    tokens: Dict[str, int] = defaultdict(int)
+    cache_events: Dict[tuple, int] = defaultdict(int)
+    for summary in traces:
+        for s in summary["spans"]:
+            durations[(s["kind"], s["name"])].append(s["duration_ms"] / 1000)
+        for key in ["prompt_tokens", "completion_tokens"]:
+            tokens[key.split("_")[0]] += summary["tokens"][key]
+        for name, counts in summary["caches"].items():
+            cache_events[(name, "true")] += counts["hits"]
+            cache_events[(name, "false")] += counts["misses"]
+
+    lines = [
+        "# TYPE agent_span_duration_seconds histogram",
+        "# UNIT agent_span_duration_seconds seconds",
+        "# HELP agent_span_duration_seconds Duration of the chain, LLM, tool and stage spans of agent runs.",
+    ]
+    for (kind, name), values in sorted(durations.items()):
+        labels = f'kind="{kind}",name="{name}"'
+        for bound in buckets:
+            lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="{bound}"}} {sum(v <= bound for v in values)}')
+        lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="+Inf"}} {len(values)}')
+        lines.append(f"agent_span_duration_seconds_count{{{labels}}} {len(values)}")
+        lines.append(f"agent_span_duration_seconds_sum{{{labels}}} {sum(values)}")
+
+    lines += [
+        "# TYPE agent_llm_tokens counter",
+        "# HELP agent_llm_tokens Prompt and completion tokens used by agent runs.",
+    ]
+    for token_type, count in sorted(tokens.items()):
+        lines.append(f'agent_llm_tokens_total{{type="{token_type}"}} {count}')
+
+    lines += [
+        "# TYPE agent_cache_lookups counter",
+        "# HELP agent_cache_lookups Cache lookups made by agent tools.",
+    ]
+    for (name, hit), count in sorted(cache_events.items()):
+        lines.append(f'agent_cache_lookups_total{{cache="{name}",hit="{hit}"}} {count}')
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
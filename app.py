@@ -1,26 +1,44 @@
+import math
+import os
 import streamlit as st
 from dotenv import load_dotenv
-from agents.agent_factory import agent_system_factory
-from evaluation.trajectory_evaluation.trajectory_evaluators import get_trajectory_evaluator
+from agents.agent_factory import agent_systems
+from agents.comparison import compare_agents
+from agents.tools.sql_results import read_result_page, spilled_result
+from evaluation.trajectory_evaluation.trajectory_evaluators import trajectory_evaluators
 
 load_dotenv(override=True)
 
-# Define all available agents
+# Define all available agents, they are only built the first time they are selected
 agents_mapping = {
-    "ReAct": agent_system_factory(agent_type="react"),
-    "OpenAITools": agent_system_factory(agent_type="openai"),
-    "MultiAgentSystem": agent_system_factory(agent_type="multi"),
+    "ReAct": "react",
+    "OpenAITools": "openai",
+    "MultiAgentSystem": "multi",
     # Add more agents here as needed
 }
 
-# Define the tra
+# Define the trajectory evaluators, they are only built the first time they are selected
 trajectory_evaluators_mapping = {
-    "Helpfulness": get_trajectory_evaluator("helpfulness"),
-    "Step necessity": get_trajectory_evaluator("step_necessity"),
-    "Tool selection": get_trajectory_evaluator("tool_selection"),
+    "Helpfulness": "helpfulness",
+    "Step necessity": "step_necessity",
+    "Tool selection": "tool_selection",
     # Add more evaluators here as needed
 }
 
+# Agent types to build in the background while the page loads, e.g. PREWARM_AGENTS=react,multi
+if os.environ.get("PREWARM_AGENTS"):
+    agent_systems.prewarm(os.environ["PREWARM_AGENTS"].split(","))
+
+# Maximum number of agent runs and evaluations executed at the same time
+MAX_CONCURRENCY = 6
+
+# Rows per page of the full SQL results
+RESULT_PAGE_SIZE = 100
+
+# SQL results truncated for the agents, whose full rows were written to a file: kept across reruns so they can be paged through
+if "sql_results" not in st.session_state:
+    st.session_state.sql_results = []
+
 # Page title
 title = "Compare agents"
 st.set_page_config(page_title=title)
@@ -28,65 +46,86 @@ st.title(title)
 
 with st.form('query_form', clear_on_submit=False):
     query_text = st.text_input(label='Enter your question:', placeholder='What is the average authorized capital of the companies in our database?', key='query_text')
-    agent_selection = st.multiselect('Select agents to compare:', ['ReAct', 'OpenAITools', 'MultiAgentSystem'])
-    eval_selection = st.multiselect('Select trajectory evaluations to run:', ['Helpfulness', 'Step necessity', 'Tool selection'])
+    agent_selection = st.multiselect('Select agents to compare:', list(agents_mapping))
+    eval_selection = st.multiselect('Select trajectory evaluations to run:', list(trajectory_evaluators_mapping))
     query_submitted = st.form_submit_button('Submit')
 
 if query_submitted and query_text and agent_selection:
+    st.session_state.sql_results = []
+    # Setup columns for side by side display
+    cols = dict(zip(agent_selection, st.columns(len(agent_selection))))
+
+    # Placeholders showing the progress of each agent while it runs, replaced by the response once it finishes
+    live = {agent: cols[agent].empty() for agent in agent_selection}
+    progress = {agent: [] for agent in agent_selection}
+    tokens = {agent: "" for agent in agent_selection}
+
     with st.spinner('Processing your query...'):
-        # Initialize a dictionary to store the responses from each agent
-        responses = {}
-
-        # Run the selected agents
-        for agent in agent_selection:
-            response, time = agents_mapping[agent].run_agent(query_text)
-            responses[agent] = agents_mapping[agent].format_agent_response(response)
-            responses[agent]['time'] = time
-
-        # Setup columns for side by side display
-        cols = st.columns(len(agent_selection))
-        
-        # Display the response output for each agent
-        for i, agent in enumerate(agent_selection):
-            with cols[i]:
-                st.subheader(f"{agent} Response:")
-                st.write(responses[agent]['output'])
-                st.write(f"Time taken: {responses[agent]['time']:.2f} seconds")
-                
-                # Display intermediate steps for each agent)
-                for step in responses[agent]['steps']:
-                    with st.expander(f"Step {step['step']}: Tool - {step['tool']}, Input - {step['tool_input']}", expanded=False):
-                        st.text_area("Log:", step['log'], key=f"{agent}_log_{step['step']}")
-                        if 'observation' in step:
-                            st.text_area("Observation:", step['observation'], key=f"{agent}_observation_{step['step']}")
-
-        # If the user has submitted the evaluation form, run the selected evaluations
-        if eval_selection:
-            evaluations = {}
-            for j, agent in enumerate(agent_selection):  
-                evaluations[agent] = {}
-                for evaluation in eval_selection:
-                    evaluations[agent][evaluation] = trajectory_evaluators_mapping[evaluation].evaluate_agent_trajectory(
-                        prediction=responses[agent]["output"],
-                        input=query_text,
-                        agent_trajectory=responses[agent]["agent_trajectory"] 
-                    )
-                with cols[j]:  
-                    st.subheader(f"{agent} Trajectory Evaluation:")
-                    for evaluation in evaluations[agent]:
-                        st.markdown(f"#### {evaluation}")
-                        score = evaluations[agent][evaluation]["score"]
-                        if score == 1:
-                            st.write("Test passed ✅")
-                        else:
-                            st.write("Test failed ❌")
-                        with st.expander("Reasoning", expanded=False):
-                            st.write(evaluations[agent][evaluation]["reasoning"]["text"])
-                            
-  
-
-
-
-
-        
-                
\ No newline at end of file
+        # Run the selected agents and evaluations concurrently, and display each agent as soon as it finishes
+        events = compare_agents(
+            query_text,
+            agents={agent: agent_systems.get(agents_mapping[agent]) for agent in agent_selection},
+            evaluators={evaluation: trajectory_evaluators.get(trajectory_evaluators_mapping[evaluation]) for evaluation in eval_selection},
+            max_concurrency=MAX_CONCURRENCY,
+            stream=True,
+        )
+
+        for event in events:
+            agent = event["agent"]
+            if event["type"] == "agent_event":
+                agent_event = event["event"]
+                if agent_event["type"] == "token":
+                    tokens[agent] += agent_event["content"]
+                elif agent_event["type"] == "route":
+                    progress[agent].append(f"Supervisor routed to **{agent_event['next']}**")
+                elif agent_event["type"] == "tool_call":
+                    progress[agent].append(f"Calling `{agent_event['tool']}` with `{agent_event['input']}`")
+                elif agent_event["type"] == "tool_observation":
+                    progress[agent].append(f"`{agent_event['tool']}` returned {len(str(agent_event['output']))} characters")
+                    result = spilled_result(agent_event["output"])
+                    if result is not None:
+                        st.session_state.sql_results.append({"agent": agent, "file": result["result_file"], "total_rows": result["total_rows"]})
+                live[agent].markdown("\n\n".join(progress[agent] + [tokens[agent]]))
+                continue
+
+            with cols[agent]:
+                if event["type"] == "error":
+                    live[agent].empty()
+                    failed = f"{event['evaluation']} evaluation" if event["evaluation"] else "Agent"
+                    st.error(f"{failed} failed: {event['error']}")
+
+                elif event["type"] == "response":
+                    live[agent].empty()
+                    response = event["response"]
+                    st.subheader(f"{agent} Response:")
+                    st.write(response['output'])
+                    st.write(f"Time taken: {response['time']:.2f} seconds")
+
+                    # Display intermediate steps for each agent)
+                    for step in response['steps']:
+                        with st.expander(f"Step {step['step']}: Tool - {step['tool']}, Input - {step['tool_input']}", expanded=False):
+                            st.text_area("Log:", step['log'], key=f"{agent}_log_{step['step']}")
+                            if 'observation' in step:
+                                st.text_area("Observation:", step['observation'], key=f"{agent}_observation_{step['step']}")
+
+                    if eval_selection:
+                        st.subheader(f"{agent} Trajectory Evaluation:")
+
+                else:
+                    st.markdown(f"#### {event['evaluation']}")
+                    if event["result"]["score"] == 1:
+                        st.write("Test passed ✅")
+                    else:
+                        st.write("Test failed ❌")
+                    with st.expander("Reasoning", expanded=False):
+                        st.write(event["result"]["reasoning"]["text"])
+
+# Page through the full results of the SQL queries the agents only saw the first rows of
+for i, result in enumerate(st.session_state.sql_results):
+    if not os.path.exists(result["file"]):
+        continue
+    with st.expander(f"{result['agent']}: full SQL result ({result['total_rows']} rows)", expanded=False):
+        pages = max(math.ceil(result["total_rows"] / RESULT_PAGE_SIZE), 1)
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"sql_result_page_{i}")
+        rows = read_result_page(result["file"], offset=(page - 1) * RESULT_PAGE_SIZE, limit=RESULT_PAGE_SIZE)
+        st.dataframe([dict(zip(rows["columns"], row)) for row in rows["rows"]])
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Words routing a question to the job descriptions instead of the company database
+JOB_KEYWORDS = ["job", "role", "position", "developer", "engineer", "skills", "qualification", "candidate", "hiring"]
+
+# SQL returned by the fake SQL generation, by the first keyword found in the question
+SQL_BY_KEYWORD = {
+    "count": "SELECT COUNT(*) FROM companies",
+    "how many": "SELECT COUNT(*) FROM companies",
+    "state": "SELECT REGISTERED_STATE, COUNT(*) FROM companies GROUP BY REGISTERED_STATE",
+    "status": "SELECT COMPANY_STATUS, COUNT(*) FROM companies GROUP BY COMPANY_STATUS",
+    "paid": "SELECT ROUND(AVG(PAIDUP_CAPITAL), 2) FROM companies",
+}
+DEFAULT_SQL = "SELECT ROUND(AVG(AUTHORIZED_CAP), 2) FROM companies"
+
+
+def is_job_question(question: str) -> bool:
+    question = question.lower()
+    return any(keyword in question for keyword in JOB_KEYWORDS)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for `ChatOpenAI` that answers like the real model would in this repo's
+    agents, without any network call.
+
+    It routes as the supervisor (function calling), calls tools as an OpenAI tools agent, follows the
+    ReAct format, and writes SQL for `create_sql_query_chain`, picking the job descriptions or the
+    company database from keywords in the question. Every call sleeps `latency` seconds, and
+    responses are streamed word by word with `stream_delay` seconds between tokens.
+    """
+
+    latency: float = 0.0
+    stream_delay: float = 0.0
+    model_name: str = "fake-gpt"
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature}
+
+    def bind_functions(self, functions: List[Dict[str, Any]], function_call: Optional[str] = None, **kwargs: Any):
+        if function_call is not None:
+            kwargs["function_call"] = {"name": function_call}
+        return self.bind(functions=functions, **kwargs)
+
+    def bind_tools(self, tools: List[Dict[str, Any]], **kwargs: Any):
+        return self.bind(tools=tools, **kwargs)
+
+    @staticmethod
+    def _question(messages: List[BaseMessage]) -> str:
+        for message in messages:
+            if isinstance(message, HumanMessage):
+                # Prompt templates describe the format first, the actual question comes last
+                matches = re.findall(r"Question: (.*)", message.content)
+                return matches[-1].strip() if matches else message.content
+        return messages[-1].content
+
+    def _respond(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        question = self._question(messages)
+        prompt = messages[-1].content if isinstance(messages[-1].content, str) else ""
+
+        # Supervisor routing
+        if "functions" in kwargs:
+            answered = any(isinstance(m, AIMessage) and m.name in ["SQL", "VS"] for m in messages)
+            route = "FINISH" if answered else ("VS" if is_job_question(question) else "SQL")
+            return AIMessage(content="", additional_kwargs={"function_call": {"name": "route", "arguments": json.dumps({"next": route})}})
+
+        # OpenAI tools agent
+        if "tools" in kwargs:
+            observations = [m.content for m in messages if isinstance(m, ToolMessage)]
+            if observations:
+                return AIMessage(content=f"Based on the data: {observations[-1][:200]}")
+            names = [tool["function"]["name"] for tool in kwargs["tools"]]
+            preferred = "job_description_similarity_search" if is_job_question(question) else "company_sql_search"
+            name = preferred if preferred in names else names[0]
+            tool_call = {"id": f"call_{hashlib.md5(question.encode()).hexdigest()[:8]}", "type": "function", "function": {"name": name, "arguments": json.dumps({"__arg1": question})}}
+            return AIMessage(content="", additional_kwargs={"tool_calls": [tool_call]})
+
+        # SQL generation
+        if "SQLQuery" in prompt:
+            lowered = question.lower()
+            sql = next((sql for keyword, sql in SQL_BY_KEYWORD.items() if keyword in lowered), DEFAULT_SQL)
+            return AIMessage(content=sql)
+
+        # ReAct agent
+        if "Action Input" in prompt:
+            if "Observation:" in prompt.split("Question:")[-1]:
+                return AIMessage(content="Thought: I now know the final answer\nFinal Answer: Based on the data, here is the answer.")
+            tool = "job_description_similarity_search" if is_job_question(question) else "company_sql_search"
+            return AIMessage(content=f"Thought: I should look this up.\nAction: {tool}\nAction Input: {question}")
+
+        return AIMessage(content=f"Answer to: {question}")
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], response: AIMessage) -> Dict[str, Any]:
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        completion_tokens = len(response.content.split()) + len(json.dumps(response.additional_kwargs).split())
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def _result(self, messages: List[BaseMessage], **kwargs: Any) -> ChatResult:
+        response = self._respond(messages, **kwargs)
+        return ChatResult(
+            generations=[ChatGeneration(message=response)],
+            llm_output={"token_usage": self._usage(messages, response), "model_name": self.model_name},
+        )
+
+    def _chunks(self, response: AIMessage) -> List[ChatGenerationChunk]:
+        if not response.content:
+            return [ChatGenerationChunk(message=AIMessageChunk(content="", additional_kwargs=response.additional_kwargs))]
+        words = response.content.split(" ")
+        return [ChatGenerationChunk(message=AIMessageChunk(content=word + (" " if i < len(words) - 1 else ""))) for i, word in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            time.sleep(self.stream_delay)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            await asyncio.sleep(self.stream_delay)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic stand-in for `OpenAIEmbeddings`: hashed bag-of-words vectors, so texts sharing
+    words are close to each other. Every call sleeps `latency` seconds.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.0, model: str = "fake-embedding"):
+        self.size = size
+        self.latency = latency
+        self.model = model
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
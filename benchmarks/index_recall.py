@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+import faiss
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.tools.faiss_index import make_index, reconstruct_vectors, set_search_params
+
+# Search parameters swept for each approximate index type
+SWEEPS = {
+    "flat": [{}],
+    "ivf_flat": [{"nprobe": n} for n in [1, 4, 16, 64]],
+    "ivf_pq": [{"nprobe": n} for n in [1, 4, 16, 64]],
+    "hnsw": [{"ef_search": n} for n in [16, 32, 64, 128]],
+}
+
+
+def synthetic_vectors(n: int, dimension: int, clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Normalized vectors drawn around random centers, clustered like text embeddings are."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.5 * rng.normal(size=(n, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def sample_queries(vectors: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of random indexed vectors, standing in for queries close to some documents."""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(len(vectors), size=n)] + 0.05 * rng.normal(size=(n, vectors.shape[1]))
+    return queries.astype(np.float32)
+
+def evaluate_index(index: faiss.Index, queries: np.ndarray, exact: np.ndarray, k: int) -> Dict[str, float]:
+    """Recall@k against the exact neighbours, and latency of one query at a time as the search tool runs them."""
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    recall = np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)])
+    return {"recall": float(recall), "mean_ms": float(np.mean(latencies)), "p95_ms": float(np.percentile(latencies, 95))}
+
+def compare_index_types(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 4,
+    index_types: Optional[List[str]] = None,
+    **index_params: Any,
+) -> List[Dict[str, Any]]:
+    """Build each index type over `vectors` and measure every search setting of `SWEEPS` against the exact flat index."""
+    exact_index = make_index("flat", vectors)
+    exact_index.add(vectors)
+    _, exact = exact_index.search(queries, k)
+
+    rows = []
+    for index_type in index_types or list(SWEEPS):
+        start = time.perf_counter()
+        index = make_index(index_type, vectors, **index_params)
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 2 ** 20
+        for params in SWEEPS[index_type]:
+            set_search_params(index, **params)
+            rows.append({"index_type": index_type, **params, "build_s": build_s, "size_mb": size_mb, **evaluate_index(index, queries, exact, k)})
+    return rows
+
+def print_report(rows: List[Dict[str, Any]]):
+    print(f"{'index':<9} {'setting':<14} {'recall':>7} {'mean ms':>8} {'p95 ms':>8} {'size MB':>8} {'build s':>8}")
+    for row in rows:
+        setting = ", ".join(f"{key}={row[key]}" for key in ["nprobe", "ef_search"] if key in row)
+        print(f"{row['index_type']:<9} {setting:<14} {row['recall']:>7.3f} {row['mean_ms']:>8.3f} {row['p95_ms']:>8.3f} {row['size_mb']:>8.2f} {row['build_s']:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the recall and latency of the approximate FAISS index types with the exact flat index.")
+    parser.add_argument("--folder", help="Folder of a flat or HNSW index whose vectors are used. Synthetic vectors by default.")
+    parser.add_argument("--index-name", default="index")
+    parser.add_argument("--vectors", type=int, default=50000, help="Number of synthetic vectors.")
+    parser.add_argument("--dimension", type=int, default=256, help="Dimension of the synthetic vectors.")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4, help="Neighbours retrieved per query, as in job_description_search.")
+    parser.add_argument("--index-types", nargs="+", choices=list(SWEEPS), default=list(SWEEPS))
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--pq-nbits", type=int, default=8)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.folder:
+        vectors = reconstruct_vectors(faiss.read_index(os.path.join(args.folder, f"{args.index_name}.faiss")))
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dimension)
+    queries = sample_queries(vectors, args.queries)
+
+    rows = compare_index_types(vectors, queries, args.k, args.index_types, nlist=args.nlist, pq_m=args.pq_m, pq_nbits=args.pq_nbits, hnsw_m=args.hnsw_m)
+    print_report(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,189 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import agents.multi_agent_systems as multi_agent_systems
+import agents.single_agent_systems as single_agent_systems
+import agents.tools.tools as tools
+from langchain_community.vectorstores import FAISS
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from loguru import logger
+from agents.tools.sql_cache import clear_sql_caches
+from agents.tools.vector_store import get_vector_store_registry
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), "questions.json")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+AGENT_BUILDERS = {
+    "react": lambda: single_agent_systems.get_agent(agent_type="react"),
+    "openai": lambda: single_agent_systems.get_agent(agent_type="openai"),
+    "multi": lambda: multi_agent_systems.get_mas(),
+}
+
+
+def build_index(embeddings: FakeEmbeddings, source_dir: str, target_dir: str):
+    """Embed the job descriptions of the docstore in `source_dir` with the fake embeddings and save the index to `target_dir`."""
+    with open(os.path.join(source_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    documents = [docstore.search(index_to_docstore_id[i]) for i in range(len(index_to_docstore_id))]
+    store = FAISS.from_texts([doc.page_content for doc in documents], embeddings, metadatas=[doc.metadata for doc in documents])
+    store.save_local(target_dir)
+
+@contextmanager
+def fake_environment(llm_latency: float = 0.0, embedding_latency: float = 0.0, source_dir: str = "data/") -> Iterator[None]:
+    """
+    Swap `ChatOpenAI` and `OpenAIEmbeddings` for the deterministic fakes, and point the job search
+    tool at an index of the same documents built with the fake embeddings. The global LLM cache is
+    disabled so fake responses are never recorded. Everything is restored on exit.
+    """
+    def fake_llm(**kwargs: Any) -> FakeChatModel:
+        return FakeChatModel(latency=llm_latency, temperature=kwargs.get("temperature", 0.0))
+
+    embeddings = FakeEmbeddings(latency=embedding_latency)
+    registry = get_vector_store_registry()
+    modules = [single_agent_systems, multi_agent_systems, tools]
+    originals = {module: module.ChatOpenAI for module in modules}
+    original_embeddings_factory = registry.embeddings_factory
+    original_vector_store_dir = tools.VECTOR_STORE_DIR
+    original_llm_cache = get_llm_cache()
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        build_index(FakeEmbeddings(), source_dir, index_dir)
+        try:
+            for module in modules:
+                module.ChatOpenAI = fake_llm
+            registry.set_embeddings_factory(lambda: embeddings)
+            tools.VECTOR_STORE_DIR = index_dir
+            set_llm_cache(None)
+            clear_sql_caches()
+            yield
+        finally:
+            for module, original in originals.items():
+                module.ChatOpenAI = original
+            registry.set_embeddings_factory(original_embeddings_factory)
+            tools.VECTOR_STORE_DIR = original_vector_store_dir
+            set_llm_cache(original_llm_cache)
+            clear_sql_caches()
+
+def benchmark_agent(agent: Any, questions: List[str], repeat: int = 1, concurrency: int = 1) -> Dict[str, Any]:
+    """
+    Run the questions `repeat` times through the agent's batch API and summarize latency, throughput, memory and per-stage time.
+    'peak_rss_mb' is the peak of the whole process: run one agent per process to get the agent's own.
+    """
+    queries = questions * repeat
+    start = time.perf_counter()
+    results = agent.run_batch(queries, max_concurrency=concurrency)
+    wall = time.perf_counter() - start
+
+    latencies = np.array([r['time'] * 1000 for r in results if r['error'] is None])
+    stage_ms = defaultdict(float)
+    for r in results:
+        if r['error'] is None:
+            for stage, ms in r['trace']['stages_ms'].items():
+                if not stage.startswith("chain:"):
+                    stage_ms[stage] += ms / len(latencies)
+
+    return {
+        "queries": len(queries),
+        "errors": [r['error'] for r in results if r['error'] is not None],
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        "qps": len(queries) / wall,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stage_ms_per_query": dict(stage_ms),
+    }
+
+def _benchmark_in_process(agent_type: str, questions: List[str], repeat: int, concurrency: int, llm_latency: float, embedding_latency: float) -> Dict[str, Any]:
+    with fake_environment(llm_latency, embedding_latency):
+        return benchmark_agent(AGENT_BUILDERS[agent_type](), questions, repeat, concurrency)
+
+def run_benchmark(agent_types: List[str], questions: List[str], repeat: int = 1, concurrency: int = 1, llm_latency: float = 0.0, embedding_latency: float = 0.0) -> Dict[str, Any]:
+    """
+    Benchmark each agent in a fresh process of its own, so that its peak RSS is not inflated by the
+    agents benchmarked before it. Processes are spawned rather than forked to start from a clean heap.
+    """
+    results = {}
+    for agent_type in agent_types:
+        logger.info(f"Benchmarking {agent_type} agent")
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results[agent_type] = executor.submit(_benchmark_in_process, agent_type, questions, repeat, concurrency, llm_latency, embedding_latency).result()
+    return results
+
+def check_regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[str]:
+    """Compare p95 latency and throughput with the baseline; return a message per regression beyond `tolerance`."""
+    regressions = []
+    for agent_type, metrics in results.items():
+        reference = baseline.get(agent_type)
+        if reference is None:
+            continue
+        if metrics["errors"]:
+            regressions.append(f"{agent_type}: {len(metrics['errors'])} queries failed")
+        if metrics["p95_ms"] is not None and metrics["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{agent_type}: p95 latency {metrics['p95_ms']:.1f} ms > baseline {reference['p95_ms']:.1f} ms")
+        if metrics["qps"] < reference["qps"] * (1 - tolerance):
+            regressions.append(f"{agent_type}: throughput {metrics['qps']:.2f} q/s < baseline {reference['qps']:.2f} q/s")
+    return regressions
+
+def print_report(results: Dict[str, Any]):
+    print(f"{'agent':<8} {'queries':>7} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q/s':>8} {'RSS MB':>8}")
+    for agent_type, m in results.items():
+        print(f"{agent_type:<8} {m['queries']:>7} {len(m['errors']):>6} {m['p50_ms'] or 0:>9.1f} {m['p95_ms'] or 0:>9.1f} {m['p99_ms'] or 0:>9.1f} {m['qps']:>8.2f} {m['peak_rss_mb']:>8.1f}")
+        for stage, ms in sorted(m["stage_ms_per_query"].items(), key=lambda item: -item[1]):
+            print(f"    {stage:<50} {ms:>9.2f} ms/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the agents offline with a deterministic fake LLM and fake embeddings.")
+    parser.add_argument("--agents", nargs="+", default=list(AGENT_BUILDERS), choices=list(AGENT_BUILDERS))
+    parser.add_argument("--questions", default=QUESTIONS_PATH, help="JSON file with the list of questions.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of times each question is asked.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake LLM waits per call.")
+    parser.add_argument("--embedding-latency", type=float, default=0.01, help="Seconds the fake embeddings wait per call.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline to compare with.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline instead of comparing.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression of p95 latency and throughput.")
+    args = parser.parse_args()
+
+    with open(args.questions) as f:
+        questions = json.load(f)
+
+    config = {"repeat": args.repeat, "concurrency": args.concurrency, "llm_latency": args.llm_latency, "embedding_latency": args.embedding_latency, "questions": len(questions)}
+    results = run_benchmark(args.agents, questions, args.repeat, args.concurrency, args.llm_latency, args.embedding_latency)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["config"] != config:
+            print("Baseline was recorded with another configuration, skipping the regression check.")
+        else:
+            regressions = check_regressions(results, baseline["results"], args.tolerance)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            if regressions:
+                sys.exit(1)
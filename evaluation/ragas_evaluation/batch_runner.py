@@ -0,0 +1,138 @@
+import argparse
+import json
+import math
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from dotenv import load_dotenv
+from langchain.chains.base import Chain
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableParallel
+from loguru import logger
+from agents.tools.vector_store import get_vector_store_registry
+
+
+def default_metric_chains(embeddings: Optional[Embeddings] = None) -> Dict[str, Chain]:
+    """
+    The four RAGAS metric chains of `ragas_evaluators`. Answer relevancy, the only metric embedding
+    text, uses `embeddings`, by default the client shared with the vector stores and its caches.
+    """
+    # ragas is only needed for this evaluation, so it is imported on demand
+    from evaluation.ragas_evaluation.ragas_evaluators import answer_rel_chain, context_recall_chain, context_rel_chain, faithfulness_chain
+
+    answer_rel_chain.metric.embeddings = embeddings or get_vector_store_registry().embeddings
+    return {
+        "faithfulness": faithfulness_chain,
+        "answer_relevancy": answer_rel_chain,
+        "context_precision": context_rel_chain,
+        "context_recall": context_recall_chain,
+    }
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a JSONL file with 'query', 'result', 'source_documents' (texts or
+    {'page_content': ..., 'metadata': ...} dicts, read as `Document`s as the RAGAS chains expect)
+    and 'ground_truths'; records without an 'id' get their line number.
+    """
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record.setdefault("id", str(line_number))
+            record["source_documents"] = [
+                Document(page_content=document) if isinstance(document, str) else Document(**document)
+                for document in record.get("source_documents", [])
+            ]
+            yield record
+
+def evaluate_record(record: Dict[str, Any], chains: Dict[str, Chain]) -> Dict[str, Any]:
+    """Score one record with all the metrics concurrently; a metric missing some of its inputs is skipped."""
+    runnable = RunnableParallel({
+        name: chain for name, chain in chains.items() if all(key in record for key in chain.input_keys)
+    })
+    result = {"id": record["id"], "scores": {name: None for name in chains}, "error": None}
+    try:
+        outputs = runnable.invoke({key: value for key, value in record.items() if key != "id"})
+        for name, output in outputs.items():
+            result["scores"][name] = output[chains[name].output_keys[0]]
+    except Exception as e:
+        logger.error(f"Evaluation of record {record['id']} failed: {e}")
+        result["error"] = repr(e)
+    return result
+
+def aggregate_scores(results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mean, minimum and number of scored records of each metric."""
+    totals: Dict[str, Dict[str, float]] = {}
+    records = errors = 0
+    for result in results:
+        records += 1
+        errors += result["error"] is not None
+        for name, score in result["scores"].items():
+            total = totals.setdefault(name, {"sum": 0.0, "min": math.inf, "count": 0})
+            if score is None or (isinstance(score, float) and math.isnan(score)):
+                continue
+            total["sum"] += score
+            total["min"] = min(total["min"], score)
+            total["count"] += 1
+
+    return {
+        "records": records,
+        "errors": errors,
+        "metrics": {
+            name: {"mean": t["sum"] / t["count"], "min": t["min"], "count": t["count"]} if t["count"] else {"mean": None, "min": None, "count": 0}
+            for name, t in totals.items()
+        },
+    }
+
+def run_ragas_evaluation(records: Iterable[Dict[str, Any]], results_path: str, chains: Optional[Dict[str, Chain]] = None, max_concurrency: int = 8) -> Dict[str, Any]:
+    """
+    Score every record with the RAGAS metrics and return the aggregates.
+
+    At most `max_concurrency` records are evaluated at a time, each with its metrics running in
+    parallel. Per-record scores are appended to `results_path` as they complete, so a long run can
+    be followed (and its finished part kept) while it is going.
+    """
+    chains = chains or default_metric_chains()
+    results = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool, open(results_path, "w") as out:
+        pending = set()
+
+        def write_completed(futures):
+            for future in futures:
+                result = future.result()
+                results.append({"scores": result["scores"], "error": result["error"]})
+                out.write(json.dumps(result) + "\n")
+            out.flush()
+
+        for record in records:
+            # Keep a bounded window of records in memory instead of reading the whole dataset upfront
+            if len(pending) >= 2 * max_concurrency:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_completed(finished)
+            pending.add(pool.submit(evaluate_record, record, chains))
+
+        write_completed(wait(pending).done)
+
+    return aggregate_scores(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a JSONL dataset of RAG answers with the RAGAS metrics.")
+    parser.add_argument("records", help="JSONL file with query, result, source_documents and ground_truths per line.")
+    parser.add_argument("--results", help="JSONL file receiving the scores of each record. Defaults to <records>.scores.jsonl.")
+    parser.add_argument("--summary", help="JSON file receiving the aggregated scores. Defaults to <records>.summary.json.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    load_dotenv()
+    base = os.path.splitext(args.records)[0]
+    summary = run_ragas_evaluation(read_records(args.records), args.results or f"{base}.scores.jsonl", max_concurrency=args.concurrency)
+    with open(args.summary or f"{base}.summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
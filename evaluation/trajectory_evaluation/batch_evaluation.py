@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from dotenv import load_dotenv
+from loguru import logger
+from agents.rate_limiter import RateLimiter, estimate_tokens
+from evaluation.trajectory_evaluation.trajectory_evaluators import CompositeTrajectoryEvaluator, trajectory_evaluators
+
+
+def read_runs(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream agent runs from a JSONL log. Each line holds 'input', 'output', 'agent_trajectory' and
+    optionally 'id', 'agent_type' and 'steps'; runs without an id are identified by their line number.
+    """
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            run.setdefault("id", str(line_number))
+            yield run
+
+def read_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Latest result of each run in a results file; a line cut off by an interruption is ignored."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[result["id"]] = result
+    return results
+
+def completed_runs(path: str) -> Set[str]:
+    """Ids of the runs already evaluated without error, skipped when resuming."""
+    return {run_id for run_id, result in read_results(path).items() if result["error"] is None}
+
+def evaluate_run(run: Dict[str, Any], evaluators: Dict[str, Any], limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """Evaluate one run with every evaluator; a composite evaluator contributes one result per criterion."""
+    trajectory = run["agent_trajectory"] if isinstance(run["agent_trajectory"], str) else json.dumps(run["agent_trajectory"])
+    tokens = estimate_tokens(run["input"] + str(run["output"]) + trajectory)
+    result = {"id": run["id"], "agent_type": run.get("agent_type", "unknown"), "results": {}, "error": None}
+    try:
+        for name, evaluator in evaluators.items():
+            if limiter is not None:
+                limiter.acquire(tokens=tokens)
+            evaluation = evaluator.evaluate_agent_trajectory(prediction=run["output"], input=run["input"], agent_trajectory=trajectory)
+            for criterion, value in (evaluation.items() if "score" not in evaluation else [(name, evaluation)]):
+                reasoning = value["reasoning"]["text"] if isinstance(value["reasoning"], dict) else value["reasoning"]
+                result["results"][criterion] = {"score": value["score"], "value": value["value"], "reasoning": reasoning}
+    except Exception as e:
+        logger.error(f"Evaluation of run {run['id']} failed: {e}")
+        result["error"] = repr(e)
+    return result
+
+def aggregate(results_path: str) -> Dict[str, Any]:
+    """Pass rate of each criterion per agent type, and over all agents under 'all'."""
+    counts = defaultdict(lambda: {"runs": 0, "errors": 0, "passed": defaultdict(int), "evaluated": defaultdict(int)})
+    for result in read_results(results_path).values():
+        for group in [result["agent_type"], "all"]:
+            count = counts[group]
+            count["runs"] += 1
+            count["errors"] += result["error"] is not None
+            for criterion, value in result["results"].items():
+                count["evaluated"][criterion] += 1
+                count["passed"][criterion] += value["score"]
+
+    return {
+        group: {
+            "runs": count["runs"],
+            "errors": count["errors"],
+            "pass_rate": {criterion: count["passed"][criterion] / n for criterion, n in count["evaluated"].items()},
+        }
+        for group, count in counts.items()
+    }
+
+def default_evaluators(criteria: Optional[List[str]] = None, single_call: bool = False) -> Dict[str, Any]:
+    """The registered trajectory evaluators, or one composite evaluator scoring them all in a single call."""
+    criteria = criteria or [name for name in trajectory_evaluators.keys() if name != "composite"]
+    if single_call:
+        return {"composite": CompositeTrajectoryEvaluator(criteria)}
+    return {name: trajectory_evaluators.get(name) for name in criteria}
+
+def evaluate_runs(
+    runs_path: str,
+    results_path: str,
+    evaluators: Optional[Dict[str, Any]] = None,
+    max_concurrency: int = 8,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate every run of `runs_path` and return the aggregated pass rates.
+
+    Runs are streamed from the log and at most `max_concurrency` of them are evaluated at a time.
+    Each result is appended to `results_path` as soon as it is ready, so the results file is also the
+    checkpoint: running again with the same file skips the runs already evaluated and retries the failed ones.
+    """
+    evaluators = evaluators or default_evaluators()
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute) if requests_per_minute or tokens_per_minute else None
+    done = completed_runs(results_path)
+    if done:
+        logger.info(f"Resuming, {len(done)} runs already evaluated in {results_path}")
+
+    evaluated = 0
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool, open(results_path, "a") as out:
+        pending = set()
+
+        def write_completed(futures):
+            nonlocal evaluated
+            for future in futures:
+                out.write(json.dumps(future.result(), default=str) + "\n")
+                evaluated += 1
+            out.flush()
+
+        for run in read_runs(runs_path):
+            if run["id"] in done:
+                continue
+            # Keep a bounded window of runs in memory instead of reading the whole log upfront
+            if len(pending) >= 2 * max_concurrency:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_completed(finished)
+            pending.add(pool.submit(evaluate_run, run, evaluators, limiter))
+
+        write_completed(wait(pending).done)
+
+    logger.info(f"Evaluated {evaluated} runs, results in {results_path}")
+    return aggregate(results_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the trajectories of a JSONL log of agent runs.")
+    parser.add_argument("runs", help="JSONL file with one agent run per line.")
+    parser.add_argument("--results", help="JSONL file receiving the evaluation of each run, also used to resume. Defaults to <runs>.results.jsonl.")
+    parser.add_argument("--summary", help="JSON file receiving the pass rates per agent type. Defaults to <runs>.summary.json.")
+    parser.add_argument("--criteria", nargs="+", help="Evaluators to run, all the registered ones by default.")
+    parser.add_argument("--single-call", action="store_true", help="Score all the criteria of a run in one LLM call.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests-per-minute", type=float)
+    parser.add_argument("--tokens-per-minute", type=float)
+    args = parser.parse_args()
+
+    load_dotenv()
+    base = os.path.splitext(args.runs)[0]
+    summary = evaluate_runs(
+        args.runs,
+        args.results or f"{base}.results.jsonl",
+        default_evaluators(args.criteria, args.single_call),
+        args.concurrency,
+        args.requests_per_minute,
+        args.tokens_per_minute,
+    )
+    with open(args.summary or f"{base}.summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
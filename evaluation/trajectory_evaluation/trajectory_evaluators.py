@@ -1,9 +1,14 @@
-from typing import Any, Optional, Sequence, Tuple
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 from langchain.chains import LLMChain
+from langchain.chains.openai_functions import create_structured_output_runnable
+from langchain.prompts import PromptTemplate
+from langchain_core.runnables import RunnableConfig, RunnableParallel
 from langchain.evaluation import AgentTrajectoryEvaluator
 from langchain.schema import AgentAction
-from langchain_openai import ChatOpenAI
+from agents.llm_cache import ChatOpenAI
+from agents.registry import LazyRegistry
 
 class BaseTrajectoryEvaluator(AgentTrajectoryEvaluator):
     def __init__(self) -> None:
@@ -19,7 +24,10 @@ class BaseTrajectoryEvaluator(AgentTrajectoryEvaluator):
     ) -> dict:
 
         response = self.chain.invoke(dict(trajectory=agent_trajectory, input=input, prediction=prediction), **kwargs)
+        return self.parse_response(response)
 
+    @staticmethod
+    def parse_response(response: dict) -> dict:
         decision = response["text"].split("\n")[-1].strip()
         score = 1 if "Y" in decision else 0
         return {"score": score, "value": decision, "reasoning": response}
@@ -133,6 +141,103 @@ class ToolSelectionEvaluator(BaseTrajectoryEvaluator):
         )
         self.chain = LLMChain.from_string(self.llm, template)
 
+class CompositeTrajectoryEvaluator(AgentTrajectoryEvaluator):
+    """
+    Evaluates a trajectory against several criteria at once and returns a result per criterion,
+    shaped like the result of the criterion's own evaluator.
+
+    With mode "single_call" the trajectory is sent once, in a single structured-output call scoring
+    every criterion. With mode "concurrent" the criteria's own chains run in parallel.
+    """
+
+    single_call_template = (
+    """Evaluate the steps taken in responding to {input} against each of the criteria below.
+    The final answer is {prediction}.
+
+    DATA
+    ------
+    Steps: {trajectory}
+    ------
+    {criteria}
+    For each criterion, reason through its questions, then give its verdict: 'Y' or 'N' as described in the criterion.
+    """
+    )
+
+    def __init__(self, criteria: Sequence[str] = ("helpfulness", "step_necessity", "tool_selection"), mode: str = "single_call") -> None:
+        if mode not in ["single_call", "concurrent"]:
+            raise ValueError(f"Invalid composite evaluation mode: {mode}. Expected 'single_call' or 'concurrent'.")
+        self.criteria = list(criteria)
+        self.mode = mode
+        self.evaluators = {criterion: get_trajectory_evaluator(criterion) for criterion in self.criteria}
+        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.0)
+        self.chain = self._single_call_chain() if mode == "single_call" else RunnableParallel({
+            criterion: evaluator.chain for criterion, evaluator in self.evaluators.items()
+        })
+
+    def _single_call_chain(self):
+        sections = ""
+        for criterion, evaluator in self.evaluators.items():
+            # The criterion's own questions and verdict, without its copy of the trajectory
+            questions = re.sub(r"DATA\s*------\s*Steps: \{trajectory\}\s*------", "", evaluator.chain.prompt.template)
+            sections += f"\n    Criterion '{criterion}':\n{questions}\n"
+
+        verdict = {
+            "type": "object",
+            "properties": {
+                "reasoning": {"type": "string", "description": "Answers to the questions of the criterion."},
+                "verdict": {"type": "string", "enum": ["Y", "N"]},
+            },
+            "required": ["reasoning", "verdict"],
+        }
+        schema = {
+            "type": "object",
+            "properties": {criterion: verdict for criterion in self.criteria},
+            "required": self.criteria,
+        }
+        prompt = PromptTemplate.from_template(self.single_call_template.replace("{criteria}", sections))
+        return create_structured_output_runnable(schema, self.llm, prompt)
+
+    def _parse(self, response: Dict[str, Any]) -> Dict[str, dict]:
+        if self.mode == "concurrent":
+            return {criterion: self.evaluators[criterion].parse_response(response[criterion]) for criterion in self.criteria}
+
+        results = {}
+        for criterion in self.criteria:
+            decision = response.get(criterion, {})
+            verdict = decision.get("verdict", "N")
+            # Shaped like the LLMChain response the criterion's own evaluator reports as reasoning
+            results[criterion] = {"score": 1 if verdict == "Y" else 0, "value": verdict, "reasoning": {"text": decision.get("reasoning", "")}}
+        return results
+
+    @staticmethod
+    def _config(kwargs: Dict[str, Any]) -> RunnableConfig:
+        """The callbacks, tags and metadata passed to `evaluate_agent_trajectory`, as the config of the chain's run."""
+        return RunnableConfig(**{key: kwargs[key] for key in ["callbacks", "tags", "metadata"] if kwargs.get(key) is not None})
+
+    def _evaluate_agent_trajectory(
+        self,
+        *,
+        prediction: str,
+        input: str,
+        agent_trajectory: str,
+        **kwargs: Any,
+    ) -> dict:
+
+        response = self.chain.invoke(dict(trajectory=agent_trajectory, input=input, prediction=prediction), self._config(kwargs))
+        return self._parse(response)
+
+    async def _aevaluate_agent_trajectory(
+        self,
+        *,
+        prediction: str,
+        input: str,
+        agent_trajectory: str,
+        **kwargs: Any,
+    ) -> dict:
+
+        response = await self.chain.ainvoke(dict(trajectory=agent_trajectory, input=input, prediction=prediction), self._config(kwargs))
+        return self._parse(response)
+
 def get_trajectory_evaluator(eval_type: str = "helpfulness"):
     if eval_type == "helpfulness":
         evaluator = HelpfulnessEvaluator()
@@ -140,7 +245,15 @@ def get_trajectory_evaluator(eval_type: str = "helpfulness"):
         evaluator = StepNecessityEvaluator()
     elif eval_type == "tool_selection":
         evaluator = ToolSelectionEvaluator()
+    elif eval_type == "composite":
+        evaluator = CompositeTrajectoryEvaluator()
     else:
         raise ValueError(f"Invalid trajectory eval type: {eval_type}. Expected 'react' or 'openai'.")
 
-    return evaluator
\ No newline at end of file
+    return evaluator
+
+# Trajectory evaluators shared by the whole process, each built on first use
+trajectory_evaluators = LazyRegistry({
+    eval_type: (lambda eval_type=eval_type: get_trajectory_evaluator(eval_type))
+    for eval_type in ["helpfulness", "step_necessity", "tool_selection", "composite"]
+})
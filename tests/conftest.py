@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+import pytest
+from dotenv import load_dotenv
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.llm_cache import configure_llm_cache
+
+
+def llm_available() -> bool:
+    """Whether tests marked `llm` can get LLM responses: from a recording in replay mode, from OpenAI otherwise."""
+    if os.environ.get("LLM_CACHE_MODE", "passthrough") == "replay":
+        path = os.environ["LLM_CACHE_PATH"]
+        if not os.path.exists(path):
+            return False
+        with closing(sqlite3.connect(path)) as con:
+            try:
+                return con.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] > 0
+            except sqlite3.OperationalError:
+                return False
+    return bool(os.environ.get("OPENAI_API_KEY"))
+
+
+def pytest_configure(config):
+    # LLM_CACHE_MODE=record runs the suite against OpenAI and stores every response,
+    # LLM_CACHE_MODE=replay then runs it offline from the stored responses.
+    # The recording is not committed: record it locally with an OPENAI_API_KEY.
+    config.addinivalue_line("markers", "llm: calls the LLM, skipped without an OpenAI key or a recording to replay")
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "llm_cache.sqlite"))
+    load_dotenv()
+    config.llm_available = llm_available()
+    configure_llm_cache()
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.llm_available:
+        return
+    skip = pytest.mark.skip(reason="needs OPENAI_API_KEY, or LLM_CACHE_MODE=replay with a recording in LLM_CACHE_PATH")
+    for item in items:
+        if "llm" in item.keywords:
+            item.add_marker(skip)
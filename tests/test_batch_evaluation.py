@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from evaluation.trajectory_evaluation.batch_evaluation import evaluate_runs, read_results
+
+
+class KeywordEvaluator:
+    """Passes the runs whose output mentions the keyword, and counts its calls."""
+
+    def __init__(self, keyword: str):
+        self.keyword = keyword
+        self.calls = 0
+
+    def evaluate_agent_trajectory(self, prediction, input, agent_trajectory):
+        self.calls += 1
+        if "fail" in input:
+            raise RuntimeError("evaluation failed")
+        verdict = "Y" if self.keyword in prediction else "N"
+        return {"score": int(verdict == "Y"), "value": verdict, "reasoning": {"text": verdict}}
+
+
+def write_runs(path, runs):
+    with open(path, "w") as f:
+        for run in runs:
+            f.write(json.dumps(run) + "\n")
+
+def test_evaluate_runs_resumes_and_aggregates(tmp_path):
+    runs_path, results_path = str(tmp_path / "runs.jsonl"), str(tmp_path / "results.jsonl")
+    runs = [
+        {"id": str(i), "agent_type": "react" if i % 2 else "multi", "input": f"question {i}", "output": "answer" if i < 6 else "nothing", "agent_trajectory": [["SQL", "rows"]]}
+        for i in range(10)
+    ]
+    write_runs(runs_path, runs[:4] + [{**runs[4], "input": "fail"}])
+
+    evaluator = KeywordEvaluator("answer")
+    summary = evaluate_runs(runs_path, results_path, {"helpfulness": evaluator}, max_concurrency=3)
+    assert evaluator.calls == 5
+    assert summary["all"] == {"runs": 5, "errors": 1, "pass_rate": {"helpfulness": 1.0}}
+
+    # The log grew and the failed run was fixed: only the new and failed runs are evaluated again
+    write_runs(runs_path, runs)
+    evaluator = KeywordEvaluator("answer")
+    summary = evaluate_runs(runs_path, results_path, {"helpfulness": evaluator}, max_concurrency=3)
+    assert evaluator.calls == 6
+    assert len(read_results(results_path)) == 10
+    assert summary["all"] == {"runs": 10, "errors": 0, "pass_rate": {"helpfulness": 0.6}}
+    assert summary["react"]["pass_rate"]["helpfulness"] == 0.6
+    assert summary["multi"]["runs"] == 5
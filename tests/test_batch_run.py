@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import agents.base_agent as base_agent
+from agents.base_agent import Agent
+from agents.rate_limiter import RateLimiter
+from benchmarks.run_benchmark import AGENT_BUILDERS, fake_environment
+
+QUESTIONS = ["What skills does a data engineer need?", "How many companies are active?"]
+
+
+class RecordingLimiter(RateLimiter):
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+        RecordingLimiter.instances.append(self)
+
+    def acquire(self, requests=1, tokens=0):
+        self.calls.append((requests, tokens))
+        super().acquire(requests, tokens)
+
+
+class FailingAgent(Agent):
+    def run_agent(self, query):
+        raise RuntimeError("boom")
+
+    async def arun_agent(self, query):
+        raise RuntimeError("boom")
+
+    def astream_agent(self, query):
+        pass
+
+    def format_agent_response(self, output):
+        return {'output': output, 'agent_trajectory': '', 'steps': [], 'trace': None}
+
+
+def test_rate_limiter_burst_then_rate():
+    limiter = RateLimiter(requests_per_minute=600)
+    start = time.monotonic()
+    for _ in range(600):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+    limiter.acquire(requests=2)
+    assert time.monotonic() - start >= 0.15
+
+def test_rate_limiter_tokens_and_oversized_calls():
+    limiter = RateLimiter(tokens_per_minute=6000)
+    start = time.monotonic()
+    limiter.acquire(tokens=10 ** 6)
+    limiter.acquire(tokens=10)
+    assert 0.09 <= time.monotonic() - start < 1.0
+
+def test_run_batch_charges_every_llm_call(monkeypatch):
+    RecordingLimiter.instances = []
+    monkeypatch.setattr(base_agent, "RateLimiter", RecordingLimiter)
+    with fake_environment():
+        agent = AGENT_BUILDERS["multi"]()
+        results = agent.run_batch(QUESTIONS, requests_per_minute=10000, tokens_per_minute=10 ** 6)
+        aresults = asyncio.run(agent.arun_batch(QUESTIONS, requests_per_minute=10000, tokens_per_minute=10 ** 6))
+
+    for batch, limiter in zip([results, aresults], RecordingLimiter.instances):
+        assert [r['input'] for r in batch] == QUESTIONS and all(r['error'] is None for r in batch)
+        llm_calls = sum(len([span for span in r['trace']['spans'] if span['kind'] == 'llm']) for r in batch)
+        assert len(limiter.calls) == llm_calls > len(QUESTIONS)
+        assert all(requests == 1 and tokens > 256 for requests, tokens in limiter.calls)
+
+def test_failed_queries_have_the_keys_of_responses():
+    results = FailingAgent().run_batch(QUESTIONS)
+    aresults = asyncio.run(FailingAgent().arun_batch(QUESTIONS))
+    for result in results + aresults:
+        assert set(result) == {'input', 'output', 'agent_trajectory', 'steps', 'trace', 'time', 'error'}
+        assert result['error'] == "RuntimeError('boom')"
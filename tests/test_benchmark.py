@@ -0,0 +1,27 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.run_benchmark import QUESTIONS_PATH, check_regressions, run_benchmark
+
+def test_benchmark_runs_offline():
+    # Run a few questions through every agent with the fake LLM and embeddings
+    with open(QUESTIONS_PATH) as f:
+        questions = json.load(f)
+    questions = questions[:2] + questions[-2:]
+
+    results = run_benchmark(["react", "openai", "multi"], questions, repeat=1, concurrency=2)
+
+    for agent_type, metrics in results.items():
+        assert metrics["errors"] == [], f"{agent_type} failed: {metrics['errors']}"
+        assert metrics["queries"] == len(questions)
+        assert metrics["p50_ms"] <= metrics["p95_ms"] <= metrics["p99_ms"]
+        assert any(stage.startswith("tool:") for stage in metrics["stage_ms_per_query"])
+
+def test_regressions_are_reported():
+    baseline = {"react": {"p95_ms": 100.0, "qps": 10.0}}
+
+    assert check_regressions({"react": {"errors": [], "p95_ms": 110.0, "qps": 9.0}}, baseline) == []
+    assert len(check_regressions({"react": {"errors": [], "p95_ms": 200.0, "qps": 5.0}}, baseline)) == 2
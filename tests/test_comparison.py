@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.comparison import compare_agents, run_comparison
+from benchmarks.run_benchmark import AGENT_BUILDERS, fake_environment
+
+QUESTION = "How many companies are active?"
+
+
+class LengthEvaluator:
+    def evaluate_agent_trajectory(self, prediction, input, agent_trajectory):
+        return {"score": len(prediction), "steps": len(agent_trajectory)}
+
+
+class StreamWithoutFinal:
+    def stream_agent(self, query):
+        yield {"type": "token", "text": "partial"}
+
+
+def test_run_comparison():
+    with fake_environment():
+        agents = {"single": AGENT_BUILDERS["react"](), "multi": AGENT_BUILDERS["multi"]()}
+        responses = run_comparison(QUESTION, agents, {"length": LengthEvaluator()})
+
+    assert set(responses) == {"single", "multi"}
+    for response in responses.values():
+        assert response["output"] and response["time"] > 0
+        assert response["evaluations"]["length"]["score"] == len(response["output"])
+
+def test_compare_agents_stream():
+    with fake_environment():
+        agents = {"single": AGENT_BUILDERS["react"](), "multi": AGENT_BUILDERS["multi"](), "broken": StreamWithoutFinal()}
+        events = list(compare_agents(QUESTION, agents, stream=True))
+
+    assert {event["agent"] for event in events if event["type"] == "response"} == {"single", "multi"}
+    assert {event["agent"] for event in events if event["type"] == "agent_event"} >= {"single", "multi"}
+    errors = [event for event in events if event["type"] == "error"]
+    assert [error["agent"] for error in errors] == ["broken"]
+    assert "without a final event" in str(errors[0]["error"])
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import evaluation.trajectory_evaluation.trajectory_evaluators as trajectory_evaluators
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from benchmarks.fakes import FakeChatModel
+
+CRITERIA = ["helpfulness", "step_necessity", "tool_selection"]
+
+
+class FakeJudge(FakeChatModel):
+    def _respond(self, messages, **kwargs):
+        if "functions" in kwargs:
+            verdicts = {criterion: {"reasoning": "The steps answer the question.", "verdict": "N" if criterion == "tool_selection" else "Y"} for criterion in CRITERIA}
+            return AIMessage(content="", additional_kwargs={"function_call": {"name": "output_formatter", "arguments": json.dumps(verdicts)}})
+        return AIMessage(content="The steps answer the question.\nVerdict: Y")
+
+
+class RecordingHandler(BaseCallbackHandler):
+    def __init__(self):
+        self.llm_calls = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+
+
+@pytest.fixture
+def fake_judge(monkeypatch):
+    monkeypatch.setattr(trajectory_evaluators, "ChatOpenAI", lambda **kwargs: FakeJudge())
+
+@pytest.mark.parametrize("mode", ["single_call", "concurrent"])
+def test_composite_evaluation(fake_judge, mode):
+    evaluator = trajectory_evaluators.CompositeTrajectoryEvaluator(mode=mode)
+    handler = RecordingHandler()
+    results = evaluator.evaluate_agent_trajectory(
+        prediction="The average authorized capital is 1000.",
+        input="What is the average authorized capital?",
+        agent_trajectory="SQL: SELECT AVG(AUTHORIZED_CAP) FROM companies",
+        callbacks=[handler],
+    )
+    assert set(results) == set(CRITERIA)
+    assert handler.llm_calls == (1 if mode == "single_call" else len(CRITERIA))
+    for criterion, result in results.items():
+        assert set(result) == {"score", "value", "reasoning"}
+        assert result["reasoning"]["text"].startswith("The steps answer the question.")
+        assert result["score"] == (0 if mode == "single_call" and criterion == "tool_selection" else 1)
@@ -0,0 +1,129 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain_community.vectorstores import FAISS
+from agents.tools.docstore import SQLiteDocstore, read_documents, sqlite_docstore_path
+from agents.tools.faiss_index import MemmapFlatIndex
+from agents.tools.index_builder import IndexBuilder
+import agents.tools.vector_store as vector_store
+from agents.tools.vector_store import VectorStoreRegistry
+from benchmarks.fakes import FakeEmbeddings
+
+WORDS = "python java spark airflow sales retail django kafka aws tamil english manager engineer developer".split()
+
+
+def make_records(n, offset=0):
+    return [{"text": " ".join(WORDS[(i + j) % len(WORDS)] for j in range(i % 5 + 1)) + f" job {i}", "metadata": {"n": i}} for i in range(offset, offset + n)]
+
+
+def test_convert_pickle_store_to_sqlite(tmp_path):
+    folder = str(tmp_path)
+    records = make_records(50)
+    IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0).build(records)
+
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0, storage="sqlite")
+    builder.save()
+    assert isinstance(builder.store.docstore, SQLiteDocstore)
+    assert [document.page_content for document in read_documents(folder)] == [record["text"] for record in records]
+
+    store = VectorStoreRegistry(FakeEmbeddings).get(folder)
+    assert isinstance(store.docstore, SQLiteDocstore) and store.docstore.read_only
+    document, _ = store.similarity_search_with_score(records[7]["text"], k=1)[0]
+    assert document.page_content == records[7]["text"] and document.metadata == {"n": 7}
+
+
+def test_converted_store_with_uuid_ids_is_not_reindexed(tmp_path):
+    folder = str(tmp_path)
+    records = make_records(20)
+    FAISS.from_texts([record["text"] for record in records], FakeEmbeddings(), metadatas=[record["metadata"] for record in records]).save_local(folder)
+    IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0, storage="sqlite").save()
+
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0)
+    assert builder.storage == "sqlite" and len(builder.known_hashes) == 20
+    assert builder.build(records) == 0
+    assert builder.build(make_records(25)) == 5
+    assert builder.store.index.ntotal == 25
+
+
+def test_incremental_build_and_interrupted_save(tmp_path):
+    folder = str(tmp_path)
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0, storage="sqlite")
+    builder.build(make_records(30))
+
+    # Documents committed without their vectors, as when a save stops before the index file is written
+    builder.add(make_records(10, offset=30))
+    builder.store.docstore.commit()
+
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0)
+    assert builder.storage == "sqlite" and len(builder.known_hashes) == 30
+    assert builder.build(make_records(40)) == 10
+    assert builder.store.index.ntotal == len(builder.store.index_to_docstore_id) == 40
+
+    store = VectorStoreRegistry(FakeEmbeddings).get(folder)
+    document, _ = store.similarity_search_with_score(make_records(1, offset=35)[0]["text"], k=1)[0]
+    assert document.metadata == {"n": 35}
+
+
+def test_ivf_index_loaded_memory_mapped(tmp_path):
+    folder = str(tmp_path)
+    records = make_records(400)
+    IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0, index_type="ivf_flat", nlist=4, storage="sqlite").build(records)
+    assert os.path.exists(sqlite_docstore_path(folder)) and not os.path.exists(os.path.join(folder, "index.pkl"))
+
+    registry = VectorStoreRegistry(FakeEmbeddings, nprobe=4)
+    store = registry.get(folder)
+    assert store.index.ntotal == 400
+    document, _ = store.similarity_search_with_score(records[123]["text"], k=1)[0]
+    assert document.page_content == records[123]["text"]
+    assert registry.get_lexical_index(folder).search("kafka aws", k=1)
+
+def test_flat_index_served_from_memory_mapped_vectors(tmp_path):
+    folder = str(tmp_path)
+    records = make_records(60)
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0, storage="sqlite")
+    builder.build(records)
+
+    store = VectorStoreRegistry(FakeEmbeddings).get(folder)
+    assert isinstance(store.index, MemmapFlatIndex) and isinstance(store.index.vectors, np.memmap)
+    query = np.array([FakeEmbeddings().embed_query(records[11]["text"])], dtype=np.float32)
+    assert np.array_equal(store.index.search(query, 5)[1], builder.store.index.search(query, 5)[1])
+    document, _ = store.similarity_search_with_score(records[11]["text"], k=1)[0]
+    assert document.page_content == records[11]["text"]
+    assert len(store.similarity_search_with_score(records[11]["text"], k=100)) == 60
+
+
+def test_delete_documents(tmp_path):
+    folder = str(tmp_path)
+    records = make_records(20)
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0, storage="sqlite")
+    builder.build(records)
+
+    deleted = [builder.store.index_to_docstore_id[i] for i in (3, 7)]
+    builder.store.delete(deleted)
+    builder.add(make_records(1, offset=20))
+    builder.save()
+
+    store = VectorStoreRegistry(FakeEmbeddings).get(folder)
+    assert store.index.ntotal == len(store.index_to_docstore_id) == 19
+    texts = [document.page_content for document in read_documents(folder)]
+    assert records[3]["text"] not in texts and records[7]["text"] not in texts and texts[-1] == make_records(1, offset=20)[0]["text"]
+    for record in [records[8], make_records(1, offset=20)[0]]:
+        document, _ = store.similarity_search_with_score(record["text"], k=1)[0]
+        assert document.page_content == record["text"]
+
+
+def test_lexical_index_of_a_pickled_store_reuses_the_loaded_docstore(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    records = make_records(20)
+    FAISS.from_texts([record["text"] for record in records], FakeEmbeddings()).save_local(folder)
+
+    def unpickle(*args):
+        raise AssertionError("index.pkl unpickled again")
+
+    registry = VectorStoreRegistry(FakeEmbeddings)
+    monkeypatch.setattr(vector_store, "read_documents", unpickle)
+    assert registry.get_lexical_index(folder).search("kafka aws", k=1)
+    assert len(registry.get(folder).index_to_docstore_id) == 20
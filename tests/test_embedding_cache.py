@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.tools.embedding_cache import CachedEmbeddings
+from benchmarks.fakes import FakeEmbeddings
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded += texts
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return super().embed_query(text)
+
+
+def test_queries_are_embedded_once():
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, max_entries=2)
+    vector = embeddings.embed_query("Python developer")
+    assert embeddings.embed_query("  python   Developer ") == vector
+    assert inner.embedded == ["Python developer"]
+
+    # The least recently used entry is evicted past max_entries
+    embeddings.embed_query("data engineer")
+    embeddings.embed_query("sales manager")
+    embeddings.embed_query("Python developer")
+    assert len(inner.embedded) == 4
+    assert embeddings.stats() == {"entries": 2, "hits": 1, "misses": 4}
+
+def test_documents_only_embed_missing_texts(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, persist_path=path)
+    first = embeddings.embed_documents(["a b", "c d"])
+    second = embeddings.embed_documents(["c d", "e f", "e f", "a b"])
+    assert inner.embedded == ["a b", "c d", "e f"]
+    assert second[0] == first[1] and second[3] == first[0] and second[1] == second[2]
+
+    # A new process reads the vectors back from disk
+    restarted = CachedEmbeddings(CountingEmbeddings(), persist_path=path)
+    assert restarted.embed_documents(["a b", "c d", "e f"]) == [first[0], first[1], second[1]]
+    assert restarted.embeddings.embedded == []
+
+def test_embed_queries_shares_query_keys():
+    embeddings = CachedEmbeddings(FakeEmbeddings())
+    vector = embeddings.embed_query("Python developer")
+    vectors = embeddings.embed_queries(["python  developer", "data engineer", "data engineer"])
+    assert vectors[0] == vector and vectors[1] == vectors[2]
+    assert embeddings.stats()["misses"] == 2
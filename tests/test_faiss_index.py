@@ -0,0 +1,63 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import faiss
+
+from agents.tools.faiss_index import index_type_of, make_index, tune_search_params
+from agents.tools.index_builder import IndexBuilder
+from agents.tools.vector_store import VectorStoreRegistry
+from benchmarks.fakes import FakeEmbeddings
+from benchmarks.index_recall import compare_index_types, sample_queries, synthetic_vectors
+
+WORDS = "python java spark airflow sales retail django kafka aws tamil english manager engineer developer".split()
+
+
+def test_index_types_against_exact_search():
+    vectors = synthetic_vectors(2000, 64, clusters=10)
+    rows = compare_index_types(vectors, sample_queries(vectors, 50), k=4, nlist=8, pq_m=4, pq_nbits=8, hnsw_m=8)
+    best = {}
+    for row in rows:
+        best[row["index_type"]] = max(best.get(row["index_type"], 0), row["recall"])
+    assert best["flat"] == 1.0 and best["ivf_flat"] == 1.0 and best["hnsw"] > 0.9
+    assert min(row["size_mb"] for row in rows if row["index_type"] == "ivf_pq") < rows[0]["size_mb"] / 2
+
+def test_ivf_pq_needs_enough_training_vectors():
+    with pytest.raises(ValueError):
+        make_index("ivf_pq", synthetic_vectors(100, 32), pq_m=4)
+
+def test_convert_and_load_with_search_params(tmp_path):
+    folder = str(tmp_path)
+    records = [{"text": " ".join(WORDS[(i + j) % len(WORDS)] for j in range(i % 5 + 1)) + f" job {i}"} for i in range(400)]
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0)
+    builder.build(records)
+
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), index_type="ivf_flat", nlist=4)
+    builder.save()
+
+    store = VectorStoreRegistry(FakeEmbeddings, nprobe=4).get(folder)
+    assert index_type_of(store.index) == "ivf_flat"
+    assert store.index.nprobe == 4 and store.index.ntotal == 400
+    document, _ = store.similarity_search_with_score(records[3]["text"], k=1)[0]
+    assert document.page_content == records[3]["text"]
+
+def test_trained_on_all_documents(tmp_path):
+    folder = str(tmp_path)
+    records = [{"text": " ".join(WORDS[(i + j) % len(WORDS)] for j in range(i % 5 + 1)) + f" job {i}"} for i in range(400)]
+    builder = IndexBuilder(folder, embeddings=FakeEmbeddings(), min_length=0, index_type="ivf_flat", nlist=8)
+    # A chunk of 100 documents trains 2 lists only, all 400 documents train the 8 asked for
+    builder.build(records, chunk_size=100)
+
+    index = faiss.read_index(os.path.join(folder, "index.faiss"))
+    assert index_type_of(index) == "ivf_flat"
+    assert faiss.extract_index_ivf(index).nlist == 8 and index.ntotal == 400
+
+def test_tune_search_params_to_target_recall():
+    vectors = synthetic_vectors(2000, 64, clusters=10)
+    index = make_index("ivf_flat", vectors, nlist=32)
+    index.add(vectors)
+    params = tune_search_params(index, vectors, target_recall=0.95)
+    assert params["recall"] >= 0.95 and 1 <= params["nprobe"] <= 32
+    assert faiss.deserialize_index(faiss.serialize_index(index)).nprobe == params["nprobe"]
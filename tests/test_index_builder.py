@@ -0,0 +1,61 @@
+import csv
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain_community.vectorstores import FAISS
+from agents.tools.index_builder import IndexBuilder, read_source
+from benchmarks.fakes import FakeEmbeddings
+
+DESCRIPTIONS = [
+    "Senior Python developer with Django and AWS experience. " * 5,
+    "Data engineer building Spark and Airflow pipelines in Python. " * 5,
+    "Sales manager for retail stores, fluent in English and Tamil. " * 5,
+    "Too short",
+]
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded += texts
+        return super().embed_documents(texts)
+
+
+def write_csv(path, descriptions):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["jobid", "jobdescription"], delimiter=";")
+        writer.writeheader()
+        for i, description in enumerate(descriptions):
+            writer.writerow({"jobid": i, "jobdescription": description})
+
+def test_incremental_build(tmp_path):
+    source, folder = str(tmp_path / "jobs.csv"), str(tmp_path / "index")
+    write_csv(source, DESCRIPTIONS[:2] + DESCRIPTIONS[3:])
+    embeddings = CountingEmbeddings()
+    assert IndexBuilder(folder, embeddings=embeddings, batch_size=1).build(read_source(source, metadata_fields=["jobid"]), chunk_size=1) == 2
+    assert len(embeddings.embedded) == 2
+
+    # Rows already indexed, even written differently, are not embedded again
+    write_csv(source, [DESCRIPTIONS[0].upper()] + DESCRIPTIONS)
+    embeddings = CountingEmbeddings()
+    builder = IndexBuilder(folder, embeddings=embeddings)
+    assert builder.build(read_source(source)) == 1
+    assert embeddings.embedded == [DESCRIPTIONS[2].lower().strip()]
+
+    store = FAISS.load_local(folder, FakeEmbeddings())
+    assert store.index.ntotal == 3
+    document, _ = store.similarity_search_with_score("spark airflow pipelines", k=1)[0]
+    assert document.page_content.startswith("data engineer")
+    assert document.metadata == {"jobid": "1"}
+
+def test_read_jsonl(tmp_path):
+    source = str(tmp_path / "jobs.jsonl")
+    with open(source, "w") as f:
+        f.write(json.dumps({"text": "a job", "company": "acme"}) + "\n\n" + json.dumps({"company": "no text"}) + "\n")
+    assert list(read_source(source, text_field="text", metadata_fields=["company"])) == [{"text": "a job", "metadata": {"company": "acme"}}]
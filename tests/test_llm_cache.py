@@ -0,0 +1,53 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.messages import HumanMessage
+from agents.llm_cache import LLMCacheMiss, RecordReplayCache, RecordReplayEmbeddings, StreamingCacheMixin
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+
+calls = []
+
+
+class CountingChatModel(StreamingCacheMixin, FakeChatModel):
+    def _respond(self, messages, **kwargs):
+        calls.append(messages)
+        return super()._respond(messages, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def restore_llm_cache():
+    original = get_llm_cache()
+    calls.clear()
+    yield
+    set_llm_cache(original)
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    question = [HumanMessage(content="Question: How many companies are registered?")]
+
+    set_llm_cache(RecordReplayCache(path, "record"))
+    recorded = CountingChatModel().invoke(question).content
+    streamed = "".join(chunk.content for chunk in CountingChatModel().stream(question, stop=["\n"]))
+    assert len(calls) == 2
+
+    set_llm_cache(RecordReplayCache(path, "replay"))
+    assert CountingChatModel().invoke(question).content == recorded
+    assert "".join(chunk.content for chunk in CountingChatModel().stream(question, stop=["\n"])) == streamed
+    assert len(calls) == 2
+
+    # Another temperature is another request
+    with pytest.raises(LLMCacheMiss):
+        CountingChatModel(temperature=0.7).invoke(question)
+
+def test_embeddings_record_then_replay(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    recorded = RecordReplayEmbeddings(FakeEmbeddings(), RecordReplayCache(path, "record")).embed_documents(["data engineer", "python"])
+
+    replay = RecordReplayEmbeddings(FakeEmbeddings(), RecordReplayCache(path, "replay"))
+    assert replay.embed_documents(["data engineer", "python"]) == recorded
+    with pytest.raises(LLMCacheMiss):
+        replay.embed_query("unseen text")
@@ -0,0 +1,53 @@
+import json
+import os
+import shutil
+import sys
+
+import pytest
+from langchain import hub
+from langchain_core.prompts import BasePromptTemplate, PromptTemplate
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.prompts import prompt_store
+
+
+@pytest.fixture
+def bundle(tmp_path, monkeypatch):
+    bundle_dir = str(tmp_path / "bundle")
+    shutil.copytree(prompt_store.BUNDLE_DIR, bundle_dir, ignore=shutil.ignore_patterns("__pycache__"))
+    monkeypatch.setattr(prompt_store, "BUNDLE_DIR", bundle_dir)
+    monkeypatch.setattr(prompt_store, "MANIFEST_PATH", os.path.join(bundle_dir, "manifest.json"))
+    return bundle_dir
+
+
+def test_bundled_prompts_load():
+    manifest = prompt_store._read_manifest()
+    assert manifest
+    for name in manifest:
+        assert isinstance(prompt_store.load_prompt(name), BasePromptTemplate)
+
+def test_unknown_prompt(bundle):
+    with pytest.raises(ValueError, match="not in the bundle"):
+        prompt_store.load_prompt("nobody/nothing")
+
+def test_hash_mismatch(bundle):
+    name, entry = next(iter(prompt_store._read_manifest().items()))
+    path = os.path.join(bundle, entry["file"])
+    with open(path) as f:
+        content = json.load(f)
+    with open(path, "w") as f:
+        json.dump(content, f)
+    with pytest.raises(ValueError, match="does not match the hash"):
+        prompt_store.load_prompt(name)
+
+def test_refresh_records_new_versions(bundle, monkeypatch):
+    template = {"text": "Answer {question}"}
+    monkeypatch.setattr(hub, "pull", lambda name: PromptTemplate.from_template(template["text"]))
+
+    assert prompt_store.refresh_prompt("someone/qa")["version"] == 1
+    assert prompt_store.refresh_prompt("someone/qa")["version"] == 1
+    template["text"] = "Answer {question} briefly"
+    entry = prompt_store.refresh_prompt("someone/qa")
+    assert entry["version"] == 2 and entry["file"].startswith("someone__qa.")
+    assert prompt_store.load_prompt("someone/qa").template == "Answer {question} briefly"
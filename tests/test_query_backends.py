@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain.chains import create_sql_query_chain
+from langchain_community.llms.fake import FakeListLLM
+from agents.tools.query_backends import DuckDBBackend, export_parquet, get_query_backend
+from agents.tools.tools import execute_sql, result_version
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+AVERAGE_SQL = "SELECT ROUND(AVG(AUTHORIZED_CAP), 2) FROM companies WHERE REGISTERED_STATE = 'Gujarat'"
+
+
+def test_sqlite_backend_is_the_default(monkeypatch):
+    monkeypatch.delenv("SQL_BACKEND", raising=False)
+    backend = get_query_backend()
+    assert backend.dialect == "sqlite"
+    assert json.loads(execute_sql(backend, "SELECT COUNT(*) FROM companies"))["rows"] == [[357]]
+    with pytest.raises(ValueError):
+        get_query_backend("oracle")
+
+def test_budgets_are_part_of_the_result_version():
+    backend = get_query_backend("sqlite")
+    assert result_version(backend) == result_version(backend)
+    assert result_version(backend, max_rows=5) != result_version(backend)
+    assert json.loads(execute_sql(backend, "SELECT COMPANY_NAME FROM companies", max_rows=5, max_bytes=10**6))["shown_rows"] == 5
+
+def test_duckdb_backend_over_parquet(tmp_path):
+    pytest.importorskip("duckdb")
+    parquet_path = str(tmp_path / "companies.parquet")
+    export_parquet(os.path.join(DATA_DIR, "companies.csv"), parquet_path)
+    backend = DuckDBBackend(parquet_path)
+
+    assert "REGISTRATION_DATE DATE" in backend.get_table_info()
+    # Column names differ in case between the engines, the values do not
+    assert json.loads(execute_sql(backend, AVERAGE_SQL))["rows"] == json.loads(execute_sql(get_query_backend("sqlite"), AVERAGE_SQL))["rows"]
+    unparsed = "SELECT COUNT(*) FROM companies WHERE REGISTRATION_DATE IS NULL AND DATE_OF_REGISTRATION IS NOT NULL"
+    assert json.loads(execute_sql(backend, unparsed))["rows"] == [[0]]
+
+    chain = create_sql_query_chain(FakeListLLM(responses=[AVERAGE_SQL]), backend.schema())
+    assert chain.invoke({"question": "Average authorized capital in Gujarat?"}) == AVERAGE_SQL
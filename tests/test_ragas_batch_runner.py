@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain.chains.base import Chain
+from evaluation.ragas_evaluation.batch_runner import read_records, run_ragas_evaluation
+
+
+class OverlapMetricChain(Chain):
+    """Stand-in for a RAGAS metric chain: the share of answer words found in the compared texts."""
+
+    name: str
+    compared_key: str
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["query", "result", self.compared_key]
+
+    @property
+    def output_keys(self) -> List[str]:
+        return [f"{self.name}_score"]
+
+    def _call(self, inputs: Dict[str, Any], run_manager=None) -> Dict[str, Any]:
+        # Source documents are Documents, ground truths are texts, as for the RAGAS chains
+        compared = inputs[self.compared_key]
+        if self.compared_key == "source_documents":
+            compared = [document.page_content for document in compared]
+        known = set(" ".join(compared).lower().split())
+        words = inputs["result"].lower().split()
+        return {f"{self.name}_score": sum(word in known for word in words) / len(words)}
+
+
+def test_run_ragas_evaluation(tmp_path):
+    records_path, results_path = tmp_path / "records.jsonl", str(tmp_path / "scores.jsonl")
+    with open(records_path, "w") as f:
+        f.write(json.dumps({"query": "q1", "result": "paris is big", "source_documents": ["paris is big"], "ground_truths": ["paris"]}) + "\n")
+        f.write(json.dumps({"query": "q2", "result": "rome is old", "source_documents": [{"page_content": "rome"}]}) + "\n")
+
+    chains = {
+        "faithfulness": OverlapMetricChain(name="faithfulness", compared_key="source_documents"),
+        "context_recall": OverlapMetricChain(name="context_recall", compared_key="ground_truths"),
+    }
+    summary = run_ragas_evaluation(read_records(str(records_path)), results_path, chains, max_concurrency=2)
+
+    with open(results_path) as f:
+        scores = {r["id"]: r["scores"] for r in map(json.loads, f)}
+    assert scores["1"] == {"faithfulness": 1.0, "context_recall": 1 / 3}
+    # The second record has no ground truths, so context recall is skipped
+    assert scores["2"] == {"faithfulness": 1 / 3, "context_recall": None}
+    assert summary["records"] == 2 and summary["errors"] == 0
+    assert summary["metrics"]["faithfulness"] == {"mean": 2 / 3, "min": 1 / 3, "count": 2}
+    assert summary["metrics"]["context_recall"]["count"] == 1
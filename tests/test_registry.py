@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.registry import LazyRegistry
+
+
+class SlowFactory:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return object()
+
+
+def test_entries_are_built_once_on_first_get():
+    factory = SlowFactory()
+    registry = LazyRegistry({"a": factory})
+    assert not registry.is_built("a") and factory.calls == 0
+    assert registry.get("a") is registry["a"]
+    assert factory.calls == 1 and registry.is_built("a")
+    with pytest.raises(ValueError):
+        registry.get("b")
+
+def test_register_replaces_the_built_entry():
+    registry = LazyRegistry({"a": SlowFactory()})
+    first = registry.get("a")
+    registry.register("a", SlowFactory())
+    assert not registry.is_built("a") and registry.get("a") is not first
+
+def test_concurrent_get_builds_once():
+    factory = SlowFactory(delay=0.2)
+    registry = LazyRegistry({"a": factory})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert factory.calls == 1 and len({id(result) for result in results}) == 1
+
+def test_prewarm_builds_in_the_background():
+    def failing():
+        raise RuntimeError("no network")
+
+    factory = SlowFactory(delay=0.1)
+    registry = LazyRegistry({"a": factory, "broken": failing, "unused": SlowFactory()})
+    thread = registry.prewarm(["a", "broken"])
+    assert thread.daemon
+    thread.join()
+    assert registry.is_built("a") and not registry.is_built("broken") and not registry.is_built("unused")
+    registry.get("a")
+    assert factory.calls == 1
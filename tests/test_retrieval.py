@@ -0,0 +1,91 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import agents.tools.tools as tools
+from langchain_community.vectorstores import FAISS
+from agents.tools.retrieval import BM25Index, fuse_scores, is_keyword_query, search_many
+from agents.tools.vector_store import get_vector_store_registry
+from benchmarks.fakes import FakeEmbeddings
+from langchain_core.documents import Document
+
+TEXTS = [
+    "Senior Python developer with Django and AWS experience.",
+    "Data engineer building Spark and Airflow pipelines in Python.",
+    "Sales manager for retail stores, fluent in English and Tamil.",
+    "Java backend developer, Spring Boot and Kafka.",
+]
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    calls = 0
+
+    def embed_query(self, text):
+        CountingEmbeddings.calls += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def job_index(tmp_path, monkeypatch):
+    FAISS.from_texts(TEXTS, FakeEmbeddings()).save_local(str(tmp_path))
+    registry = get_vector_store_registry()
+    original_factory = registry.embeddings_factory
+    registry.set_embeddings_factory(CountingEmbeddings)
+    monkeypatch.setattr(tools, "VECTOR_STORE_DIR", str(tmp_path))
+    CountingEmbeddings.calls = 0
+    yield
+    registry.set_embeddings_factory(original_factory)
+    registry.clear()
+
+def test_bm25_ranking():
+    index = BM25Index([Document(page_content=text) for text in TEXTS])
+    results = index.search("python developer", k=4)
+    assert results[0][0].page_content == TEXTS[0]
+    assert {doc.page_content for doc, _ in results} == {TEXTS[0], TEXTS[1], TEXTS[3]}
+    assert index.search("astronaut") == []
+
+def test_keyword_queries():
+    vocabulary = BM25Index([Document(page_content=text) for text in TEXTS]).vocabulary
+    assert is_keyword_query("Python developer AWS", vocabulary)
+    assert not is_keyword_query("What skills does a data engineer need?", vocabulary)
+    assert not is_keyword_query("rust developer", vocabulary)
+
+def test_fuse_scores():
+    a, b, c = (Document(page_content=text) for text in TEXTS[:3])
+    fused = fuse_scores([(a, 0.9), (b, 0.5)], [(b, 10.0), (c, 5.0)], k=3)
+    assert [(doc.page_content, round(score, 2)) for doc, score in fused] == [(b.page_content, 0.75), (a.page_content, 0.45), (c.page_content, 0.25)]
+
+def test_dense_mode_is_the_default(job_index):
+    assert tools.JOB_SEARCH_MODE == "dense"
+    tools.job_description_search("Spark Airflow")
+    assert CountingEmbeddings.calls == 1
+
+def test_keyword_query_skips_embedding(job_index, monkeypatch):
+    monkeypatch.setattr(tools, "JOB_SEARCH_MODE", "auto")
+    output = tools.job_description_search("Spark Airflow")
+    assert output.startswith("Result 1 (Probability: 1.00):\nData engineer")
+    assert CountingEmbeddings.calls == 0
+
+    output = tools.job_description_search("Who can build pipelines in Python?")
+    assert "Data engineer" in output
+    assert CountingEmbeddings.calls == 1
+
+def test_search_many_batches_and_dedupes(job_index):
+    queries = ["Python developer", "Spark Airflow pipelines", "Python Django"]
+    results = tools.job_description_search_many(queries, k=2)
+    assert CountingEmbeddings.calls == 0
+
+    assert len(results) == 3
+    found = [doc.page_content for hits in results for doc, _ in hits]
+    assert len(found) == len(set(found))
+    assert results[1][0][0].page_content == TEXTS[1]
+    assert found.count(TEXTS[0]) == 1
+
+    store = tools.get_vector_store(tools.VECTOR_STORE_DIR)
+    undeduped = search_many(store, queries, k=2, dedupe=False)
+    assert undeduped[0][0][0].page_content == undeduped[2][0][0].page_content == TEXTS[0]
+
+    single = store.similarity_search_with_score(queries[1], k=1)[0]
+    assert results[1][0][1] == pytest.approx(float(single[1]), abs=1e-5)
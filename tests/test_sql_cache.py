@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.tools.sql_cache import SQLQueryCache, SQLResultCache, extract_literals, normalize_question
+from agents.tools.sql_database import database_file_version
+from benchmarks.fakes import FakeEmbeddings
+
+
+class Generator:
+    def __init__(self):
+        self.questions = []
+
+    def __call__(self, question):
+        self.questions.append(question)
+        return f"SQL for {question}"
+
+
+def test_normalize_question_keeps_operators_and_numbers():
+    assert normalize_question("  Companies with AUTHORIZED_CAP  > 100000? ") == "companies with authorized_cap > 100000?"
+    assert normalize_question("companies with AUTHORIZED_CAP > 100000") != normalize_question("companies with AUTHORIZED_CAP < 100000")
+
+def test_extract_literals():
+    assert extract_literals("How many companies in Gujarat registered after 2010?") == ["2010", "after", "gujarat"]
+    assert extract_literals("Companies with capital > 5") != extract_literals("Companies with capital < 5")
+
+def test_exact_tier():
+    cache, generate = SQLQueryCache("schema"), Generator()
+    assert cache.get_or_generate("How many companies?", generate) == "SQL for How many companies?"
+    assert cache.get_or_generate("how many   COMPANIES?", generate) == "SQL for How many companies?"
+    cache.get_or_generate("Companies with AUTHORIZED_CAP > 100000", generate)
+    cache.get_or_generate("Companies with AUTHORIZED_CAP < 100000", generate)
+    assert len(generate.questions) == 3
+    assert cache.hits == {"exact": 1, "similar": 0} and cache.misses == 3
+
+def test_similarity_tier_needs_equal_literals():
+    cache, generate = SQLQueryCache("schema", embeddings=FakeEmbeddings(), similarity_threshold=0.8), Generator()
+    cache.get_or_generate("How many active companies are registered in Gujarat", generate)
+    assert cache.get_or_generate("How many active companies are registered in Gujarat please", generate) == "SQL for How many active companies are registered in Gujarat"
+    cache.get_or_generate("How many active companies are registered in Kerala", generate)
+    assert len(generate.questions) == 2 and cache.hits["similar"] == 1
+
+def test_similarity_tier_is_off_without_embeddings():
+    cache, generate = SQLQueryCache("schema"), Generator()
+    cache.get_or_generate("How many active companies are registered in Gujarat", generate)
+    cache.get_or_generate("How many active companies are registered in Gujarat please", generate)
+    assert len(generate.questions) == 2
+
+def test_ttl_and_lru_eviction():
+    cache, generate = SQLQueryCache("schema", max_entries=2, ttl=0.05), Generator()
+    cache.get_or_generate("a", generate)
+    time.sleep(0.1)
+    cache.get_or_generate("a", generate)
+    assert generate.questions == ["a", "a"]
+
+    cache.get_or_generate("b", generate)
+    cache.get_or_generate("a", generate)
+    cache.get_or_generate("c", generate)
+    cache.get_or_generate("b", generate)
+    assert generate.questions == ["a", "a", "b", "c", "b"]
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    embeddings = FakeEmbeddings()
+    cache = SQLQueryCache("schema", embeddings=embeddings, similarity_threshold=0.8, persist_path=path)
+    cache.get_or_generate("How many active companies are registered in Gujarat", Generator())
+
+    generate = Generator()
+    reloaded = SQLQueryCache("schema", embeddings=embeddings, similarity_threshold=0.8, persist_path=path)
+    reloaded.get_or_generate("how many active companies are registered in gujarat", generate)
+    reloaded.get_or_generate("How many active companies are registered in Gujarat please", generate)
+    assert generate.questions == [] and reloaded.hits == {"exact": 1, "similar": 1}
+
+    assert len(SQLQueryCache("other schema", persist_path=path)._entries) == 0
+
+def test_persisted_schemas_share_the_file(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    first, second = SQLQueryCache("schema a", persist_path=path, max_entries=2), SQLQueryCache("schema b", persist_path=path)
+    for question in ["a", "b", "c"]:
+        first.get_or_generate(question, Generator())
+    second.get_or_generate("a", Generator())
+
+    assert list(SQLQueryCache("schema a", persist_path=path)._entries) == ["b", "c"]
+    assert list(SQLQueryCache("schema b", persist_path=path)._entries) == ["a"]
+    second.clear()
+    assert len(SQLQueryCache("schema b", persist_path=path)._entries) == 0
+    assert len(SQLQueryCache("schema a", persist_path=path)._entries) == 2
+
+def test_embeddings_given_after_the_cache_was_created():
+    cache, generate = SQLQueryCache("schema", similarity_threshold=0.8), Generator()
+    cache.get_or_generate("How many active companies are registered in Gujarat", generate)
+    cache.set_embeddings(FakeEmbeddings())
+    cache.get_or_generate("How many active companies are registered in Kerala", generate)
+    cache.get_or_generate("How many active companies are registered in Kerala please", generate)
+    assert len(generate.questions) == 2 and cache.hits["similar"] == 1
+
+def test_result_cache_invalidated_when_the_database_is_rewritten(tmp_path):
+    db_path = str(tmp_path / "companies.db")
+    con = sqlite3.connect(db_path)
+    con.execute("CREATE TABLE companies (name TEXT)")
+    con.execute("INSERT INTO companies VALUES ('a')")
+    con.commit()
+
+    cache = SQLResultCache()
+    execute = lambda sql: json.dumps(sqlite3.connect(db_path).execute(sql).fetchall())
+    assert cache.get_or_execute("SELECT COUNT(*) FROM companies", database_file_version(db_path), execute) == "[[1]]"
+    assert cache.get_or_execute("SELECT COUNT(*)\n  FROM companies;", database_file_version(db_path), execute) == "[[1]]"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    time.sleep(0.01)
+    con.execute("INSERT INTO companies VALUES ('b')")
+    con.commit()
+    con.close()
+    assert cache.get_or_execute("SELECT COUNT(*) FROM companies", database_file_version(db_path), execute) == "[[2]]"
+    assert cache.stats()["misses"] == 2
+
+def test_result_cache_evicts_beyond_max_bytes():
+    cache = SQLResultCache(max_bytes=100)
+    for sql in ["SELECT 1", "SELECT 2", "SELECT 3"]:
+        cache.get_or_execute(sql, 0, lambda sql: "x" * 30)
+    assert cache.stats()["entries"] == 2 and cache.size_bytes <= 100
+    cache.get_or_execute("SELECT 1", 0, lambda sql: "recomputed")
+    assert cache.stats()["misses"] == 4
+
+    cache.get_or_execute("SELECT big", 0, lambda sql: "x" * 200)
+    assert ("SELECT big", 0) not in cache._entries
@@ -0,0 +1,84 @@
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.tools.sql_database import SQLiteConnectionPool, get_connection_pool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "companies.db")
+    shutil.copyfile(os.path.join(os.path.dirname(__file__), "..", "data", "companies.db"), path)
+    return path
+
+
+def test_connection_reused(db_path):
+    pool = SQLiteConnectionPool(db_path, max_size=2)
+    with pool.connection() as first:
+        assert first.execute("SELECT COUNT(*) FROM companies").fetchone()[0] == 357
+    with pool.connection() as second:
+        assert second is first
+    assert pool._opened == 1
+
+def test_concurrent_checkout(db_path):
+    pool = SQLiteConnectionPool(db_path, max_size=2, timeout=5)
+    held, release = [], threading.Event()
+
+    def hold():
+        with pool.connection() as con:
+            held.append(con)
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while len(held) < 2:
+        time.sleep(0.01)
+    assert held[0] is not held[1] and pool._opened == 2
+
+    # A third caller waits for a connection to be returned rather than opening another one
+    waiter = threading.Thread(target=hold)
+    waiter.start()
+    time.sleep(0.1)
+    assert len(held) == 2
+    release.set()
+    for thread in threads + [waiter]:
+        thread.join()
+    assert held[2] in held[:2] and pool._opened == 2
+
+def test_checkout_timeout(db_path):
+    pool = SQLiteConnectionPool(db_path, max_size=1, timeout=0.1)
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+
+def test_writes_rejected(db_path):
+    pool = SQLiteConnectionPool(db_path)
+    with pool.connection() as con:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            con.execute("DELETE FROM companies")
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            con.execute("CREATE TABLE notes (note TEXT)")
+    with sqlite3.connect(db_path) as con:
+        assert con.execute("SELECT COUNT(*) FROM companies").fetchone()[0] == 357
+
+def test_pool_replaced_when_file_rewritten(db_path):
+    pool = get_connection_pool(db_path)
+    assert get_connection_pool(db_path) is pool
+
+    with sqlite3.connect(db_path) as con:
+        con.execute("DELETE FROM companies WHERE rowid > 100")
+    os.utime(db_path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+    new_pool = get_connection_pool(db_path)
+    assert new_pool is not pool and pool._closed
+    with new_pool.connection() as con:
+        assert con.execute("SELECT COUNT(*) FROM companies").fetchone()[0] == 100
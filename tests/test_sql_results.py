@@ -0,0 +1,75 @@
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.tools.sql_cache import SQLResultCache
+from agents.tools.sql_results import prune_result_files, read_result_page, remove_result_file, result_file_exists, shape_result, spilled_result
+
+
+def make_cursor(n):
+    con = sqlite3.connect(":memory:")
+    con.execute("CREATE TABLE companies (name TEXT, state TEXT)")
+    con.executemany("INSERT INTO companies VALUES (?, ?)", [(f"company {i}", "Gujarat") for i in range(n)])
+    return con.execute("SELECT name, state FROM companies ORDER BY rowid")
+
+def test_small_result_is_complete():
+    result = shape_result(make_cursor(3), max_rows=10)
+    assert result == {"columns": ["name", "state"], "rows": [[f"company {i}", "Gujarat"] for i in range(3)], "shown_rows": 3, "total_rows": 3, "truncated": False}
+
+def test_row_and_byte_budgets():
+    result = shape_result(make_cursor(1000), max_rows=20, fetch_size=7, spill_dir=None)
+    assert result["shown_rows"] == 20 and result["truncated"] and "note" in result
+    # Fetching stopped at the budget, so the total is unknown
+    assert "total_rows" not in result
+
+    result = shape_result(make_cursor(1000), max_rows=1000, max_bytes=200)
+    assert result["truncated"] and 0 < result["shown_rows"] < 10
+
+def test_spill_to_file(tmp_path):
+    result = shape_result(make_cursor(1000), max_rows=5, fetch_size=64, spill_dir=str(tmp_path))
+    assert result["shown_rows"] == 5 and result["total_rows"] == 1000
+    page = read_result_page(result["result_file"], offset=990, limit=20)
+    assert page["columns"] == ["name", "state"] and page["rows"][0] == ["company 990", "Gujarat"] and len(page["rows"]) == 10
+
+    assert "result_file" not in shape_result(make_cursor(3), spill_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_result_files_are_pruned(tmp_path):
+    paths = [shape_result(make_cursor(10), max_rows=1, spill_dir=str(tmp_path))["result_file"] for _ in range(4)]
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, ns=(10**18 - age * 10**9, 10**18 - age * 10**9))
+    prune_result_files(str(tmp_path), max_files=2)
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths[2:])
+
+    shape_result(make_cursor(10), max_rows=1, spill_dir=str(tmp_path), max_files=1)
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_result_file_deleted_with_its_cache_entry(tmp_path):
+    cache = SQLResultCache(max_bytes=2000, on_evict=remove_result_file)
+    execute = lambda sql: json.dumps(shape_result(make_cursor(100), max_rows=2, spill_dir=str(tmp_path)))
+    first = json.loads(cache.get_or_execute("SELECT 1", 0, execute))["result_file"]
+    cache.get_or_execute("SELECT 2", 0, lambda sql: "x" * 1800)
+    assert not os.path.exists(first)
+
+    third = json.loads(cache.get_or_execute("SELECT 3", 0, execute))["result_file"]
+    cache.clear()
+    assert not os.path.exists(third) and os.listdir(tmp_path) == []
+
+def test_cached_result_with_a_pruned_file_runs_again(tmp_path):
+    cache = SQLResultCache(on_evict=remove_result_file, is_valid=result_file_exists)
+    execute = lambda sql: json.dumps(shape_result(make_cursor(100), max_rows=2, spill_dir=str(tmp_path)))
+    first = cache.get_or_execute("SELECT 1", 0, execute)
+    assert cache.get_or_execute("SELECT 1", 0, execute) == first
+
+    prune_result_files(str(tmp_path), max_files=0)
+    second = cache.get_or_execute("SELECT 1", 0, execute)
+    assert second != first and os.path.exists(spilled_result(second)["result_file"])
+    assert cache.stats()["hits"] == 1 and cache.stats()["entries"] == 1
+
+def test_spilled_result():
+    assert spilled_result(json.dumps(shape_result(make_cursor(3), spill_dir=None))) is None
+    assert spilled_result("not json, \"result_file\"") is None
+    assert spilled_result(None) is None
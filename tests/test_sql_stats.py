@@ -0,0 +1,43 @@
+import os
+import shutil
+import sqlite3
+import sys
+import warnings
+
+from langchain_community.utilities import SQLDatabase
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.tools.sql_database import get_sql_database
+from agents.tools.sql_stats import build_stats_file, parse_registration_date
+
+
+def test_parse_registration_date():
+    assert parse_registration_date("11-3-1994") == "1994-03-11"
+    assert parse_registration_date(" 1-12-2001 ") == "2001-12-01"
+    assert parse_registration_date("31-2-2001") is None
+    assert parse_registration_date(None) is None
+
+def test_build_stats(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "companies.db")
+    shutil.copyfile(os.path.join(os.path.dirname(__file__), "..", "data", "companies.db"), db_path)
+    build_stats_file(db_path)
+    build_stats_file(db_path)
+
+    con = sqlite3.connect(db_path)
+    assert con.execute("SELECT COUNT(*) FROM companies WHERE REGISTRATION_DATE IS NULL").fetchone()[0] == 0
+    expected = con.execute("SELECT REGISTERED_STATE, COUNT(*), AVG(AUTHORIZED_CAP) FROM companies GROUP BY 1 ORDER BY 1").fetchall()
+    assert con.execute("SELECT REGISTERED_STATE, COMPANY_COUNT, AVG_AUTHORIZED_CAP FROM companies_by_state ORDER BY 1").fetchall() == expected
+    assert con.execute("SELECT SUM(COMPANY_COUNT) FROM companies_by_registration_year").fetchone()[0] == 357
+    plan = con.execute("EXPLAIN QUERY PLAN SELECT COUNT(*) FROM companies WHERE REGISTRATION_DATE >= '2000-01-01'").fetchall()
+    assert "ix_companies_registration_date" in str(plan)
+    con.close()
+
+    from_uri_calls = []
+    from_uri = SQLDatabase.from_uri
+    monkeypatch.setattr(SQLDatabase, "from_uri", lambda *args, **kwargs: from_uri_calls.append(args) or from_uri(*args, **kwargs))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        table_info = get_sql_database(db_path).get_table_info()
+    assert len(from_uri_calls) == 1
+    assert "companies_by_state" in table_info and "never with the 'd-m-yyyy' DATE_OF_REGISTRATION text" in table_info
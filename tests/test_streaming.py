@@ -0,0 +1,47 @@
+import logging
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.run_benchmark import AGENT_BUILDERS, fake_environment
+
+QUESTION = "How many companies are active?"
+
+
+def stream_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "agent-stream"]
+
+
+def test_multi_agent_stream(caplog):
+    with fake_environment(), caplog.at_level(logging.WARNING):
+        agent = AGENT_BUILDERS["multi"]()
+        events = list(agent.stream_agent(QUESTION))
+
+    types = [event["type"] for event in events]
+    assert {"route", "tool_call", "tool_observation", "token"} <= set(types) and types[-1] == "final"
+    assert "NotImplementedError" not in caplog.text
+
+    response = agent.format_agent_response(events[-1]["output"])
+    assert response["output"] and response["trace"] is not None
+    assert any(span["kind"] == "llm" for span in response["trace"]["spans"])
+    assert any(span["kind"] == "tool" for span in response["trace"]["spans"])
+
+
+def test_single_agent_stream_is_traced():
+    with fake_environment():
+        agent = AGENT_BUILDERS["react"]()
+        events = list(agent.stream_agent(QUESTION))
+
+    response = agent.format_agent_response(events[-1]["output"])
+    assert response["trace"]["spans"] and response["trace"]["total_ms"] > 0
+
+
+def test_stream_stopped_early_stops_the_run():
+    with fake_environment():
+        agent = AGENT_BUILDERS["multi"]()
+        stream = agent.stream_agent(QUESTION)
+        assert next(stream)["type"] in ("token", "route", "tool_call")
+        stream.close()
+        assert stream_threads() == []
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import RunnableLambda
+from agents.tracing import Trace, TracingCallbackHandler, record_cache, span, to_openmetrics, tracing, write_jsonl
+
+
+def test_span_nesting_and_stages():
+    def sql(x):
+        with span("sqlite_execute", rows=1):
+            return x + 1
+
+    chain = RunnableLambda(lambda x: RunnableLambda(sql, name="SQL").invoke(x), name="outer")
+    with tracing() as trace:
+        assert chain.invoke(1, {"callbacks": [TracingCallbackHandler(trace)]}) == 2
+
+    spans = {s["name"]: s for s in trace.spans}
+    assert spans["SQL"]["parent_run_id"] == spans["outer"]["run_id"]
+    assert spans["outer"]["start_ns"] <= spans["SQL"]["start_ns"] <= spans["SQL"]["end_ns"] <= spans["outer"]["end_ns"]
+    assert spans["sqlite_execute"]["kind"] == "stage" and spans["sqlite_execute"]["attributes"] == {"rows": 1}
+
+    summary = trace.summary()
+    assert set(summary["stages_ms"]) == {"chain:SQL", "stage:sqlite_execute"}
+    assert summary["total_ms"] == spans["outer"]["end_ns"] / 1e6
+
+
+def test_cache_counters():
+    record_cache("sql_result_cache", hit=True)
+    with tracing() as trace:
+        record_cache("sql_result_cache", hit=False)
+        record_cache("sql_result_cache", hit=True)
+        record_cache("embedding_cache", hit=True, key="query")
+    assert trace.summary()["caches"] == {"sql_result_cache": {"hits": 1, "misses": 1}, "embedding_cache": {"hits": 1, "misses": 0}}
+
+
+def test_estimated_usage_flag():
+    trace = Trace()
+    handler = TracingCallbackHandler(trace)
+    reported, streamed = uuid4(), uuid4()
+    handler.on_llm_start({"name": "llm"}, ["How many companies are active?"], run_id=reported)
+    handler.on_llm_end(LLMResult(generations=[], llm_output={"token_usage": {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}}), run_id=reported)
+    handler.on_llm_start({"name": "llm"}, ["How many companies are active?"], run_id=streamed)
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=AIMessage(content="SELECT COUNT(*) FROM companies"))]]), run_id=streamed)
+
+    first, second = (s["attributes"] for s in trace.spans)
+    assert first["total_tokens"] == 10 and "estimated_usage" not in first
+    assert second["estimated_usage"] is True and second["prompt_tokens"] > 0 and second["completion_tokens"] > 0
+    assert trace.summary()["tokens"]["total_tokens"] == 10 + second["total_tokens"]
+
+
+def test_openmetrics_histogram():
+    trace = Trace()
+    for duration_ms in [3, 40, 2000]:
+        trace.add_span("SQL", "chain", trace.start_ns, trace.start_ns + duration_ms * 1_000_000)
+    trace.add_span("llm", "llm", trace.start_ns, trace.start_ns, prompt_tokens=5, completion_tokens=2)
+    record_cache("sql_result_cache", hit=True)
+    with tracing(trace):
+        record_cache("sql_result_cache", hit=False)
+
+    lines = to_openmetrics([trace.summary()], buckets=[0.01, 0.1, 1.0]).splitlines()
+    assert 'agent_span_duration_seconds_bucket{kind="chain",name="SQL",le="0.01"} 1' in lines
+    assert 'agent_span_duration_seconds_bucket{kind="chain",name="SQL",le="0.1"} 2' in lines
+    assert 'agent_span_duration_seconds_bucket{kind="chain",name="SQL",le="1.0"} 2' in lines
+    assert 'agent_span_duration_seconds_bucket{kind="chain",name="SQL",le="+Inf"} 3' in lines
+    assert 'agent_span_duration_seconds_count{kind="chain",name="SQL"} 3' in lines
+    assert any(line.startswith('agent_span_duration_seconds_sum{kind="chain",name="SQL"} 2.04') for line in lines)
+    assert 'agent_llm_tokens_total{type="prompt"} 5' in lines and 'agent_llm_tokens_total{type="completion"} 2' in lines
+    assert 'agent_cache_lookups_total{cache="sql_result_cache",hit="false"} 1' in lines
+    assert lines[0] == "# TYPE agent_span_duration_seconds histogram" and lines[-1] == "# EOF"
+
+
+def test_write_jsonl(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    write_jsonl([Trace().summary()], path)
+    write_jsonl([Trace().summary()], path)
+    with open(path) as f:
+        assert [json.loads(line)["total_ms"] for line in f] == [0, 0]
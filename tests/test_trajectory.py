@@ -11,6 +11,8 @@ from loguru import logger
 from dotenv import load_dotenv
 load_dotenv()
 
+pytestmark = pytest.mark.llm
+
 # Define a fixture for the agent
 @pytest.fixture(scope="module")
 def agent():
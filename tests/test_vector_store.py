@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+import pytest
+from langchain_community.vectorstores import FAISS
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents.tools.docstore import save_sqlite_store
+from agents.tools.vector_store import VectorStoreRegistry
+from benchmarks.fakes import FakeEmbeddings
+
+OLD_TEXTS = ["python developer with django", "sales manager for retail stores"]
+NEW_TEXTS = ["data engineer building spark pipelines", "java developer with kafka", "tamil speaking accountant"]
+
+
+def save(texts, folder, storage):
+    store = FAISS.from_texts(texts, FakeEmbeddings())
+    if storage == "sqlite":
+        save_sqlite_store(store, folder)
+    else:
+        store.save_local(folder)
+    # Rewritten files always get a newer mtime, even on file systems with a coarse clock
+    stamp = time.time_ns() + 10 ** 9 * len(texts)
+    for name in os.listdir(folder):
+        os.utime(os.path.join(folder, name), ns=(stamp, stamp))
+
+
+@pytest.mark.parametrize("storage", ["pickle", "sqlite"])
+def test_reloaded_when_index_files_rewritten(tmp_path, storage):
+    folder = str(tmp_path)
+    save(OLD_TEXTS, folder, storage)
+    registry = VectorStoreRegistry(FakeEmbeddings)
+    store = registry.get(folder)
+    assert registry.get(folder) is store and store.index.ntotal == 2
+
+    save(NEW_TEXTS, folder, storage)
+    new_store = registry.get(folder)
+    assert new_store is not store and new_store.index.ntotal == 3
+    document, _ = new_store.similarity_search_with_score(NEW_TEXTS[0], k=1)[0]
+    assert document.page_content == NEW_TEXTS[0]
+    assert registry.get(folder) is new_store